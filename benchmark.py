@@ -0,0 +1,597 @@
+"""自动输入器性能基准测试
+
+用法:
+    python3 benchmark.py                          # 桩工具模式，测试所有方法和语料
+    python3 benchmark.py --methods xdotool_stream clipboard_chunked --corpora ascii cjk
+    python3 benchmark.py --xvfb                   # 使用真实 Xvfb + 本地文本框接收输入
+    python3 benchmark.py --output new.json --compare old.json
+
+桩工具模式下 xdotool/ydotool/xclip/wtype 等被替换为记录调用的桩程序，
+不需要任何图形环境；Xvfb 模式下使用真实工具（外面包一层记录调用的垫片）。
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from paste_script.content import StreamedContent, materialize
+from paste_script.engine import TypingEngine
+from paste_script.metrics import DELAY_PROFILES
+from paste_script.spawn import spawn_helper, start_spawn_helper
+from paste_script.tools import EV_KEY, EVDEV_KEY_LEFTCTRL, EVDEV_KEY_LEFTSHIFT, ToolRegistry
+from tests.ydotoold_standin import YdotooldStandIn
+
+# 桩程序：记录每次调用的耗时和送达的字符数，BENCH_REAL_PATH 非空时转发给真实工具
+STUB_SOURCE = r'''
+import json, os, shutil, subprocess, sys, time
+
+TOOL = os.path.basename(sys.argv[0])
+ARGS = sys.argv[1:]
+STATE = os.environ["BENCH_STATE"]
+REAL_PATH = os.environ.get("BENCH_REAL_PATH")
+SIMULATE = os.environ.get("BENCH_SIMULATE") == "1"
+CLIPBOARD = os.path.join(STATE, "clipboard")
+START = time.time()
+
+def log(op, chars=0, start=None):
+    # start 非空表示脚本模式中的一条命令，不对应独立进程
+    record = {"tool": TOOL, "op": op, "start": start or START, "end": time.time(), "chars": chars,
+              "script": start is not None}
+    with open(os.path.join(STATE, "calls.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+def clipboard_chars():
+    try:
+        with open(CLIPBOARD, encoding="utf-8") as f:
+            return len(f.read())
+    except OSError:
+        return 0
+
+def option(args, name, default):
+    if name in args and args.index(name) + 1 < len(args):
+        return args[args.index(name) + 1]
+    return default
+
+def simulate(chars, delay_ms):
+    if SIMULATE and chars:
+        time.sleep(chars * float(delay_ms) / 1000)
+
+def positional(args, valued):
+    # 去掉选项后的参数
+    result, i = [], 0
+    while i < len(args):
+        if args[i] == "--":
+            return result + args[i + 1:]
+        if args[i] in valued:
+            i += 2
+            continue
+        if args[i].startswith("-") and len(args[i]) > 1:
+            i += 1
+            continue
+        result.append(args[i])
+        i += 1
+    return result
+
+def xdotool_command(args, start=None):
+    cmd, rest = (args[0], args[1:]) if args else ("", [])
+    if cmd == "type":
+        text = "".join(positional(rest, {"--delay", "--window", "--repeat", "--repeat-delay"}))
+        simulate(len(text), option(rest, "--delay", 12))
+        log("type", len(text), start)
+    elif cmd == "key":
+        keys = positional(rest, {"--delay", "--window", "--repeat", "--repeat-delay"})
+        if any(key.lower() == "ctrl+v" for key in keys):
+            log("paste", clipboard_chars(), start)
+        else:
+            log("key", len(keys), start)
+    elif cmd == "getmouselocation":
+        print("X=1\nY=1\nSCREEN=0\nWINDOW=1" if "--shell" in rest else "x:1 y:1 screen:0 window:1", flush=True)
+        log(cmd, 0, start)
+    elif cmd == "getactivewindow":
+        print("1")
+        log(cmd, 0, start)
+    elif cmd == "getwindowname":
+        print("Benchmark Sink")
+        log(cmd, 0, start)
+    elif cmd == "version":
+        print("xdotool version bench-stub")
+    else:
+        log(cmd, 0, start)
+
+def run_stub():
+    if TOOL == "xdotool":
+        if ARGS == ["-"]:
+            log("spawn")
+            for line in sys.stdin:
+                xdotool_command(line.split(), time.time())
+            return 0
+        xdotool_command(ARGS)
+    elif TOOL == "ydotool":
+        cmd, rest = (ARGS[0], ARGS[1:]) if ARGS else ("", [])
+        if cmd == "type":
+            path = option(rest, "--file", None)
+            if path:
+                text = sys.stdin.read() if path == "-" else open(path, encoding="utf-8").read()
+            else:
+                text = "".join(positional(rest, {"--key-delay", "--key-hold", "--next-delay", "--file"}))
+            simulate(len(text), option(rest, "--key-delay", 12))
+            log("type", len(text))
+        elif cmd == "key":
+            codes = [code for code in rest if ":" in code]
+            if "47:1" in codes and "29:1" in codes:
+                log("paste", clipboard_chars())
+            else:
+                log("key", len([code for code in codes if code.endswith(":1")]))
+        else:
+            log(cmd)
+    elif TOOL == "wtype":
+        if "-P" in ARGS and "v" in ARGS:
+            log("paste", clipboard_chars())
+        elif "-k" in ARGS:
+            log("key", 1)
+        else:
+            text = "".join(positional(ARGS, {"-M", "-m", "-P", "-p", "-k", "-d", "-s"}))
+            log("type", len(text))
+    elif TOOL in ("xclip", "xsel", "wl-copy", "wl-paste"):
+        if "-version" in ARGS or "--version" in ARGS:
+            print(f"{TOOL} bench-stub")
+            return 0
+        if "-o" in ARGS or "--output" in ARGS or TOOL == "wl-paste":
+            try:
+                with open(CLIPBOARD, encoding="utf-8") as f:
+                    sys.stdout.write(f.read())
+            except OSError:
+                pass
+            log("read")
+        else:
+            data = sys.stdin.read()
+            with open(CLIPBOARD, "w", encoding="utf-8") as f:
+                f.write(data)
+            log("write", 0)
+    return 0
+
+def run_real():
+    real = shutil.which(TOOL, path=REAL_PATH)
+    if not real:
+        return 127
+    returncode = subprocess.run([real] + ARGS).returncode
+    log(ARGS[0] if ARGS else "run")
+    return returncode
+
+sys.exit(run_real() if REAL_PATH else run_stub())
+'''
+
+STUB_TOOLS = ["xdotool", "ydotool", "xclip", "xsel", "wl-copy", "wl-paste", "wtype"]
+
+# 注入按键的操作，用于计算首个按键时间
+INJECT_OPS = {"type", "key", "paste"}
+
+# 方法名 -> 引擎的输入方法（与界面/命令行选择的方法相同，经 asyncio 引擎运行）
+METHODS = {
+    "clipboard": "clipboard",
+    "clipboard_chunked": "clipboard_chunked",
+    "xdotool": "xdotool",
+    "xdotool_stream": "xdotool_stream",
+    "char_by_char": "char_by_char",
+    "ydotool": "basic_ydotool",
+    "xtest": "xtest",
+    "planned": "planned",
+}
+
+# 每个字符启动一次工具的方法：运行时间与字符数成正比，超时按速率控制器的每次调用预算放大，
+# 最长不超过 --max-timeout（multi_mb 语料上仍会超时，记为 stopped）
+PER_CHAR_METHODS = {"char_by_char"}
+
+ASCII_WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+               "incididunt ut labore et dolore magna aliqua def return self None True").split()
+CJK_CHARS = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处队南给色光门即保治北造百规热领七海口东导器压志世金增争济阶油思术极交受联什认六共权收证改清己美再采转更单风切打白教速花带安场身车例真务具万每目至达走积示议声报斗完类八离华名确才科张信马节话米整空元况今集温传土许步群广石记需段研界拉林律叫且究观越织装影算低持音众书布复容儿须际商非验连断深难近矿千周委素技备半办青省列习响约支般史感劳便团往酸历市克何除消构府称太准精值号率族维划选标写存候毛亲快效斯院查江型眼王按格养易置派层片始却专状育厂京识适属圆包火住调满县局照参红细引听该铁价严"
+
+
+def git_commit():
+    """当前提交的哈希，用于跨提交比较"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def generate_corpora(directory, size, large_size, seed=0):
+    """生成各类语料文件，返回 {名称: 路径}"""
+    rng = random.Random(seed)
+
+    def ascii_line(length):
+        words, total = [], 0
+        while total < length:
+            word = rng.choice(ASCII_WORDS)
+            words.append(word)
+            total += len(word) + 1
+        return " ".join(words)[:length]
+
+    def cjk_line(length):
+        return "".join(rng.choice(CJK_CHARS) if rng.random() < 0.8 else rng.choice("，。、 abc123")
+                       for _ in range(length))
+
+    def build(make_line, target, line_length):
+        lines, total = [], 0
+        while total < target:
+            line = make_line(line_length())
+            lines.append(line)
+            total += len(line) + 1
+        return "\n".join(lines) + "\n"
+
+    corpora = {
+        "ascii": build(ascii_line, size, lambda: rng.randint(20, 80)),
+        "cjk": build(cjk_line, size, lambda: rng.randint(10, 40)),
+        "short_lines": build(ascii_line, size, lambda: rng.randint(1, 5)),
+        "long_lines": build(ascii_line, size, lambda: 5000),
+        "multi_mb": build(lambda n: ascii_line(n) if rng.random() < 0.5 else cjk_line(n),
+                          large_size, lambda: rng.randint(20, 80)),
+    }
+    paths = {}
+    for name, text in corpora.items():
+        path = os.path.join(directory, f"{name}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        paths[name] = path
+    return paths
+
+
+def install_stubs(directory):
+    """在 directory 中生成桩工具"""
+    os.makedirs(directory, exist_ok=True)
+    for tool in STUB_TOOLS:
+        path = os.path.join(directory, tool)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"#!{sys.executable}\n" + STUB_SOURCE)
+        os.chmod(path, 0o755)
+
+
+class BenchTyper(TypingEngine):
+    """基准测试用的输入引擎"""
+
+    def __init__(self, state_dir, delay_profile="normal"):
+        super().__init__(delay_profile=delay_profile)
+        self.tools = ToolRegistry(os.path.join(state_dir, "tools.json"))
+        self.first_key_time = None
+
+    def ensure_target_focus(self):
+        """基准测试中目标窗口已经获得焦点"""
+
+    def get_xtest(self, shared=False):
+        """记录 XTest 的首个按键时间（XTest 不经过桩工具）"""
+        xtest = super().get_xtest(shared)
+        if xtest and not getattr(xtest, "bench_wrapped", False):
+            press = xtest.press_keysym
+
+            def timed_press(keysym, *args):
+                if self.first_key_time is None:
+                    self.first_key_time = time.time()
+                return press(keysym, *args)
+
+            xtest.press_keysym = timed_press
+            xtest.bench_wrapped = True
+        return xtest
+
+
+def percentile(values, fraction):
+    """取百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(calls, started, finished, chars, first_key_time):
+    """根据调用记录计算指标"""
+    spawns = sum(1 for call in calls if not call["script"])
+    ops = {}
+    for call in calls:
+        key = f"{call['tool']} {call['op']}"
+        ops.setdefault(key, []).append(call["end"] - call["start"])
+    injected = [call["start"] for call in calls if call["op"] in INJECT_OPS]
+    if first_key_time is None and injected:
+        first_key_time = min(injected)
+    elapsed = finished - started
+    delivered = sum(call["chars"] for call in calls if call["op"] in INJECT_OPS)
+    return {
+        "seconds": round(elapsed, 4),
+        "chars": chars,
+        "chars_delivered": delivered,
+        "chars_per_sec": round(delivered / elapsed, 2) if elapsed > 0 else None,
+        "spawns": spawns,
+        "spawns_per_1k_chars": round(spawns * 1000 / delivered, 2) if delivered else None,
+        "time_to_first_keystroke": round(first_key_time - started, 4) if first_key_time else None,
+        "ops": {key: {"count": len(values),
+                      "p50_ms": round(percentile(values, 0.5) * 1000, 3),
+                      "p99_ms": round(percentile(values, 0.99) * 1000, 3)}
+                for key, values in sorted(ops.items())},
+    }
+
+
+def load_calls(state_dir):
+    """读取桩工具记录"""
+    calls = []
+    try:
+        with open(os.path.join(state_dir, "calls.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                calls.append(json.loads(line))
+    except OSError:
+        pass
+    return calls
+
+
+class TextSink:
+    """Xvfb 中的本地文本框，接收输入并按需导出内容"""
+
+    def __init__(self, directory, display):
+        self.request = os.path.join(directory, "sink.request")
+        self.output = os.path.join(directory, "sink.txt")
+        env = dict(os.environ, DISPLAY=display)
+        self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--sink", directory], env=env)
+        time.sleep(1.0)
+
+    def command(self, name, timeout=30):
+        """发送 clear/dump 命令并等待完成"""
+        with open(self.request, "w", encoding="utf-8") as f:
+            f.write(name)
+        deadline = time.time() + timeout
+        while os.path.exists(self.request) and time.time() < deadline:
+            time.sleep(0.05)
+
+    def text(self):
+        """导出文本框内容"""
+        self.command("dump")
+        try:
+            with open(self.output, encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(timeout=5)
+
+
+class BenchYdotooldStandIn(YdotooldStandIn):
+    """基准测试用的替身 ydotoold：按桩工具的格式把收到的按键记录到当前状态目录"""
+
+    MODIFIERS = {EVDEV_KEY_LEFTCTRL, EVDEV_KEY_LEFTSHIFT}
+
+    def __init__(self, path):
+        self.held = set()
+        super().__init__(path)
+
+    def handle(self, event_type, code, value):
+        if event_type != EV_KEY:
+            return
+        if value == 0:
+            self.held.discard(code)
+        elif code in self.MODIFIERS:
+            self.held.add(code)
+        elif code == 47 and EVDEV_KEY_LEFTCTRL in self.held:
+            self.log("paste", self.clipboard_chars())
+        else:
+            self.log("key", 1)
+
+    @staticmethod
+    def clipboard_chars():
+        try:
+            with open(os.path.join(os.environ["BENCH_STATE"], "clipboard"), encoding="utf-8") as f:
+                return len(f.read())
+        except OSError:
+            return 0
+
+    @staticmethod
+    def log(op, chars):
+        # 套接字事件不对应进程，按脚本模式记录（不计入进程启动次数）
+        now = time.time()
+        record = {"tool": "ydotoold", "op": op, "start": now, "end": now, "chars": chars, "script": True}
+        with open(os.path.join(os.environ["BENCH_STATE"], "calls.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def run_sink(directory):
+    """文本框进程：轮询命令文件"""
+    import tkinter as tk
+
+    request = os.path.join(directory, "sink.request")
+    output = os.path.join(directory, "sink.txt")
+    root = tk.Tk()
+    root.title("Benchmark Sink")
+    root.geometry("1200x700+0+0")
+    text = tk.Text(root)
+    text.pack(fill="both", expand=True)
+
+    def poll():
+        text.focus_force()
+        if os.path.exists(request):
+            with open(request, encoding="utf-8") as f:
+                name = f.read().strip()
+            if name == "clear":
+                text.delete("1.0", "end")
+            elif name == "dump":
+                with open(output, "w", encoding="utf-8") as f:
+                    f.write(text.get("1.0", "end-1c"))
+            os.unlink(request)
+        root.after(50, poll)
+
+    signal.signal(signal.SIGTERM, lambda *args: root.quit())
+    root.after(50, poll)
+    root.mainloop()
+
+
+def start_xvfb(display):
+    """启动 Xvfb"""
+    if not shutil.which("Xvfb"):
+        sys.exit("未找到 Xvfb，请安装 xvfb 或去掉 --xvfb")
+    process = subprocess.Popen(["Xvfb", display, "-screen", "0", "1280x720x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1.0)
+    return process
+
+
+def run_timeout(method, chars, rate, args):
+    """一次运行的超时（秒）"""
+    if method not in PER_CHAR_METHODS:
+        return args.timeout
+    return min(max(args.timeout, chars * rate.budget(1)), max(args.timeout, args.max_timeout))
+
+
+def run_one(method, corpus, path, args, work_dir, sink=None):
+    """在独立的状态目录中运行一个方法"""
+    state_dir = tempfile.mkdtemp(prefix=f"{method}-{corpus}-", dir=work_dir)
+    os.environ["BENCH_STATE"] = state_dir
+
+    typer = BenchTyper(state_dir, args.delay_profile)
+    typer.method = METHODS[method]
+    # 只测选择的方法，失败时不改用其他方法
+    typer.auto_fallback = False
+    content = StreamedContent(path)
+    chars = len(materialize(StreamedContent(path)))
+    timeout = run_timeout(method, chars, typer.rate, args)
+    if sink:
+        sink.command("clear")
+
+    timer = threading.Timer(timeout, typer.request_stop)
+    timer.daemon = True
+    timer.start()
+    started = time.time()
+    typer.start_typing_async(content, countdown=0)
+    finished = time.time()
+    timer.cancel()
+    if typer.xtest:
+        typer.xtest.close()
+    if typer.ydotoold:
+        typer.ydotoold.close()
+
+    calls = load_calls(state_dir)
+    # 超时被停止的运行没有输入完整，不算成功
+    result = {"method": method, "corpus": corpus, "success": typer.last_success and not typer.last_stopped,
+              "stopped": typer.last_stopped, "timeout": round(timeout, 1), "final_rate_cps": round(typer.rate.cps, 2)}
+    result.update(summarize(calls, started, finished, chars, typer.first_key_time))
+    # 引擎自身的计量：各后端/操作的耗时分布和等待时间
+    result["metrics"] = typer.metrics.snapshot()
+    if sink:
+        delivered = sink.text()
+        result["chars_delivered"] = len(delivered)
+        result["chars_per_sec"] = round(len(delivered) / result["seconds"], 2) if result["seconds"] else None
+        result["exact"] = delivered == materialize(StreamedContent(path))
+    return result
+
+
+def compare(results, baseline_path):
+    """与之前的结果比较吞吐量"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["method"], r["corpus"]): r for r in baseline["results"]}
+    print(f"\n与 {baseline.get('commit')} 比较（字符/秒）:")
+    for result in results:
+        old = previous.get((result["method"], result["corpus"]))
+        if not old or not old.get("chars_per_sec") or not result.get("chars_per_sec"):
+            continue
+        ratio = result["chars_per_sec"] / old["chars_per_sec"]
+        print(f"  {result['method']:<18} {result['corpus']:<12} "
+              f"{old['chars_per_sec']:>10.1f} -> {result['chars_per_sec']:>10.1f}  ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自动输入器性能基准测试")
+    parser.add_argument("--methods", nargs="+", choices=sorted(METHODS), default=None)
+    parser.add_argument("--corpora", nargs="+",
+                        choices=["ascii", "cjk", "short_lines", "long_lines", "multi_mb"], default=None)
+    parser.add_argument("--size", type=int, default=20000, help="普通语料的字符数")
+    parser.add_argument("--large-size", type=int, default=4 * 1024 * 1024, help="multi_mb 语料的字符数")
+    parser.add_argument("--timeout", type=float, default=60, help="每次运行的最长时间（秒），超时后请求停止")
+    parser.add_argument("--max-timeout", type=float, default=900,
+                        help="逐字符方法按字符数放大后的超时上限（秒）")
+    parser.add_argument("--delay-profile", choices=sorted(DELAY_PROFILES), default="normal")
+    parser.add_argument("--simulate-delays", action="store_true", help="桩工具按 --delay 参数模拟按键耗时")
+    parser.add_argument("--xvfb", action="store_true", help="使用真实 Xvfb、真实工具和本地文本框")
+    parser.add_argument("--ydotoold", action="store_true", help="启动本地替身 ydotoold，测试直接写套接字的后端")
+    parser.add_argument("--spawn-helper", action="store_true", help="经进程启动助手启动工具（与程序正常运行时一致）")
+    parser.add_argument("--display", default=":99")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--compare", help="与之前保存的结果比较")
+    parser.add_argument("--sink", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.sink:
+        run_sink(args.sink)
+        return
+
+    methods = args.methods or [m for m in METHODS if m != "xtest" or args.xvfb]
+    corpora_names = args.corpora or ["ascii", "cjk", "short_lines", "long_lines", "multi_mb"]
+
+    work_dir = tempfile.mkdtemp(prefix="paste_bench-")
+    bin_dir = os.path.join(work_dir, "bin")
+    install_stubs(bin_dir)
+    original_path = os.environ.get("PATH", "")
+    os.environ["PATH"] = bin_dir + os.pathsep + original_path
+    os.environ["XDG_CACHE_HOME"] = os.path.join(work_dir, "cache")
+    if args.simulate_delays:
+        os.environ["BENCH_SIMULATE"] = "1"
+
+    xvfb = sink = standin = None
+    if args.ydotoold:
+        os.environ["YDOTOOL_SOCKET"] = os.path.join(work_dir, "ydotool_socket")
+        standin = BenchYdotooldStandIn(os.environ["YDOTOOL_SOCKET"])
+    elif not args.xvfb:
+        # 桩模式下不连接真实的 ydotoold
+        os.environ["YDOTOOL_SOCKET"] = os.path.join(work_dir, "no_ydotool_socket")
+    if args.xvfb:
+        xvfb = start_xvfb(args.display)
+        os.environ["DISPLAY"] = args.display
+        os.environ["BENCH_REAL_PATH"] = original_path
+        sink = TextSink(work_dir, args.display)
+    else:
+        # 桩模式下不连接真实显示
+        os.environ.pop("DISPLAY", None)
+
+    if args.spawn_helper and not start_spawn_helper():
+        sys.exit("无法启动进程启动助手")
+
+    try:
+        corpora = generate_corpora(work_dir, args.size, args.large_size)
+        results = []
+        for corpus in corpora_names:
+            for method in methods:
+                print(f"运行 {method} / {corpus} ...", flush=True)
+                result = run_one(method, corpus, corpora[corpus], args, work_dir, sink)
+                results.append(result)
+                print(f"  {result['chars_per_sec']} 字符/秒，每千字符 {result['spawns_per_1k_chars']} 次进程启动，"
+                      f"首键 {result['time_to_first_keystroke']} 秒", flush=True)
+    finally:
+        if spawn_helper():
+            spawn_helper().close()
+        if standin:
+            standin.close()
+        if sink:
+            sink.close()
+        if xvfb:
+            xvfb.terminate()
+
+    report = {"commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "mode": "xvfb" if args.xvfb else "stub", "simulate_delays": args.simulate_delays,
+              "delay_profile": args.delay_profile,
+              "python": sys.version.split()[0], "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,32 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
-import subprocess
 import threading
 import time
 import sys
 import os
-import tempfile
+import queue
+import json
 
-# 尝试导入 pynput 来处理全局快捷键
-try:
-    from pynput import keyboard
-    PYNPUT_AVAILABLE = True
-except ImportError:
-    PYNPUT_AVAILABLE = False
-    print("警告: pynput 未安装，快捷键功能将不可用")
-    print("可以运行 'pip install pynput' 来安装并启用快捷键功能")
+from paste_script.content import check_utf8, StreamedContent
+from paste_script.spawn import spawn_helper, start_spawn_helper
+from paste_script.hotkeys import HOTKEYS, pynput_hotkey, XHotkeys
+from paste_script.editor import EDITOR_PROFILES
+from paste_script.jobs import JobQueue, ProgressJournal
+from paste_script.metrics import BackendHistory, DELAY_PROFILES
+from paste_script.progress import CLI_FRAME_INTERVAL, UI_FRAME_INTERVAL
+from paste_script.engine import INPUT_METHODS, TypingEngine
+from paste_script.xlib import init_x_threads
 
-class AutoTyper:
+# tkinter 和 pynput 只在图形界面中按需导入，命令行模式不会加载它们
+
+class AutoTyper(TypingEngine):
+    """图形界面"""
+    
     def __init__(self):
-        self.is_typing = False
-        self.stop_requested = False
-        self.typing_thread = None
-        self.keyboard_listener = None
+        import tkinter as tk
+        
+        super().__init__()
         
+        # Tk 和后台线程共用 Xlib，要在 Tk 打开显示之前启用 Xlib 多线程支持
+        init_x_threads()
         # 创建主窗口
         self.root = tk.Tk()
         self.root.title("自动输入器 - 中文增强版")
@@ -31,19 +35,28 @@ class AutoTyper:
         # 创建界面组件
         self.setup_ui()
         
-        # 启动键盘监听器
-        if PYNPUT_AVAILABLE:
-            self.setup_keyboard_listener()
+        # 后台并行探测输入工具，与界面构建同时进行
+        probe_thread = threading.Thread(target=self.tools.probe)
+        probe_thread.daemon = True
+        probe_thread.start()
+        
+        # 在后台线程中导入 pynput 并启动键盘监听器，不推迟窗口首次绘制
+        listener_thread = threading.Thread(target=self.setup_keyboard_listener)
+        listener_thread.daemon = True
+        listener_thread.start()
         
         print("程序已启动!")
         print("- 点击'选择文件'按钮选择TXT文件并开始输入")
         print("- 完全支持中文和换行")
-        print("- 按数字键1停止输入")
-        print("- 按数字键2重新选择文件")
-        print("- 按数字键3关闭程序")
+        print("- 按 Ctrl+Alt+1 停止输入")
+        print("- 按 Ctrl+Alt+2 重新选择文件")
+        print("- 按 Ctrl+Alt+3 关闭程序")
+        print("- 按 Ctrl+Alt+4 继续上次中断的输入")
     
     def setup_ui(self):
         """设置用户界面"""
+        import tkinter as tk
+        
         frame = tk.Frame(self.root)
         frame.pack(pady=20)
         
@@ -63,6 +76,27 @@ class AutoTyper:
         )
         self.select_btn.pack(pady=10)
         
+        self.resume_btn = tk.Button(
+            frame,
+            text="继续上次输入",
+            command=self.resume_typing,
+            font=("Arial", 12),
+            width=18,
+            height=1,
+            bg="#2196F3",
+            fg="white"
+        )
+        self.resume_btn.pack(pady=5)
+        
+        queue_frame = tk.Frame(frame)
+        queue_frame.pack(pady=5)
+        self.queue_add_btn = tk.Button(queue_frame, text="加入队列", command=self.add_to_queue,
+                                       font=("Arial", 10), width=8)
+        self.queue_add_btn.pack(side="left", padx=2)
+        self.queue_run_btn = tk.Button(queue_frame, text="运行队列", command=self.start_queue,
+                                       font=("Arial", 10), width=8)
+        self.queue_run_btn.pack(side="left", padx=2)
+        
         self.stop_btn = tk.Button(
             frame,
             text="停止输入",
@@ -91,26 +125,24 @@ class AutoTyper:
         tk.Label(method_frame, text="输入方法:", font=("Arial", 10, "bold")).pack()
         
         self.method_var = tk.StringVar(value="auto")
-        methods = [
-            ("自动选择（推荐）", "auto"),
-            ("剪贴板方法", "clipboard"),
-            ("xdotool方法", "xdotool"),
-            ("逐字符输入", "char_by_char")
-        ]
-        
-        for text, value in methods:
+        for text, value in INPUT_METHODS:
             tk.Radiobutton(method_frame, text=text, variable=self.method_var, 
                           value=value, font=("Arial", 9)).pack(anchor="w")
         
+        self.lock_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(method_frame, text="锁定目标窗口（后台输入，不抢焦点）", variable=self.lock_var,
+                       font=("Arial", 9)).pack(anchor="w", pady=(5, 0))
+        
         # 添加键盘快捷键说明
         shortcut_frame = tk.Frame(frame)
         shortcut_frame.pack(pady=10)
         
         shortcuts = [
             "快捷键说明:",
-            "1 - 停止输入",
-            "2 - 重新选择文件", 
-            "3 - 关闭程序",
+            "Ctrl+Alt+1 - 停止输入",
+            "Ctrl+Alt+2 - 重新选择文件",
+            "Ctrl+Alt+3 - 关闭程序",
+            "Ctrl+Alt+4 - 继续上次输入",
             "",
             "支持功能:",
             "✓ 中文字符完美支持",
@@ -124,26 +156,40 @@ class AutoTyper:
             label.pack(anchor="w")
     
     def setup_keyboard_listener(self):
-        """设置全局键盘监听器"""
-        def on_press(key):
-            try:
-                if hasattr(key, 'char') and key.char:
-                    if key.char == '1':
-                        self.stop_typing()
-                    elif key.char == '2':
-                        self.restart_typing()
-                    elif key.char == '3':
-                        self.exit_program()
-            except AttributeError:
-                pass
-        
-        if PYNPUT_AVAILABLE:
-            self.keyboard_listener = keyboard.Listener(on_press=on_press)
-            self.keyboard_listener.daemon = True
-            self.keyboard_listener.start()
+        """设置全局快捷键：X11 下直接抓取组合键，否则用 pynput 的组合键监听"""
+        hotkeys = XHotkeys(self.hotkey_bindings())
+        if hotkeys.start():
+            self.keyboard_listener = hotkeys
+            return
+        
+        # 尝试导入 pynput 来处理全局快捷键
+        try:
+            from pynput import keyboard
+        except ImportError:
+            print("警告: pynput 未安装，快捷键功能将不可用")
+            print("可以运行 'pip install pynput' 来安装并启用快捷键功能")
+            return
+        
+        self.keyboard_listener = keyboard.GlobalHotKeys(
+            {pynput_hotkey(combo): callback for combo, callback in self.hotkey_bindings().items()})
+        self.keyboard_listener.daemon = True
+        self.keyboard_listener.start()
+    
+    def hotkey_bindings(self):
+        """组合键 -> 回调；快捷键在监听线程中触发，回调通过 after() 交给 Tk 线程执行"""
+        actions = {
+            "stop": self.stop_typing,
+            "restart": self.restart_typing,
+            "exit": self.exit_program,
+            "resume": self.resume_typing,
+        }
+        return {combo: (lambda callback=actions[action]: self.root.after(0, callback))
+                for combo, action in HOTKEYS.items()}
     
     def select_file_and_type(self):
         """选择文件并开始输入内容"""
+        from tkinter import filedialog, messagebox
+        
         if self.is_typing:
             messagebox.showwarning("警告", "已经在输入中，请等待完成或停止当前输入")
             return
@@ -158,27 +204,15 @@ class AutoTyper:
             return
             
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-                
-            # 预处理内容
-            processed_content = self.preprocess_content(content)
+            # 编码校验和读取都在输入线程中进行，不阻塞界面线程；编码错误在倒计时前弹窗报告
+            processed_content = StreamedContent(file_path)
             
             self.status_label.config(text=f"已选择: {os.path.basename(file_path)}")
             print(f"已选择文件: {file_path}")
-            print(f"文件大小: {len(processed_content)} 字符")
-            print(f"包含换行符: {processed_content.count(chr(10))} 个")
+            print(f"文件大小: {processed_content.size} 字节")
             print("3秒后开始输入...")
             
-            # 更新按钮状态
-            self.select_btn.config(state="disabled")
-            self.stop_btn.config(state="normal")
-            
-            # 在新线程中开始输入
-            self.is_typing = True
-            self.typing_thread = threading.Thread(target=self._start_typing, args=(processed_content,))
-            self.typing_thread.daemon = True
-            self.typing_thread.start()
+            self.start_content(processed_content)
             
         except Exception as e:
             error_msg = f"读取文件时出错: {e}"
@@ -186,397 +220,162 @@ class AutoTyper:
             self.status_label.config(text="文件读取失败")
             print(error_msg)
     
-    def preprocess_content(self, content):
-        """预处理内容，确保格式正确"""
-        # 统一换行符
-        content = content.replace('\r\n', '\n').replace('\r', '\n')
-        # 移除文件末尾的多余空白
-        content = content.rstrip()
-        return content
-    
-    def _start_typing(self, content):
-        """开始倒计时并输入"""
-        # 首先检测目标窗口
-        target_window = self.detect_target_window()
-        
-        for i in range(5, 0, -1):  # 增加到5秒给用户更多时间切换窗口
-            if self.stop_requested:
-                self._reset_ui()
-                return
-            status_text = f"{i}秒后开始输入...请切换到目标应用"
-            self.root.after(0, lambda t=status_text: self.status_label.config(text=t))
-            print(f"{i}秒后开始输入...请将光标放到目标文本编辑器中")
-            time.sleep(1)
-            
-        print("开始输入!")
-        self.root.after(0, lambda: self.status_label.config(text="正在输入中..."))
+    def resume_typing(self):
+        """用上次的输入方法从进度日志记录的位置继续输入"""
+        from tkinter import messagebox
         
-        # 确保目标窗口获得焦点
-        self.ensure_target_focus()
+        if self.is_typing:
+            messagebox.showwarning("警告", "已经在输入中，请等待完成或停止当前输入")
+            return
         
-        self.type_content(content)
+        file_path = self.journal.latest()
+        if not file_path:
+            self.status_label.config(text="没有可继续的输入")
+            return
+        # 核对文件哈希要读完整个文件，放到后台线程，结果交回界面线程
+        self.status_label.config(text=f"正在核对 {os.path.basename(file_path)}...")
+        thread = threading.Thread(target=self.find_resume_point, args=(file_path,))
+        thread.daemon = True
+        thread.start()
     
-    def type_content(self, content):
-        """在后台线程中输入内容"""
+    def find_resume_point(self, file_path):
+        """在后台线程中取继续输入的位置"""
         try:
-            method = self.method_var.get()
-            success = False
-            
-            if method == "auto":
-                # 自动选择最佳方法
-                success = self.smart_type_content(content)
-            elif method == "clipboard":
-                success = self.try_clipboard_method(content)
-            elif method == "xdotool":
-                success = self.try_xdotool_method(content)
-            elif method == "char_by_char":
-                success = self.type_char_by_char_enhanced(content)
-            
-            if not success and method != "auto":
-                print("选择的方法失败，尝试自动选择...")
-                success = self.smart_type_content(content)
-                
-        except Exception as e:
-            error_msg = f"输入过程中出错: {e}"
-            print(error_msg)
-            self.root.after(0, lambda: messagebox.showerror("错误", error_msg))
-        finally:
-            self.is_typing = False
-            self.root.after(0, self._reset_ui)
-            
-            if self.stop_requested:
-                print("输入已停止")
-                self.stop_requested = False
-            else:
-                print("输入完成!")
-                self.root.after(0, lambda: self.status_label.config(text="输入完成!"))
+            point, error = self.journal.resume_point(file_path), None
+        except OSError as e:
+            point, error = None, e
+        self.root.after(0, lambda: self.resume_from(file_path, point, error))
     
-    def smart_type_content(self, content):
-        """智能选择输入方法"""
-        methods = [
-            ("剪贴板方法", self.try_clipboard_method),
-            ("xdotool方法", self.try_xdotool_method),
-            ("增强逐字符方法", self.type_char_by_char_enhanced),
-            ("基础ydotool方法", self.try_basic_ydotool)
-        ]
+    def resume_from(self, file_path, point, error):
+        """按核对结果从中断处继续输入"""
+        from tkinter import messagebox
         
-        for method_name, method_func in methods:
-            try:
-                print(f"尝试 {method_name}...")
-                if method_func(content):
-                    print(f"{method_name} 成功!")
-                    return True
-            except Exception as e:
-                print(f"{method_name} 失败: {e}")
-                continue
-        
-        print("所有方法都失败了")
-        return False
-    
-    def try_clipboard_method(self, content):
-        """剪贴板方法 - 对中文和换行支持最好"""
+        if self.is_typing:
+            messagebox.showwarning("警告", "已经在输入中，请等待完成或停止当前输入")
+            return
+        if error:
+            self.status_label.config(text=f"无法继续: {error}")
+            return
+        if point is None:
+            self.status_label.config(text="文件已修改，请重新选择文件")
+            return
+        method, offset = point
         try:
-            clipboard_cmd = None
-            paste_cmd = None
-            
-            # 检查可用的剪贴板工具
-            for tool, cmd in [("xclip", ["xclip", "-selection", "clipboard"]), 
-                             ("wl-copy", ["wl-copy"]),
-                             ("xsel", ["xsel", "--clipboard", "--input"])]:
-                try:
-                    subprocess.run(["which", tool], check=True, capture_output=True)
-                    clipboard_cmd = cmd
-                    print(f"检测到 {tool}，使用剪贴板方法...")
-                    break
-                except subprocess.CalledProcessError:
-                    continue
-            
-            if not clipboard_cmd:
-                print("未找到剪贴板工具")
-                return False
-            
-            print(f"使用剪贴板输入 {len(content)} 字符，{content.count(chr(10))} 个换行符")
-            
-            # 备份当前剪贴板内容
-            original_clipboard = self.get_clipboard_content()
-            
-            # 将内容复制到剪贴板
-            process = subprocess.Popen(clipboard_cmd, stdin=subprocess.PIPE, text=True, encoding='utf-8')
-            process.communicate(input=content)
-            
-            if process.returncode != 0:
-                return False
-                
-            # 等待剪贴板设置完成
-            time.sleep(0.5)
-            
-            # 确保目标窗口激活
-            self.ensure_target_focus()
-            
-            # 尝试多种粘贴方法
-            paste_methods = [
-                # ydotool Ctrl+V
-                (["ydotool", "key", "29:1", "47:1", "47:0", "29:0"], "ydotool Ctrl+V"),
-                # xdotool Ctrl+V (如果可用)
-                (["xdotool", "key", "ctrl+v"], "xdotool Ctrl+V"),
-                # wtype (Wayland)
-                (["wtype", "-M", "ctrl", "-P", "v", "-m", "ctrl", "-p", "v"], "wtype Ctrl+V")
-            ]
-            
-            success = False
-            for paste_cmd, method_name in paste_methods:
-                try:
-                    # 检查工具是否可用
-                    tool_name = paste_cmd[0]
-                    subprocess.run(["which", tool_name], check=True, capture_output=True)
-                    
-                    # 执行粘贴前再次确保焦点
-                    time.sleep(0.2)
-                    
-                    # 执行粘贴
-                    result = subprocess.run(paste_cmd, check=True, capture_output=True, timeout=10)
-                    print(f"剪贴板粘贴成功 (使用 {method_name})")
-                    success = True
-                    break
-                    
-                except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
-                    print(f"{method_name} 失败: {e}")
-                    continue
-            
-            # 恢复原始剪贴板内容
-            if original_clipboard and success:
-                time.sleep(0.5)  # 等待粘贴完成
-                try:
-                    self.restore_clipboard_content(original_clipboard)
-                except:
-                    pass
-            
-            if not success:
-                print("所有粘贴方法都失败了")
-                
-            return success
-            
-        except Exception as e:
-            print(f"剪贴板方法失败: {e}")
-            return False
+            content = StreamedContent(file_path, start=offset)
+        except OSError as e:
+            self.status_label.config(text=f"无法继续: {e}")
+            return
+        
+        self.method_var.set(method)
+        self.status_label.config(text=f"继续输入: {os.path.basename(file_path)}，从第 {offset} 个字符开始")
+        print(f"继续输入文件: {file_path}，方法 {method}，从第 {offset} 个字符开始")
+        self.start_content(content)
     
-    def get_clipboard_content(self):
-        """获取当前剪贴板内容"""
-        try:
-            # 尝试不同的剪贴板读取工具
-            for tool, cmd in [("xclip", ["xclip", "-selection", "clipboard", "-o"]),
-                             ("wl-paste", ["wl-paste"]),
-                             ("xsel", ["xsel", "--clipboard", "--output"])]:
-                try:
-                    subprocess.run(["which", tool], check=True, capture_output=True)
-                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=2)
-                    if result.returncode == 0:
-                        return result.stdout
-                except:
-                    continue
-        except:
-            pass
-        return None
+    def add_to_queue(self):
+        """选择一个或多个文件，以当前输入方法加入任务队列；编码在运行任务时校验，不阻塞界面线程"""
+        from tkinter import filedialog
+        
+        paths = filedialog.askopenfilenames(
+            title="选择要加入队列的文件",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        for path in paths:
+            job = self.job_queue.add(path, method=self.method_var.get())
+            print(f"已加入队列: {JobQueue.describe(job)}")
+        if paths:
+            pending = sum(job["state"] == "pending" for job in self.job_queue.jobs())
+            self.status_label.config(text=f"队列中有 {pending} 个待输入任务")
     
-    def restore_clipboard_content(self, content):
-        """恢复剪贴板内容"""
-        try:
-            for tool, cmd in [("xclip", ["xclip", "-selection", "clipboard"]),
-                             ("wl-copy", ["wl-copy"]),
-                             ("xsel", ["xsel", "--clipboard", "--input"])]:
-                try:
-                    subprocess.run(["which", tool], check=True, capture_output=True)
-                    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, text=True, encoding='utf-8')
-                    process.communicate(input=content)
-                    if process.returncode == 0:
-                        break
-                except:
-                    continue
-        except:
-            pass
+    def start_queue(self):
+        """依次输入队列中的任务：倒计时只在第一个未指定窗口的任务之前进行一次"""
+        from tkinter import messagebox
+        
+        if self.is_typing or self.queue_running:
+            messagebox.showwarning("警告", "已经在输入中，请等待完成或停止当前输入")
+            return
+        if self.job_queue.next_job() is None:
+            self.status_label.config(text="队列中没有待输入的任务")
+            return
+        self.start_content(None)
     
-    def try_xdotool_method(self, content):
-        """xdotool方法"""
-        try:
-            subprocess.run(["which", "xdotool"], check=True, capture_output=True)
-            print("使用 xdotool 直接输入...")
-            
-            # 确保目标窗口激活
-            self.ensure_target_focus()
-            
-            # 分段输入以提高稳定性
-            lines = content.split('\n')
-            total_lines = len(lines)
-            
-            for i, line in enumerate(lines):
-                if self.stop_requested:
-                    break
-                    
-                # 更新进度
-                progress = f"xdotool输入进度: {i+1}/{total_lines} 行"
-                self.root.after(0, lambda p=progress: self.status_label.config(text=p))
-                
-                # 在每行输入前短暂延迟，确保应用响应
-                time.sleep(0.1)
-                
-                if line.strip() or i == 0:  # 非空行或第一行（即使为空也要处理）
-                    try:
-                        # 使用 xdotool 输入文本，增加延迟以提高兼容性
-                        subprocess.run(["xdotool", "type", "--delay", "80", "--clearmodifiers", line], 
-                                     check=True, capture_output=True, text=True, timeout=60)
-                    except subprocess.TimeoutExpired:
-                        print(f"第 {i+1} 行输入超时，跳过")
-                        continue
-                    except subprocess.CalledProcessError as e:
-                        print(f"第 {i+1} 行输入失败: {e}")
-                        # 尝试逐字符输入这一行
-                        self.xdotool_type_char_by_char(line)
-                
-                # 如果不是最后一行，添加换行
-                if i < total_lines - 1:
-                    try:
-                        subprocess.run(["xdotool", "key", "--clearmodifiers", "Return"], 
-                                     check=True, capture_output=True, timeout=5)
-                    except:
-                        # 如果按键失败，尝试输入换行字符
-                        try:
-                            subprocess.run(["xdotool", "type", "\n"], 
-                                         check=True, capture_output=True, timeout=5)
-                        except:
-                            print(f"第 {i+1} 行换行失败")
-                    
-                    time.sleep(0.1)
-            
-            print("xdotool 输入成功")
-            return True
-            
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
-            print(f"xdotool 方法失败: {e}")
-            return False
+    def start_content(self, content):
+        """更新按钮状态并在新线程中开始输入；content 为 None 时运行任务队列"""
+        self.target_lock = self.lock_var.get()
+        self.select_btn.config(state="disabled")
+        self.resume_btn.config(state="disabled")
+        self.queue_add_btn.config(state="disabled")
+        self.queue_run_btn.config(state="disabled")
+        self.stop_btn.config(state="normal")
+        
+        self.is_typing = True
+        if content is None:
+            self.queue_running = True
+            self.typing_thread = threading.Thread(target=self.run_queue_and_reset)
+        else:
+            self.typing_thread = threading.Thread(target=self.start_typing_async, args=(content,))
+        self.typing_thread.daemon = True
+        self.typing_thread.start()
+        self.root.after(UI_FRAME_INTERVAL, self.poll_progress)
     
-    def xdotool_type_char_by_char(self, text):
-        """使用xdotool逐字符输入"""
-        for char in text:
-            if self.stop_requested:
-                break
-            try:
-                subprocess.run(["xdotool", "type", "--delay", "100", char], 
-                             check=True, capture_output=True, timeout=5)
-            except:
-                print(f"字符输入失败: {repr(char)}")
-            time.sleep(0.05)
+    def run_queue_and_reset(self):
+        """运行任务队列，全部结束后恢复界面"""
+        completed = self.run_queue()
+        self.root.after(0, self._reset_ui)
+        self.report_status(f"队列结束，完成 {completed} 个任务")
     
-    def type_char_by_char_enhanced(self, content):
-        """增强的逐字符输入方法"""
-        try:
-            print(f"使用增强逐字符方法输入 {len(content)} 字符...")
-            
-            for i, char in enumerate(content):
-                if self.stop_requested:
-                    break
-                
-                # 每20个字符更新进度
-                if i % 20 == 0:
-                    progress = f"逐字符输入: {i+1}/{len(content)}"
-                    self.root.after(0, lambda p=progress: self.status_label.config(text=p))
-                
-                success = False
-                
-                if char == '\n':
-                    # 换行符处理
-                    for method in [
-                        ["ydotool", "key", "28:1", "28:0"],
-                        ["xdotool", "key", "Return"],
-                        ["wtype", "-k", "Return"]
-                    ]:
-                        try:
-                            subprocess.run(method, check=True, capture_output=True, timeout=2)
-                            success = True
-                            break
-                        except:
-                            continue
-                    
-                    if success:
-                        time.sleep(0.15)  # 换行后稍作停顿
-                else:
-                    # 普通字符处理
-                    # 方法1: 尝试直接输入
-                    for tool_cmd in [
-                        ["ydotool", "type", char],
-                        ["xdotool", "type", "--delay", "80", char],
-                        ["wtype", char]
-                    ]:
-                        try:
-                            result = subprocess.run(tool_cmd, check=True, capture_output=True, timeout=3)
-                            success = True
-                            break
-                        except:
-                            continue
-                    
-                    # 方法2: 如果直接输入失败，尝试临时文件方法
-                    if not success and ord(char) > 127:  # 中文字符
-                        try:
-                            with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', 
-                                                           suffix='.txt', delete=False) as temp_file:
-                                temp_file.write(char)
-                                temp_path = temp_file.name
-                            
-                            subprocess.run(["ydotool", "type", "--file", temp_path, "--key-delay", "100"], 
-                                         check=True, capture_output=True, timeout=5)
-                            os.unlink(temp_path)
-                            success = True
-                        except:
-                            pass
-                
-                if not success:
-                    print(f"跳过字符: {repr(char)}")
-                
-                time.sleep(0.08)  # 字符间延迟
-            
-            return True
-            
-        except Exception as e:
-            print(f"增强逐字符方法失败: {e}")
-            return False
+    def poll_progress(self):
+        """按固定帧率读取进度通道刷新状态栏，输入结束后停止"""
+        if not self.is_typing and not self.queue_running:
+            return
+        text = self.describe_progress()
+        if text and self.current_job:
+            text = f"任务 {self.current_job['id']} {os.path.basename(self.current_job['path'])} - {text}"
+        if text and not self.stop_requested:
+            self.status_label.config(text=text)
+        self.root.after(UI_FRAME_INTERVAL, self.poll_progress)
     
-    def try_basic_ydotool(self, content):
-        """基础ydotool方法"""
-        try:
-            print("使用基础 ydotool 方法...")
-            
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', suffix='.txt', delete=False) as temp_file:
-                temp_file.write(content)
-                temp_path = temp_file.name
-            
-            # 使用 ydotool 输入
-            subprocess.run(["ydotool", "type", "--file", temp_path, "--key-delay", "100"], 
-                         check=True, capture_output=True, text=True, timeout=60)
-            
-            os.unlink(temp_path)
-            print("基础 ydotool 方法成功")
-            return True
-            
-        except Exception as e:
-            print(f"基础 ydotool 方法失败: {e}")
-            return False
+    def get_method(self):
+        """界面上选择的输入方法（队列任务使用任务自己的方法）"""
+        if self.current_job:
+            return self.current_job["method"]
+        return self.method_var.get()
+    
+    def report_status(self, text):
+        """在状态栏显示（可在后台线程调用）"""
+        self.root.after(0, lambda t=text: self.status_label.config(text=t))
+    
+    def report_error(self, message):
+        """弹窗显示错误"""
+        from tkinter import messagebox
+        self.root.after(0, lambda: messagebox.showerror("错误", message))
+    
+    def on_finished(self, stopped):
+        """输入结束后恢复界面（运行队列时等全部任务结束再恢复）"""
+        if self.queue_running:
+            return
+        self.root.after(0, self._reset_ui)
+        if not stopped:
+            self.report_status("输入完成!")
     
     def _reset_ui(self):
         """重置UI状态"""
         self.select_btn.config(state="normal")
+        self.resume_btn.config(state="normal")
+        self.queue_add_btn.config(state="normal")
+        self.queue_run_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
         if not self.is_typing and not self.stop_requested:
             self.status_label.config(text="等待选择文件...")
     
     def stop_typing(self):
         """停止输入"""
-        if self.is_typing:
+        if self.is_typing or self.queue_running:
             print("正在停止输入...")
-            self.stop_requested = True
+            self.request_stop()
             self.status_label.config(text="正在停止...")
         else:
             print("当前没有正在进行的输入")
-
+    
     def restart_typing(self):
         """重新选择文件"""
         if self.is_typing:
@@ -590,13 +389,12 @@ class AutoTyper:
         print("正在关闭程序...")
         self.cleanup()
         self.root.quit()
-
+    
     def cleanup(self):
         """清理资源"""
-        self.stop_requested = True
-        self.is_typing = False
         if self.keyboard_listener:
             self.keyboard_listener.stop()
+        super().cleanup()
         print("程序已退出")
     
     def run(self):
@@ -615,9 +413,10 @@ class AutoTyper:
         print("✓ 终端: GNOME Terminal, Konsole")
         print("✓ 其他: Telegram, QQ, 微信等")
         print("\n快捷键:")
-        print("- 按数字键1: 停止输入")
-        print("- 按数字键2: 重新选择文件")
-        print("- 按数字键3: 关闭程序")
+        print("- Ctrl+Alt+1: 停止输入")
+        print("- Ctrl+Alt+2: 重新选择文件")
+        print("- Ctrl+Alt+3: 关闭程序")
+        print("- Ctrl+Alt+4: 继续上次中断的输入")
         print("\n中文输入增强:")
         print("- 自动检测最佳输入方法")
         print("- 完美支持中文字符")
@@ -626,16 +425,36 @@ class AutoTyper:
         print("- 跨应用程序支持")
         print("- 实时进度显示")
         
+        print("\n重要提示:")
+        print("- 程序启动后有5秒时间切换到目标应用")
+        print("- 确保目标应用窗口处于活动状态")
+        print("- 对于某些应用，可能需要先点击文本输入区域")
+        print("- 如果输入异常，请尝试不同的输入方法")
+        
+        # 工具探测在后台完成后再输出结果，不阻塞窗口显示
+        report_thread = threading.Thread(target=self.print_tool_report)
+        report_thread.daemon = True
+        report_thread.start()
+        
+        try:
+            self.root.mainloop()
+        except KeyboardInterrupt:
+            print("\n程序被用户中断")
+        except Exception as e:
+            print(f"程序运行出错: {e}")
+        finally:
+            self.cleanup()
+    
+    def print_tool_report(self):
+        """输出可用工具检测结果"""
         # 检测可用工具
         print("\n检测可用工具:")
-        tools = ["ydotool", "xdotool", "xclip", "wl-copy", "wtype"]
         available_count = 0
-        for tool in tools:
-            try:
-                subprocess.run(["which", tool], check=True, capture_output=True)
+        for tool, info in self.tools.probe().items():
+            if info["available"]:
                 print(f"✓ {tool} - 可用")
                 available_count += 1
-            except subprocess.CalledProcessError:
+            else:
                 print(f"✗ {tool} - 不可用")
         
         if available_count == 0:
@@ -649,72 +468,205 @@ class AutoTyper:
             print("推荐命令: sudo apt install xdotool xclip")
         else:
             print(f"\n✅ 检测到 {available_count} 个工具，兼容性良好!")
-        
-        print("\n重要提示:")
-        print("- 程序启动后有5秒时间切换到目标应用")
-        print("- 确保目标应用窗口处于活动状态")
-        print("- 对于某些应用，可能需要先点击文本输入区域")
-        print("- 如果输入异常，请尝试不同的输入方法")
-        
-        try:
-            self.root.mainloop()
-        except KeyboardInterrupt:
-            print("\n程序被用户中断")
-        except Exception as e:
-            print(f"程序运行出错: {e}")
-        finally:
-            self.cleanup()
 
-    def detect_target_window(self):
-        """检测目标窗口"""
-        try:
-            # 尝试使用 xdotool 获取当前活动窗口
-            result = subprocess.run(["xdotool", "getactivewindow"], 
-                                  capture_output=True, text=True, check=True)
-            window_id = result.stdout.strip()
-            print(f"检测到活动窗口ID: {window_id}")
-            
-            # 获取窗口信息
-            result = subprocess.run(["xdotool", "getwindowname", window_id], 
-                                  capture_output=True, text=True, check=True)
-            window_name = result.stdout.strip()
-            print(f"当前活动窗口: {window_name}")
-            
-            return {"id": window_id, "name": window_name}
-        except:
-            print("无法检测活动窗口，将使用通用方法")
-            return None
+
+class ConsoleTyper(TypingEngine):
+    """命令行模式：进度输出到标准错误"""
+
+    # 为 True 时每帧输出一行 JSON 进度快照，供日志和其他程序读取
+    progress_json = False
+
+    def report_status(self, text):
+        if self.progress_json:
+            return
+        sys.stderr.write(f"\r{text}\033[K")
+        sys.stderr.flush()
+
+    def watch_progress(self):
+        """按 CLI_FRAME_INTERVAL 读取进度通道并输出"""
+        while self.is_typing or self.queue_running:
+            time.sleep(CLI_FRAME_INTERVAL)
+            if self.progress_json:
+                snapshot = self.progress.snapshot()
+                snapshot["target_cps"] = round(self.rate.cps, 2)
+                if snapshot["backend"]:
+                    sys.stderr.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+                    sys.stderr.flush()
+            else:
+                text = self.describe_progress()
+                if text:
+                    self.report_status(text)
+
+    def on_finished(self, stopped):
+        sys.stderr.write("\n")
+
+
+def cli_main(argv):
+    """命令行入口：mouse.py type FILE --method xdotool --delay-profile fast"""
+    import argparse
     
-    def ensure_target_focus(self):
-        """确保目标窗口获得焦点"""
-        try:
-            # 方法1: 使用鼠标点击来激活窗口
-            print("尝试激活目标窗口...")
-            
-            # 获取鼠标当前位置附近的窗口
-            mouse_result = subprocess.run(["xdotool", "getmouselocation", "--shell"], 
-                                        capture_output=True, text=True, check=True)
-            
-            # 轻微移动鼠标以确保窗口激活
-            subprocess.run(["xdotool", "mousemove_relative", "1", "1"], 
-                         capture_output=True, check=True)
-            subprocess.run(["xdotool", "mousemove_relative", "-1", "-1"], 
-                         capture_output=True, check=True)
-            
-            # 点击当前位置来激活窗口
-            subprocess.run(["xdotool", "click", "1"], 
-                         capture_output=True, check=True)
-            
-            time.sleep(0.2)  # 等待窗口激活
-            print("窗口激活完成")
-            
-        except Exception as e:
-            print(f"窗口激活失败: {e}")
-            print("请手动确保目标应用处于活动状态")
+    parser = argparse.ArgumentParser(prog="mouse.py", description="自动输入器命令行模式（不加载 tkinter/pynput）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    type_parser = subparsers.add_parser("type", help="把文件内容输入到当前活动窗口")
+    type_parser.add_argument("file", help="要输入的文本文件")
+    type_parser.add_argument("--method", choices=[value for _, value in INPUT_METHODS], default="auto",
+                             help="输入方法（默认自动选择）")
+    type_parser.add_argument("--delay-profile", choices=sorted(DELAY_PROFILES), default="normal",
+                             help="速率档位")
+    type_parser.add_argument("--countdown", type=int, default=5, help="开始前的倒计时秒数")
+    type_parser.add_argument("--report", help="JSON 运行报告路径（默认写入缓存目录的 last_run.json）")
+    type_parser.add_argument("--prometheus", help="同时写入 Prometheus textfile 的路径")
+    type_parser.add_argument("--profile", help="用 cProfile 分析本次运行并保存到该路径")
+    type_parser.add_argument("--editor", choices=["auto", "plain"] + [profile.name for profile in EDITOR_PROFILES],
+                             default="auto", help="目标编辑器配置，省掉编辑器自动产生的缩进和右括号（默认按窗口标题选择）")
+    type_parser.add_argument("--lock-window", action="store_true",
+                             help="倒计时结束时锁定活动窗口，之后直接向它发送按键，可以切换到其他窗口")
+    type_parser.add_argument("--progress-json", action="store_true",
+                             help="进度以每行一个 JSON 快照输出到标准错误（供日志/其他程序读取）")
+    type_parser.add_argument("--resume", action="store_true",
+                             help="用上次的输入方法从中断处继续（进度日志中没有记录时从头开始）")
     
+    queue_parser = subparsers.add_parser("queue", help="管理和运行多文件任务队列")
+    queue_actions = queue_parser.add_subparsers(dest="action", required=True)
+    add_parser = queue_actions.add_parser("add", help="加入任务")
+    add_parser.add_argument("files", nargs="+", help="要输入的文本文件")
+    add_parser.add_argument("--method", choices=[value for _, value in INPUT_METHODS], default="auto",
+                            help="输入方法（默认自动选择）")
+    add_parser.add_argument("--window", help="目标窗口 ID（xdotool search 的结果）；不指定时倒计时选择，之后的任务沿用")
+    add_parser.add_argument("--priority", type=int, default=0, help="优先级，数值大的先输入")
+    queue_actions.add_parser("list", help="列出任务、进度和吞吐")
+    remove_parser = queue_actions.add_parser("remove", help="删除任务")
+    remove_parser.add_argument("ids", nargs="+", type=int)
+    queue_actions.add_parser("clear", help="删除已完成和失败的任务")
+    run_parser = queue_actions.add_parser("run", help="依次输入队列中等待的任务")
+    run_parser.add_argument("--delay-profile", choices=sorted(DELAY_PROFILES), default="normal",
+                            help="速率档位")
+    run_parser.add_argument("--countdown", type=int, default=5,
+                            help="第一个未指定窗口的任务之前的倒计时秒数")
+    run_parser.add_argument("--editor", choices=["auto", "plain"] + [profile.name for profile in EDITOR_PROFILES],
+                            default="auto", help="目标编辑器配置（默认按窗口标题选择）")
+    run_parser.add_argument("--progress-json", action="store_true",
+                            help="进度以每行一个 JSON 快照输出到标准错误")
+    history_parser = subparsers.add_parser("history", help="查看各目标程序上各输入方法的成功率和吞吐")
+    history_parser.add_argument("target", nargs="?", help="目标程序（窗口类名），默认列出全部")
+    args = parser.parse_args(argv)
+    if args.command == "queue":
+        return cli_queue(args)
+    if args.command == "history":
+        history = BackendHistory()
+        targets = [args.target.lower()] if args.target else sorted(history.load())
+        for target in targets:
+            print(f"{target}:")
+            for line in history.describe(target) or ["没有记录"]:
+                print(f"  {line}")
+        return 0
+    
+    method = args.method
+    try:
+        start = 0
+        if args.resume:
+            point = ProgressJournal().resume_point(args.file)
+            if point:
+                method, start = point
+                print(f"从第 {start} 个字符继续输入（方法 {method}）", file=sys.stderr)
+            else:
+                print("没有可继续的记录，从头开始输入", file=sys.stderr)
+        content = StreamedContent(args.file, start=start)
+        content.scan()
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"读取文件时出错: {e}", file=sys.stderr)
+        return 2
+    
+    typer = ConsoleTyper(method=method, delay_profile=args.delay_profile)
+    typer.target_lock = args.lock_window
+    if args.editor != "auto":
+        typer.editor_choice = args.editor
+    typer.progress_json = args.progress_json
+    if args.report:
+        typer.report_path = args.report
+    if args.prometheus:
+        typer.prometheus_path = args.prometheus
+    if args.profile:
+        typer.profile_path = args.profile
+    typer.is_typing = True
+    watcher = threading.Thread(target=typer.watch_progress)
+    watcher.daemon = True
+    watcher.start()
+    try:
+        typer.start_typing_async(content, countdown=args.countdown)
+    except KeyboardInterrupt:
+        typer.request_stop()
+        print("\n输入被用户中断", file=sys.stderr)
+        return 130
+    finally:
+        typer.cleanup()
+    return 0 if typer.last_success else 1
+
+
+def cli_queue(args):
+    """命令行任务队列：mouse.py queue add|list|remove|clear|run"""
+    queue = JobQueue()
+    if args.action == "add":
+        for path in args.files:
+            try:
+                check_utf8(path)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"读取文件时出错: {path}: {e}", file=sys.stderr)
+                return 2
+        for path in args.files:
+            job = queue.add(path, method=args.method, window=args.window, priority=args.priority)
+            print(JobQueue.describe(job))
+        return 0
+    if args.action == "list":
+        jobs = queue.jobs()
+        if not jobs:
+            print("队列为空")
+        for job in jobs:
+            print(JobQueue.describe(job))
+        return 0
+    if args.action == "remove":
+        missing = [job_id for job_id in args.ids if not queue.remove(job_id)]
+        for job_id in missing:
+            print(f"没有任务 {job_id}", file=sys.stderr)
+        return 1 if missing else 0
+    if args.action == "clear":
+        print(f"已删除 {queue.clear()} 个任务")
+        return 0
+    
+    typer = ConsoleTyper(delay_profile=args.delay_profile)
+    typer.job_queue = queue
+    typer.progress_json = args.progress_json
+    if args.editor != "auto":
+        typer.editor_choice = args.editor
+    typer.queue_running = True
+    watcher = threading.Thread(target=typer.watch_progress)
+    watcher.daemon = True
+    watcher.start()
+    try:
+        completed = typer.run_queue(countdown=args.countdown)
+    except KeyboardInterrupt:
+        typer.request_stop()
+        print("\n输入被用户中断，未完成的任务留在队列中", file=sys.stderr)
+        return 130
+    finally:
+        typer.cleanup()
+    print(f"完成 {completed} 个任务", file=sys.stderr)
+    unfinished = [job for job in queue.jobs() if job["state"] in ("pending", "failed")]
+    return 1 if unfinished else 0
+
+
 def main():
-    typer = AutoTyper()
-    typer.run()
+    # 先启动进程启动助手，此时还没有加载 tkinter、监听线程和文件内容
+    start_spawn_helper()
+    try:
+        if len(sys.argv) > 1:
+            sys.exit(cli_main(sys.argv[1:]))
+        typer = AutoTyper()
+        typer.run()
+    finally:
+        if spawn_helper():
+            spawn_helper().close()
+
 
 if __name__ == "__main__":
     main()
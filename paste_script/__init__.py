@@ -0,0 +1 @@
+"""自动输入器的核心模块；图形界面和命令行入口在 mouse.py"""
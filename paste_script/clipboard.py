@@ -0,0 +1,553 @@
+"""剪贴板：进程内持有的 X 剪贴板和外部剪贴板工具的分块暂存"""
+import subprocess
+import threading
+import time
+import os
+import queue
+import ctypes
+import ctypes.util
+import collections
+
+from .xlib import XEvent, init_x_threads
+
+class ClipboardStager:
+    """提前启动剪贴板工具并写入下一块内容，关闭 stdin 时才真正占有剪贴板"""
+
+    def __init__(self, clipboard_cmd, metrics=None):
+        self.clipboard_cmd = clipboard_cmd
+        self.metrics = metrics
+        self.process = None
+        self.writer = None
+        self.error = None
+
+    def stage(self, text):
+        """启动剪贴板工具并在后台写入内容（不关闭 stdin）"""
+        started = time.perf_counter()
+        self.process = subprocess.Popen(self.clipboard_cmd, stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if self.metrics:
+            self.metrics.record(self.clipboard_cmd[0], "spawn", time.perf_counter() - started)
+        self.writer = threading.Thread(target=self._write, args=(text.encode('utf-8'),))
+        self.writer.daemon = True
+        self.writer.start()
+
+    def _write(self, data):
+        """写入数据"""
+        try:
+            self.process.stdin.write(data)
+            self.process.stdin.flush()
+        except OSError as e:
+            self.error = e
+
+    def commit(self, timeout=10):
+        """结束写入，让剪贴板工具占有剪贴板"""
+        if self.process is None:
+            return False
+        self.writer.join(timeout)
+        process = self.process
+        self.process = None
+        try:
+            process.stdin.close()
+            process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"剪贴板写入失败: {e}")
+            process.kill()
+            return False
+        return self.error is None and process.returncode == 0
+
+    def abort(self):
+        """放弃尚未提交的暂存内容"""
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+        self.process = None
+
+# X 选择协议常量
+X_PROPERTY_NOTIFY = 28
+
+X_SELECTION_CLEAR = 29
+
+X_SELECTION_REQUEST = 30
+
+X_SELECTION_NOTIFY = 31
+
+X_PROPERTY_NEW_VALUE = 0
+
+X_PROPERTY_DELETE = 1
+
+X_PROPERTY_CHANGE_MASK = 1 << 22
+
+X_PROP_MODE_REPLACE = 0
+
+XA_ATOM = 4
+
+XA_STRING = 31
+
+# 等待其他程序应答一次选择转换的最长时间（秒）和整个备份的时间预算（秒）
+CLIPBOARD_TIMEOUT = 1.0
+
+CLIPBOARD_BACKUP_BUDGET = 3.0
+
+# 粘贴后等待目标应用取走剪贴板内容的最长时间（秒），超时后照常继续
+PASTE_CONSUME_TIMEOUT = 2.0
+
+# X 服务器分配给每个客户端的资源 ID 段（窗口 ID 的低位），高位相同的窗口属于同一个客户端
+X_CLIENT_ID_MASK = 0x1FFFFF
+
+# 保留最近多少次内容请求的请求方，用于判断是不是目标应用取走了粘贴内容
+SERVED_HISTORY = 64
+
+# 只描述选择本身、不承载内容的目标，备份时跳过
+CLIPBOARD_META_TARGETS = ("TARGETS", "MULTIPLE", "TIMESTAMP", "SAVE_TARGETS", "DELETE",
+                          "INSERT_SELECTION", "INSERT_PROPERTY")
+
+# 写入文本时提供的目标（都是 UTF-8 字节）
+CLIPBOARD_TEXT_TARGETS = ("UTF8_STRING", "text/plain;charset=utf-8", "TEXT")
+
+class XClipboard:
+    """进程内持有 X 剪贴板：后台线程作为 CLIPBOARD 选择的所有者直接应答粘贴请求；
+    第一次写入前才把原剪贴板提供的全部目标按原始字节备份，结束后原样恢复，不启动任何外部工具"""
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self.x11 = None
+        self.display = None
+        self.window = 0
+        self.atoms = {}
+        self.thread = None
+        self.running = False
+        self.commands = queue.Queue()
+        self.wake_read = self.wake_write = None
+        # 单次 ChangeProperty 可写入的最大字节数，超过时用 INCR 分段发送
+        self.max_chunk = 0
+        # 当前提供的目标：{目标原子: (类型原子, 格式, 原始数据, 元素数)}
+        self.offers = {}
+        self.owned = False
+        # 进行中的 INCR 发送：{(请求方窗口, 属性原子): [类型原子, 格式, 原始数据, 已发送字节数]}
+        self.transfers = {}
+        # 写入前备份的原剪贴板，None 表示本次会话还没有备份
+        self.saved = None
+        self.backup_pending = False
+        # 已完成的内容请求数（不含 TARGETS，INCR 传输在最后一段发出后才计入）
+        self.served = 0
+        # 最近的内容请求：(序号, 请求方窗口)，剪贴板管理器等其他程序的请求也在其中
+        self.served_by = collections.deque(maxlen=SERVED_HISTORY)
+        self.served_changed = threading.Condition()
+
+    def open(self):
+        """连接 X 显示并启动选择所有者线程，失败返回 False"""
+        if not os.environ.get("DISPLAY"):
+            return False
+        x11_path = ctypes.util.find_library("X11")
+        if not x11_path:
+            return False
+        try:
+            self.x11 = x11 = ctypes.cdll.LoadLibrary(x11_path)
+        except OSError as e:
+            print(f"加载 X11 库失败: {e}")
+            return False
+        init_x_threads()
+
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XFlush.argtypes = [ctypes.c_void_p]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        x11.XConnectionNumber.argtypes = [ctypes.c_void_p]
+        x11.XPending.argtypes = [ctypes.c_void_p]
+        x11.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.POINTER(XEvent)]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XCreateSimpleWindow.restype = ctypes.c_ulong
+        x11.XCreateSimpleWindow.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.c_int,
+                                            ctypes.c_uint, ctypes.c_uint, ctypes.c_uint,
+                                            ctypes.c_ulong, ctypes.c_ulong]
+        x11.XSelectInput.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_long]
+        x11.XInternAtom.restype = ctypes.c_ulong
+        x11.XInternAtom.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int]
+        x11.XGetAtomName.restype = ctypes.c_void_p
+        x11.XGetAtomName.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+        x11.XGetSelectionOwner.restype = ctypes.c_ulong
+        x11.XGetSelectionOwner.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+        x11.XSetSelectionOwner.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_ulong]
+        x11.XConvertSelection.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_ulong,
+                                          ctypes.c_ulong, ctypes.c_ulong]
+        x11.XGetWindowProperty.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_long,
+                                           ctypes.c_long, ctypes.c_int, ctypes.c_ulong,
+                                           ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_int),
+                                           ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_ulong),
+                                           ctypes.POINTER(ctypes.c_void_p)]
+        x11.XChangeProperty.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_ulong,
+                                        ctypes.c_int, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+        x11.XDeleteProperty.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong]
+        x11.XSendEvent.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.c_long,
+                                   ctypes.POINTER(XEvent)]
+        x11.XExtendedMaxRequestSize.restype = ctypes.c_long
+        x11.XExtendedMaxRequestSize.argtypes = [ctypes.c_void_p]
+        x11.XMaxRequestSize.restype = ctypes.c_long
+        x11.XMaxRequestSize.argtypes = [ctypes.c_void_p]
+
+        self.display = x11.XOpenDisplay(None)
+        if not self.display:
+            return False
+        root = x11.XDefaultRootWindow(self.display)
+        self.window = x11.XCreateSimpleWindow(self.display, root, 0, 0, 1, 1, 0, 0, 0)
+        x11.XSelectInput(self.display, self.window, X_PROPERTY_CHANGE_MASK)
+        for name in ("CLIPBOARD", "TARGETS", "TIMESTAMP", "INCR", "UTF8_STRING", "PASTE_SCRIPT_SELECTION",
+                     "CLIPBOARD_MANAGER", "SAVE_TARGETS") + CLIPBOARD_TEXT_TARGETS:
+            self.atoms[name] = x11.XInternAtom(self.display, name.encode(), 0)
+        # 最大请求长度以 4 字节为单位，留出请求头的余量
+        max_request = x11.XExtendedMaxRequestSize(self.display) or x11.XMaxRequestSize(self.display)
+        self.max_chunk = max(4096, max_request * 4 - 1024)
+        x11.XFlush(self.display)
+
+        self.wake_read, self.wake_write = os.pipe()
+        os.set_blocking(self.wake_read, False)
+        self.running = True
+        self.thread = threading.Thread(target=self._loop)
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+    # ---- 后台线程：所有 Xlib 调用都在这里进行 ----
+
+    def call(self, func, *args):
+        """在选择所有者线程中执行 func 并返回结果"""
+        if threading.current_thread() is self.thread:
+            return func(*args)
+        done = threading.Event()
+        result = {}
+        self.commands.put((func, args, done, result))
+        os.write(self.wake_write, b"x")
+        done.wait()
+        if "error" in result:
+            raise result["error"]
+        return result.get("value")
+
+    def _loop(self):
+        """处理 X 事件和其他线程提交的命令"""
+        import select
+        fd = self.x11.XConnectionNumber(self.display)
+        while self.running:
+            self._dispatch_pending()
+            self._run_commands()
+            if not self.running:
+                break
+            select.select([fd, self.wake_read], [], [], 0.5)
+
+    def _run_commands(self):
+        """执行排队的命令"""
+        try:
+            os.read(self.wake_read, 4096)
+        except BlockingIOError:
+            pass
+        while True:
+            try:
+                func, args, done, result = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result["value"] = func(*args)
+            except Exception as e:
+                result["error"] = e
+            done.set()
+
+    def _dispatch_pending(self):
+        """处理所有已到达的事件"""
+        while self.x11.XPending(self.display):
+            event = XEvent()
+            self.x11.XNextEvent(self.display, ctypes.byref(event))
+            self._handle(event)
+
+    def _wait_event(self, predicate, timeout):
+        """等待满足 predicate 的事件，期间照常应答其他请求，超时返回 None"""
+        import select
+        fd = self.x11.XConnectionNumber(self.display)
+        deadline = time.time() + timeout
+        while True:
+            while self.x11.XPending(self.display):
+                event = XEvent()
+                self.x11.XNextEvent(self.display, ctypes.byref(event))
+                if predicate(event):
+                    return event
+                self._handle(event)
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            select.select([fd], [], [], remaining)
+
+    def _handle(self, event):
+        """应答粘贴请求、处理失去所有权和 INCR 分段发送"""
+        if event.type == X_SELECTION_REQUEST:
+            self._serve(event.xselectionrequest)
+        elif event.type == X_SELECTION_CLEAR:
+            if event.xselectionclear.selection == self.atoms["CLIPBOARD"]:
+                # 其他程序写入了剪贴板
+                self.owned = False
+                self.offers = {}
+        elif event.type == X_PROPERTY_NOTIFY and event.xproperty.state == X_PROPERTY_DELETE:
+            key = (event.xproperty.window, event.xproperty.atom)
+            if key in self.transfers:
+                self._send_chunk(key)
+
+    def _serve(self, request):
+        """应答一次 SelectionRequest"""
+        x11, display = self.x11, self.display
+        prop = request.property or request.target
+        if request.selection != self.atoms["CLIPBOARD"] or not self.owned:
+            prop = 0
+        elif request.target == self.atoms["TARGETS"]:
+            atoms = [self.atoms["TARGETS"], self.atoms["TIMESTAMP"]] + list(self.offers)
+            data = (ctypes.c_ulong * len(atoms))(*atoms)
+            x11.XChangeProperty(display, request.requestor, prop, XA_ATOM, 32, X_PROP_MODE_REPLACE,
+                                ctypes.cast(data, ctypes.c_char_p), len(atoms))
+        elif request.target in self.offers:
+            prop_type, fmt, data, count = self.offers[request.target]
+            if len(data) > self.max_chunk:
+                # 数据太大：先写 INCR 属性，请求方每删除一次属性就发送下一段
+                x11.XSelectInput(display, request.requestor, X_PROPERTY_CHANGE_MASK)
+                size = (ctypes.c_ulong * 1)(len(data))
+                x11.XChangeProperty(display, request.requestor, prop, self.atoms["INCR"], 32,
+                                    X_PROP_MODE_REPLACE, ctypes.cast(size, ctypes.c_char_p), 1)
+                self.transfers[(request.requestor, prop)] = [prop_type, fmt, data, 0]
+            else:
+                x11.XChangeProperty(display, request.requestor, prop, prop_type, fmt, X_PROP_MODE_REPLACE,
+                                    data, count)
+                self._mark_served(request.requestor)
+        else:
+            prop = 0
+
+        notify = XEvent()
+        reply = notify.xselection
+        reply.type = X_SELECTION_NOTIFY
+        reply.display = display
+        reply.requestor = request.requestor
+        reply.selection = request.selection
+        reply.target = request.target
+        reply.property = prop
+        reply.time = request.time
+        x11.XSendEvent(display, request.requestor, 0, 0, ctypes.byref(notify))
+        x11.XFlush(display)
+
+    def _send_chunk(self, key):
+        """INCR 发送下一段，数据发完后写入空属性结束传输"""
+        requestor, prop = key
+        prop_type, fmt, data, offset = self.transfers[key]
+        unit = self.unit_size(fmt)
+        chunk = data[offset:offset + self.max_chunk // unit * unit]
+        self.x11.XChangeProperty(self.display, requestor, prop, prop_type, fmt, X_PROP_MODE_REPLACE,
+                                 chunk, len(chunk) // unit)
+        if chunk:
+            self.transfers[key][3] = offset + len(chunk)
+        else:
+            del self.transfers[key]
+            self.x11.XSelectInput(self.display, requestor, 0)
+            self._mark_served(requestor)
+        self.x11.XFlush(self.display)
+
+    def _mark_served(self, requestor):
+        """一次内容请求已完整交付，唤醒等待粘贴完成的线程"""
+        with self.served_changed:
+            self.served += 1
+            self.served_by.append((self.served, requestor))
+            self.served_changed.notify_all()
+
+    @staticmethod
+    def unit_size(fmt):
+        """Xlib 中每个属性元素占用的字节数（格式 32 在客户端是 long）"""
+        return {8: 1, 16: ctypes.sizeof(ctypes.c_short), 32: ctypes.sizeof(ctypes.c_long)}[fmt]
+
+    def _read_property(self):
+        """读取并删除自己窗口上的转换结果属性，返回 (类型原子, 格式, 原始数据, 元素数)"""
+        actual_type, actual_format = ctypes.c_ulong(), ctypes.c_int()
+        count, remaining, data = ctypes.c_ulong(), ctypes.c_ulong(), ctypes.c_void_p()
+        self.x11.XGetWindowProperty(self.display, self.window, self.atoms["PASTE_SCRIPT_SELECTION"], 0,
+                                    0x1fffffff, 1, 0, ctypes.byref(actual_type), ctypes.byref(actual_format),
+                                    ctypes.byref(count), ctypes.byref(remaining), ctypes.byref(data))
+        raw = b""
+        if data.value:
+            if actual_format.value:
+                raw = ctypes.string_at(data.value, count.value * self.unit_size(actual_format.value))
+            self.x11.XFree(data)
+        return actual_type.value, actual_format.value, raw, count.value
+
+    def _convert(self, target, selection=None):
+        """向剪贴板所有者请求 target 的内容（支持 INCR），失败返回 None"""
+        selection = selection or self.atoms["CLIPBOARD"]
+        prop = self.atoms["PASTE_SCRIPT_SELECTION"]
+        self.x11.XConvertSelection(self.display, selection, target, prop, self.window, 0)
+        self.x11.XFlush(self.display)
+        event = self._wait_event(lambda e: e.type == X_SELECTION_NOTIFY and e.xselection.requestor == self.window
+                                 and e.xselection.selection == selection, CLIPBOARD_TIMEOUT)
+        if event is None or not event.xselection.property:
+            return None
+        prop_type, fmt, data, count = self._read_property()
+        if prop_type != self.atoms["INCR"]:
+            return prop_type, fmt, data, count
+
+        # INCR：每删除一次属性，所有者写入下一段，空段表示结束
+        chunks, total, prop_type = [], 0, 0
+        while True:
+            event = self._wait_event(lambda e: e.type == X_PROPERTY_NOTIFY and e.xproperty.window == self.window
+                                     and e.xproperty.atom == prop
+                                     and e.xproperty.state == X_PROPERTY_NEW_VALUE, CLIPBOARD_TIMEOUT)
+            if event is None:
+                return None
+            chunk_type, fmt, data, count = self._read_property()
+            if not count:
+                return prop_type, fmt, b"".join(chunks), total
+            prop_type = chunk_type
+            chunks.append(data)
+            total += count
+
+    def atom_name(self, atom):
+        """原子名称"""
+        pointer = self.x11.XGetAtomName(self.display, atom)
+        if not pointer:
+            return ""
+        name = ctypes.string_at(pointer).decode('latin-1')
+        self.x11.XFree(pointer)
+        return name
+
+    def _backup(self):
+        """按原始字节备份当前剪贴板提供的全部目标，剪贴板为空时返回 {}"""
+        owner = self.x11.XGetSelectionOwner(self.display, self.atoms["CLIPBOARD"])
+        if not owner:
+            return {}
+        if owner == self.window:
+            return dict(self.offers)
+        result = self._convert(self.atoms["TARGETS"])
+        if result is None:
+            return {}
+        _, fmt, data, count = result
+        targets = list((ctypes.c_ulong * count).from_buffer_copy(data)) if fmt == 32 else []
+        saved = {}
+        deadline = time.time() + CLIPBOARD_BACKUP_BUDGET
+        for target in targets:
+            if time.time() > deadline:
+                print("剪贴板备份超时，部分格式未备份")
+                break
+            if target in saved or self.atom_name(target) in CLIPBOARD_META_TARGETS:
+                continue
+            converted = self._convert(target)
+            if converted is not None and converted[1]:
+                saved[target] = converted
+        return saved
+
+    def _own(self, offers):
+        """以 offers 成为剪贴板所有者；offers 为空时放弃所有权"""
+        # 进行中的 INCR 传输保留各自的数据，继续发完
+        self.offers = offers
+        clipboard = self.atoms["CLIPBOARD"]
+        self.x11.XSetSelectionOwner(self.display, clipboard, self.window if offers else 0, 0)
+        self.x11.XFlush(self.display)
+        self.owned = bool(offers) and self.x11.XGetSelectionOwner(self.display, clipboard) == self.window
+        return self.owned or not offers
+
+    def _set_text(self, text):
+        data = text.encode('utf-8')
+        utf8 = self.atoms["UTF8_STRING"]
+        offers = {self.atoms[name]: (utf8, 8, data, len(data)) for name in CLIPBOARD_TEXT_TARGETS}
+        try:
+            latin = text.encode('latin-1')
+            offers[XA_STRING] = (XA_STRING, 8, latin, len(latin))
+        except UnicodeEncodeError:
+            pass
+        if self.backup_pending:
+            started = time.perf_counter()
+            self.saved = self._backup()
+            self.backup_pending = False
+            if self.metrics:
+                self.metrics.record("x11", "clipboard_backup", time.perf_counter() - started)
+        return self._own(offers)
+
+    def _restore(self):
+        saved, self.saved = self.saved, None
+        self.backup_pending = False
+        if saved is None:
+            return
+        if not self.owned:
+            # 输入期间其他程序写入了剪贴板，保留新内容
+            return
+        self._own(saved)
+
+    def _handover(self):
+        """退出前把仍由本程序持有的内容交给剪贴板管理器（freedesktop SAVE_TARGETS 约定）"""
+        if not self.owned or not self.x11.XGetSelectionOwner(self.display, self.atoms["CLIPBOARD_MANAGER"]):
+            return
+        self.x11.XConvertSelection(self.display, self.atoms["CLIPBOARD_MANAGER"], self.atoms["SAVE_TARGETS"],
+                                   0, self.window, 0)
+        self.x11.XFlush(self.display)
+        self._wait_event(lambda e: e.type == X_SELECTION_NOTIFY and e.xselection.requestor == self.window,
+                         CLIPBOARD_BACKUP_BUDGET)
+
+    # ---- 公共接口（任意线程调用）----
+
+    def begin(self):
+        """开始一次会话：原剪贴板在第一次写入前才备份"""
+        self.call(self._begin)
+
+    def _begin(self):
+        self.saved = None
+        self.backup_pending = True
+
+    def set_text(self, text):
+        """把文本放入剪贴板，成功后立即可以粘贴"""
+        return self.call(self._set_text, text)
+
+    def wait_served(self, mark, window=None, timeout=PASTE_CONSUME_TIMEOUT, stopped=None):
+        """等待 mark 之后目标窗口所属的客户端取走剪贴板内容，超时返回 False；
+        请求方通常是应用自己的隐藏窗口，所以按客户端比较；window 为 None 时任何请求都算。
+        stopped() 为真时（配合 wake）提前返回"""
+        def consumed():
+            return any(seq > mark and (window is None or self.same_client(requestor, window))
+                       for seq, requestor in self.served_by)
+        with self.served_changed:
+            return self.served_changed.wait_for(lambda: consumed() or (stopped and stopped()), timeout)
+
+    def wake(self):
+        """唤醒 wait_served，让它重新检查 stopped"""
+        with self.served_changed:
+            self.served_changed.notify_all()
+
+    @staticmethod
+    def same_client(window, other):
+        """两个窗口是否由同一个 X 客户端创建"""
+        return window & ~X_CLIENT_ID_MASK == other & ~X_CLIENT_ID_MASK
+
+    def restore(self):
+        """恢复会话开始前的剪贴板（逐字节、保留全部格式）"""
+        started = time.perf_counter()
+        self.call(self._restore)
+        if self.metrics:
+            self.metrics.record("x11", "clipboard_restore", time.perf_counter() - started)
+
+    def close(self):
+        """交给剪贴板管理器后断开 X 连接"""
+        if not self.display:
+            return
+        try:
+            self.call(self._handover)
+        finally:
+            self.running = False
+            os.write(self.wake_write, b"x")
+            self.thread.join(timeout=2)
+            self.x11.XCloseDisplay(self.display)
+            self.display = None
+            os.close(self.wake_read)
+            os.close(self.wake_write)
+
+class XClipboardStager:
+    """与 ClipboardStager 接口相同：进程内剪贴板写入是同步的，提交时才占有剪贴板"""
+
+    def __init__(self, clipboard):
+        self.clipboard = clipboard
+        self.text = None
+
+    def stage(self, text):
+        self.text = text
+
+    def commit(self, timeout=10):
+        return self.text is not None and self.clipboard.set_text(self.text)
+
+    def abort(self):
+        self.text = None
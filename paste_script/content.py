@@ -0,0 +1,263 @@
+"""文件内容：流式读取、严格 UTF-8 解码、按行切分和写入子进程的管道"""
+import os
+import mmap
+import codecs
+import hashlib
+
+def next_chunk(content, start, size):
+    """从 start 开始取最多 size 个字符，尽量在换行处断开"""
+    end = min(start + size, len(content))
+    if end < len(content):
+        newline = content.rfind('\n', start, end)
+        if newline >= start:
+            end = newline + 1
+    return content[start:end]
+
+def split_at_lines(content, size):
+    """按行边界把内容切分成不超过 size 个字符的块（单行过长时在行内断开）"""
+    start = 0
+    while start < len(content):
+        chunk = next_chunk(content, start, size)
+        yield chunk
+        start += len(chunk)
+
+# 剪贴板分块粘贴参数（字符数 / 秒）
+PASTE_CHUNK_DEFAULT = 4000
+
+PASTE_CHUNK_MIN = 500
+
+PASTE_CHUNK_MAX = 64000
+
+PASTE_CHUNK_FAST = 0.3
+
+PASTE_CHUNK_SLOW = 1.5
+
+# 超过该字符数时自动模式改用分块粘贴
+PASTE_CHUNK_THRESHOLD = 100000
+
+# 流式读取文件时每次解码的字节数
+STREAM_READ_BYTES = 256 * 1024
+
+UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xc0))
+
+def iter_file_segments(path, read_bytes=STREAM_READ_BYTES):
+    """内存映射文件并逐块解码，跨块统一换行符并去掉文件末尾空白，按需产出文本段；
+    不是合法 UTF-8 时抛出 UnicodeDecodeError"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending_cr = False
+    # 暂缓输出的空白：只有后面还有非空白内容时才输出，相当于整体 rstrip()
+    held_whitespace = ''
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        try:
+            offset = 0
+            while True:
+                final = offset >= size
+                data = mapped[offset:offset + read_bytes] if not final else b''
+                offset += len(data)
+                text = decoder.decode(data, final=final)
+                
+                # 上一块以 \r 结尾时，本块开头的 \n 属于同一个 CRLF
+                if pending_cr:
+                    text = '\r' + text
+                pending_cr = text.endswith('\r') and not final
+                if pending_cr:
+                    text = text[:-1]
+                text = text.replace('\r\n', '\n').replace('\r', '\n')
+                
+                stripped = text.rstrip()
+                if stripped:
+                    yield held_whitespace + stripped
+                    held_whitespace = text[len(stripped):]
+                else:
+                    held_whitespace += text
+                if final:
+                    break
+        finally:
+            if mapped is not None:
+                mapped.close()
+
+def check_utf8(path, read_bytes=STREAM_READ_BYTES):
+    """逐块严格解码整个文件（内存占用固定），不是合法 UTF-8 时抛出 UnicodeDecodeError"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(read_bytes), b''):
+            decoder.decode(block)
+    decoder.decode(b'', final=True)
+
+def count_chars(block):
+    """不解码估计一块 UTF-8 字节的字符数：统计首字节，CRLF 计为一个字符"""
+    return len(block.translate(None, UTF8_CONTINUATION_BYTES)) - block.count(b'\r\n')
+
+def scan_file(path, read_bytes=STREAM_READ_BYTES):
+    """逐块读取一遍文件（内存占用固定），同时严格校验 UTF-8、计算原始字节的 SHA-256 并估计字符数；
+    返回 (哈希, 字符数)，不是合法 UTF-8 时抛出 UnicodeDecodeError"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    digest = hashlib.sha256()
+    count = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(read_bytes), b''):
+            decoder.decode(block)
+            digest.update(block)
+            count += count_chars(block)
+    decoder.decode(b'', final=True)
+    return digest.hexdigest(), count
+
+def skip_chars(segments, count):
+    """跳过文本段流开头的 count 个字符"""
+    for segment in segments:
+        if count >= len(segment):
+            count -= len(segment)
+            continue
+        yield segment[count:]
+        count = 0
+
+def line_context(text):
+    """text 末尾决定编辑器缩进状态的部分：最后一个非空白的完整行到末尾（没有时只保留最后一行）"""
+    end = text.rfind('\n')
+    last_line = end + 1
+    while end >= 0:
+        begin = text.rfind('\n', 0, end) + 1
+        if text[begin:end].strip():
+            return text[begin:]
+        end = begin - 1
+    return text[last_line:]
+
+def resume_context(path, start):
+    """从 start 继续输入时恢复编辑器状态需要的前文（见 EditorProfile.reset），流式读取，只保留 line_context"""
+    context = ''
+    for segment in iter_file_segments(path):
+        piece = segment[:start]
+        start -= len(piece)
+        context = line_context(context + piece)
+        if not start:
+            break
+    return context
+
+class StreamedContent:
+    """延迟读取的文件内容，每次迭代重新从文件流式产出文本段；start 为跳过的字符数（用于继续输入）"""
+
+    def __init__(self, path, start=0):
+        self.path = path
+        self.start = start
+        self.size = os.path.getsize(path)
+        self.text = None
+        # scan() 的结果：原始字节的哈希和估计字符数
+        self.digest = None
+        self.chars = None
+
+    def scan(self):
+        """读取一遍文件做编码校验、哈希和字符计数（结果缓存）。在输入线程中开始输入前调用，
+        编码错误在第一个按键之前报告，又不阻塞界面线程"""
+        if self.digest is None:
+            self.digest, self.chars = scan_file(self.path)
+        return self.digest
+
+    def segments(self):
+        """按需产出预处理后的文本段"""
+        if self.text is not None:
+            return iter([self.text])
+        segments = iter_file_segments(self.path)
+        return skip_chars(segments, self.start) if self.start else segments
+
+    def read(self):
+        """读取完整内容（供不支持流式的输入方法使用，见 README），结果会被缓存"""
+        if self.text is None:
+            self.text = ''.join(self.segments())
+        return self.text
+
+    def estimate_chars(self):
+        """不解码估计全文字符数：统计 UTF-8 首字节，CRLF 计为一个字符（末尾空白仍计入）"""
+        if self.text is not None:
+            return self.start + len(self.text)
+        if self.chars is not None:
+            return self.chars
+        count = 0
+        with open(self.path, 'rb') as f:
+            for block in iter(lambda: f.read(STREAM_READ_BYTES), b''):
+                count += count_chars(block)
+        return count
+
+def iter_segments(content):
+    """统一遍历字符串或流式内容"""
+    if isinstance(content, StreamedContent):
+        return content.segments()
+    return iter([content])
+
+def materialize(content):
+    """把流式内容读成完整字符串"""
+    if isinstance(content, StreamedContent):
+        return content.read()
+    return content
+
+def content_total(content):
+    """用于进度显示的总量描述"""
+    if isinstance(content, StreamedContent) and content.text is None:
+        return f"{content.size} 字节"
+    return f"{len(materialize(content))} 字符"
+
+class LineChunker:
+    """从文本段流中按行边界取出指定大小的块"""
+
+    def __init__(self, segments):
+        self.segments = iter(segments)
+        self.buffer = ''
+        self.offset = 0
+        self.exhausted = False
+
+    def next(self, size):
+        """取下一块，内容耗尽时返回空字符串"""
+        while not self.exhausted and len(self.buffer) - self.offset <= size:
+            try:
+                segment = next(self.segments)
+            except StopIteration:
+                self.exhausted = True
+                break
+            self.buffer = self.buffer[self.offset:] + segment
+            self.offset = 0
+        chunk = next_chunk(self.buffer, self.offset, size)
+        self.offset += len(chunk)
+        return chunk
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        chunk = self.next(PASTE_CHUNK_DEFAULT)
+        if not chunk:
+            raise StopIteration
+        return chunk
+
+class PipeFeed:
+    """把文本段逐段写入子进程的标准输入，不经过临时文件；记录已写入的字符数"""
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.chars = 0
+
+    def write_to(self, pipe):
+        """同步写入（在单独的线程中运行），对方提前退出时静默结束"""
+        try:
+            for segment in self.segments:
+                pipe.write(segment.encode('utf-8'))
+                self.chars += len(segment)
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            try:
+                pipe.close()
+            except BrokenPipeError:
+                pass
+
+    async def write_async(self, stream):
+        """asyncio 版本，每段写入后等待管道腾出空间"""
+        try:
+            for segment in self.segments:
+                stream.write(segment.encode('utf-8'))
+                await stream.drain()
+                self.chars += len(segment)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            stream.close()
@@ -0,0 +1,143 @@
+"""目标编辑器配置：自动缩进和括号补全的按键改写"""
+import re
+
+from .tools import EVDEV_KEY_LEFTSHIFT
+
+# 编辑器按键：名称 -> (X keysym, evdev 键码)，名称前加 "shift+" 表示按住 Shift
+EDITOR_KEYS = {"Home": (0xff50, 102), "End": (0xff57, 107), "Delete": (0xffff, 111),
+               "Left": (0xff51, 105), "Right": (0xff53, 106)}
+
+# 编辑器自动补全的括号
+EDITOR_BRACKETS = {"(": ")", "[": "]", "{": "}"}
+
+def editor_key_commands(name, count=1):
+    """编辑器按键（连按 count 次）的 (keysym, 是否按住 Shift, 各外部工具的命令)"""
+    modifier, _, key = name.rpartition("+")
+    keysym, evdev = EDITOR_KEYS[key]
+    shift = modifier == "shift"
+    codes = [f"{evdev}:1", f"{evdev}:0"] * count
+    keys = ["-k", key] * count
+    if shift:
+        codes = [f"{EVDEV_KEY_LEFTSHIFT}:1"] + codes + [f"{EVDEV_KEY_LEFTSHIFT}:0"]
+        keys = ["-M", "shift"] + keys + ["-m", "shift"]
+    repeat = ["--repeat", str(count), "--delay", "1"] if count > 1 else []
+    commands = [
+        ["xdotool", "key", "--clearmodifiers"] + repeat + [name],
+        ["ydotool", "key"] + codes,
+        ["wtype"] + keys,
+    ]
+    return keysym, shift, commands
+
+class EditorProfile:
+    """目标编辑器的自动缩进和括号自动补全模型：逐行改写按键，省掉编辑器自己会产生的缩进和右括号"""
+
+    def __init__(self, name, classes=(), apps=(), auto_indent=False, indent_after="", indent_unit="    ",
+                 auto_close=""):
+        self.name = name
+        # 窗口类名（WM_CLASS，不区分大小写）为其中之一时使用本配置；以 "-" 结尾的项按前缀匹配
+        self.classes = tuple(name.lower() for name in classes)
+        # 查不到窗口类名时，按标题末尾的程序名匹配（如 "main.py - project - Visual Studio Code"）
+        self.apps = apps
+        # 回车后编辑器沿用上一行的缩进
+        self.auto_indent = auto_indent
+        # 上一行以这些字符结尾时编辑器再多缩进一级（indent_unit，对应编辑器的默认设置）
+        self.indent_after = tuple(indent_after)
+        self.indent_unit = indent_unit
+        # 输入左括号时编辑器自动补上右括号
+        self.auto_close = auto_close
+        self.reset()
+
+    def reset(self, prefix=""):
+        """开始新的输入；prefix 为从中间继续输入时起点之前的文本（见 resume_context），据此恢复缩进状态"""
+        # 编辑器回车后会插入的缩进
+        self.expected = ""
+        # 从行中间继续输入时，起点所在行已经在目标中的部分
+        self.partial = ""
+        *lines, partial = prefix.split("\n")
+        for line in lines:
+            self.plan_line(line)
+        self.partial = partial
+
+    def matches(self, window):
+        """按窗口类名判断目标程序；没有类名时只看标题的程序名部分，文件名里出现程序名不算"""
+        window_class = (window.get("class") or "").lower()
+        if window_class:
+            return any(window_class == name or (name.endswith("-") and window_class.startswith(name))
+                       for name in self.classes)
+        title = (window.get("name") or "").strip()
+        return any(title == name or re.search(WINDOW_TITLE_APP_PATTERN.format(re.escape(name)), title)
+                   for name in self.apps)
+
+    def plan_line(self, line):
+        """返回 (输入前的按键, 实际输入的文本, 输入后的按键)；line 中没有输入的字符由编辑器产生"""
+        if self.partial:
+            # 从行中间继续：按整行规划（行首的按键已经按过），只输入起点之后的部分
+            partial, self.partial = self.partial, ""
+            _, start, text, after = self.plan_whole_line(partial + line)
+            return [], text[max(0, len(partial) - start):], after
+        before, _, text, after = self.plan_whole_line(line)
+        return before, text, after
+
+    def plan_whole_line(self, line):
+        """plan_line 的整行规划，另外返回实际输入的文本在 line 中的起点"""
+        if not self.auto_indent and not self.auto_close:
+            return [], 0, line, []
+        before, after = [], []
+        start = 0
+        if self.auto_indent:
+            body = line.lstrip(" \t")
+            if not body:
+                # 空白行不输入，编辑器会清除自动缩进，下一行的缩进预期不变
+                return [], len(line), "", []
+            indent = line[:len(line) - len(body)]
+            if indent.startswith(self.expected):
+                start = len(self.expected)
+            else:
+                # 编辑器插入的缩进不对：选中它，随后输入的缩进或正文会替换选区；
+                # 正文以括号开头时直接输入会变成“给选区加括号”，所以先删除选区
+                before.append("shift+Home")
+                if not indent and body[0] in self.auto_close:
+                    before.append("Delete")
+            self.expected = indent
+            if body.rstrip().endswith(self.indent_after):
+                self.expected += self.indent_unit
+        text = line[start:]
+        if self.auto_close:
+            text, after = self.skip_closers(text)
+        return before, start, text, after
+
+    def skip_closers(self, text):
+        """按编辑器的括号补全规则处理一行：补全的右括号被覆盖输入；行尾正好是补全的右括号时用 End 跳过，
+        多出的补全括号在换行前删除"""
+        pending = ""
+        for index, char in enumerate(text):
+            if len(pending) > 1 and text[index:] == pending:
+                return text[:index], ["End"]
+            if pending and char == pending[0]:
+                pending = pending[1:]
+            elif char in self.auto_close:
+                pending = EDITOR_BRACKETS[char] + pending
+        return text, (["shift+End", "Delete"] if pending else [])
+
+# 标题以 "<分隔符> 程序名" 结尾，后面可能还有 "(UNREGISTERED)" 之类的括注
+WINDOW_TITLE_APP_PATTERN = r" [-–—] {}(?: \([^)]*\))?$"
+
+# 目标程序配置，按窗口类名（或标题末尾的程序名）选择；都不匹配时原样输入
+EDITOR_PROFILES = [
+    EditorProfile("vscode", ("Code", "code-oss", "VSCodium"), ("Visual Studio Code", "VSCodium", "Code - OSS"),
+                  auto_indent=True, indent_after="{[(:", auto_close="([{"),
+    EditorProfile("jetbrains", ("jetbrains-",),
+                  ("PyCharm", "IntelliJ IDEA", "WebStorm", "CLion", "GoLand", "PhpStorm", "Rider"),
+                  auto_indent=True, indent_after="{[(:", auto_close="([{"),
+    EditorProfile("sublime", ("Sublime_text",), ("Sublime Text",),
+                  auto_indent=True, indent_after="{[(:", auto_close="([{"),
+    EditorProfile("kate", ("kate", "kwrite", "Geany"), ("Kate", "KWrite", "Geany"), auto_indent=True),
+]
+
+PLAIN_PROFILE = EditorProfile("plain")
+
+def editor_profile(name):
+    """按名称取配置，未知名称返回 None"""
+    if name in (None, "plain", "none"):
+        return PLAIN_PROFILE
+    return next((profile for profile in EDITOR_PROFILES if profile.name == name), None)
@@ -0,0 +1,1676 @@
+"""输入引擎：asyncio 调度各后端输入、停止、补输入和运行报告"""
+import subprocess
+import threading
+import time
+import os
+import queue
+import asyncio
+import cProfile
+
+from .storage import cache_dir
+from .content import (content_total, iter_segments, LineChunker, materialize, PASTE_CHUNK_DEFAULT,
+    PASTE_CHUNK_FAST, PASTE_CHUNK_MAX, PASTE_CHUNK_MIN, PASTE_CHUNK_SLOW, PASTE_CHUNK_THRESHOLD, PipeFeed,
+    resume_context, split_at_lines, StreamedContent)
+from .spawn import helper_accepts, RunningTools, SPAWN_KILL_TIMEOUT, spawn_helper
+from .tools import (tool_operation, ToolRegistry, wayland_session, window_command, XdotoolSession,
+    ydotool_type_command, YdotooldClient)
+from .xlib import XTestTyper
+from .clipboard import ClipboardStager, PASTE_CONSUME_TIMEOUT, XClipboard, XClipboardStager
+from .editor import editor_key_commands, editor_profile, EDITOR_PROFILES, PLAIN_PROFILE
+from .plan import PLAN_KIND_NAMES, PLAN_ROUTES, PlanCache
+from .jobs import JobQueue, ProgressJournal
+from .metrics import BackendHistory, DELAY_PROFILES, HISTORY_EXPLORE_MAX_CHARS, Metrics, RateController
+from .progress import ProgressChannel, SkipLedger
+
+# 补输入时光标最多移动的字符数，更远的缺失段不再补输入
+REPAIR_MAX_MOVES = 20000
+
+# 保真度摘要中最多列出的缺失位置数
+FIDELITY_MAX_LISTED = 5
+
+# 界面和命令行可选的输入方法
+INPUT_METHODS = [
+    ("自动选择（推荐）", "auto"),
+    ("剪贴板方法", "clipboard"),
+    ("剪贴板分块粘贴（大文件）", "clipboard_chunked"),
+    ("xdotool方法", "xdotool"),
+    ("xdotool流式（快速）", "xdotool_stream"),
+    ("分段规划（混合后端）", "planned"),
+    ("XTest直接输入（X11）", "xtest"),
+    ("逐字符输入", "char_by_char")
+]
+
+# 可以借用 XTest 代替自己后端的方法（逐字符、编辑器按键、分段规划的 XTest 路线）；
+# 明确选择了其他方法时按该方法自己的工具输入
+XTEST_SHARED_METHODS = ("auto", "xtest", "planned")
+
+# 停止请求到事件循环终止所有工具进程的目标延迟（秒），只要事件循环不被阻塞即可保证
+STOP_LATENCY = 0.05
+
+# 停止后等待工作线程中的同步方法结束的最长时间（秒），其工具进程已被终止
+SYNC_STOP_TIMEOUT = 1.0
+
+class AsyncTypingRunner:
+    """基于 asyncio 的输入引擎：倒计时、焦点和输入都是可取消的任务，停止时立即终止正在运行的工具进程"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.loop = None
+        self.task = None
+        self.processes = set()
+        self.stop_time = None
+        # 正在运行同步调用的工作线程（见 run_sync）
+        self.workers = set()
+
+    def run(self, content, countdown=5):
+        """在当前线程运行事件循环直到输入结束，返回是否成功"""
+        try:
+            return asyncio.run(self.main(content, countdown))
+        finally:
+            self.join_workers()
+
+    def join_workers(self):
+        """事件循环结束后等待被停止的同步调用退出（总共最多 SYNC_STOP_TIMEOUT 秒），之后才能复位停止标志"""
+        deadline = time.time() + SYNC_STOP_TIMEOUT
+        for worker in list(self.workers):
+            worker.join(max(0.0, deadline - time.time()))
+        if any(worker.is_alive() for worker in self.workers):
+            print(f"同步输入线程没有在 {SYNC_STOP_TIMEOUT} 秒内结束")
+        self.workers.clear()
+
+    def stop(self):
+        """请求停止，可在任意线程调用"""
+        self.stop_time = time.time()
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self.cancel)
+        except RuntimeError:
+            # 事件循环已经结束
+            pass
+
+    def cancel(self):
+        """在事件循环中终止所有工具进程并取消输入任务"""
+        for process in list(self.processes):
+            if process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+        if self.task:
+            self.task.cancel()
+
+    async def main(self, content, countdown):
+        """启动输入任务和进度任务"""
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.create_task(self.session(content, countdown))
+        if self.engine.stop_requested:
+            self.cancel()
+        try:
+            return await self.task
+        except asyncio.CancelledError:
+            return False
+        finally:
+            self.cancel()
+            if self.stop_time:
+                print(f"停止耗时 {(time.time() - self.stop_time) * 1000:.0f} 毫秒")
+
+    async def exec_tool(self, cmd, input=None, timeout=10, capture=True, op=None):
+        """启动工具进程并等待结束，失败时抛出与 subprocess.run(check=True) 相同的异常；
+        input 为 PipeFeed 时逐段写入标准输入"""
+        metrics = self.engine.metrics
+        cmd = window_command(cmd, self.engine.locked_window)
+        op = op or tool_operation(cmd)
+        helper = spawn_helper()
+        if helper and helper_accepts(input) and helper.use_helper():
+            return await self.exec_tool_helper(helper, cmd, input, timeout, capture, op)
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+            stderr=subprocess.PIPE if capture else subprocess.DEVNULL)
+        metrics.record(cmd[0], "spawn", time.perf_counter() - started)
+        if helper:
+            helper.observe(False, time.perf_counter() - started)
+        self.processes.add(process)
+        writer = None
+        if isinstance(input, PipeFeed):
+            # 管道交给写入任务，communicate 只负责读取输出和等待
+            stream, process.stdin = process.stdin, None
+            writer = asyncio.ensure_future(input.write_async(stream))
+            input = None
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(input), timeout)
+            if writer:
+                await writer
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            metrics.record(cmd[0], op, time.perf_counter() - started, False)
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                process.kill()
+            raise
+        finally:
+            self.processes.discard(process)
+            if writer and not writer.done():
+                writer.cancel()
+        ok = process.returncode == 0
+        metrics.record(cmd[0], op, time.perf_counter() - started, ok)
+        if not ok:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+        return stdout
+
+    async def exec_tool_helper(self, helper, cmd, input, timeout, capture, op):
+        """经进程启动助手运行 exec_tool 的命令，取消时终止进程"""
+        metrics = self.engine.metrics
+        started = time.perf_counter()
+        call = helper.submit(cmd, input, capture)
+        finished = self.loop.create_future()
+        call.on_done(lambda: self.loop.call_soon_threadsafe(
+            lambda: finished.done() or finished.set_result(None)))
+        try:
+            await asyncio.wait_for(asyncio.shield(finished), timeout)
+        except asyncio.TimeoutError:
+            call.kill()
+            try:
+                await asyncio.wait_for(finished, SPAWN_KILL_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            metrics.record(cmd[0], op, time.perf_counter() - started, False)
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        except asyncio.CancelledError:
+            call.kill()
+            raise
+        try:
+            returncode, stdout, stderr = call.outcome()
+        except OSError:
+            metrics.record(cmd[0], "spawn", time.perf_counter() - started, False)
+            raise
+        self.engine.record_helper_spawn(helper, cmd[0], call.result, time.perf_counter() - started)
+        ok = returncode == 0
+        metrics.record(cmd[0], op, time.perf_counter() - started, ok)
+        if not ok:
+            raise subprocess.CalledProcessError(returncode, cmd, stdout, stderr)
+        return stdout if capture else None
+
+    async def pause(self, units=1.0):
+        """按当前速率等待（可被取消）"""
+        started = time.perf_counter()
+        await asyncio.sleep(units * self.engine.rate.char_delay())
+        self.engine.metrics.record("sleep", RateController.PAUSE_NAMES.get(units, "pause"),
+                                   time.perf_counter() - started)
+
+    def advance(self, count, skipped=False, certain=True):
+        """推进进度并计入已输入或跳过的字符数；certain 见 TypingEngine.skip"""
+        if skipped:
+            self.engine.skip(count, certain)
+        else:
+            self.engine.advance(count)
+
+    async def session(self, content, countdown):
+        """倒计时、激活窗口、输入"""
+        engine = self.engine
+        if engine.job_window:
+            # 队列任务的目标窗口已知，不需要倒计时切换窗口
+            countdown = 0
+        else:
+            engine.target_window = await self.detect_target_window()
+        
+        for i in range(countdown, 0, -1):
+            engine.report_status(f"{i}秒后开始输入...请切换到目标应用")
+            print(f"{i}秒后开始输入...请将光标放到目标文本编辑器中")
+            await asyncio.sleep(1)
+        
+        print("开始输入!")
+        engine.report_status("正在输入中...")
+        window = engine.job_window or await self.detect_target_window()
+        engine.target_window = window
+        if engine.target_lock or engine.current_job:
+            engine.lock_target(window)
+        # 编辑器配置和 Wayland 下能否使用 XTest 都要看窗口类名
+        await self.run_sync(engine.window_with_class, window)
+        await self.run_sync(engine.select_editor_profile, window)
+        await self.run_sync(engine.ensure_target_focus)
+        return await self.type_content(content)
+
+    async def type_content(self, content):
+        """按选择的方法输入，失败时自动选择"""
+        method = self.engine.get_method()
+        backends = {
+            "clipboard": lambda c: self.run_sync(self.engine.try_clipboard_method, c),
+            "xdotool": self.xdotool,
+            "xdotool_stream": self.xdotool_stream,
+            "xtest": self.xtest,
+            "char_by_char": self.char_by_char,
+            "basic_ydotool": self.basic_ydotool,
+        }
+        success = False
+        if method in backends:
+            success = await backends[method](content)
+        elif method == "clipboard_chunked":
+            success = await self.run_sync(self.engine.try_chunked_clipboard_method, content)
+        elif method == "planned":
+            success = await self.run_sync(self.engine.try_planned_method, content)
+        if not success and method != "auto":
+            if not self.engine.auto_fallback:
+                return False
+            print("选择的方法失败，尝试自动选择...")
+        if not success:
+            success = await self.smart_type_content(content)
+        return success
+
+    async def smart_type_content(self, content):
+        """智能选择输入方法（与同步引擎顺序一致）"""
+        engine = self.engine
+        size = content.size if isinstance(content, StreamedContent) else len(content)
+        if size > PASTE_CHUNK_THRESHOLD:
+            clipboard_method = ("clipboard_chunked", "剪贴板分块粘贴",
+                                lambda c: self.run_sync(engine.try_chunked_clipboard_method, c))
+        else:
+            clipboard_method = ("clipboard", "剪贴板方法", lambda c: self.run_sync(engine.try_clipboard_method, c))
+        methods = [
+            ("xtest", "XTest方法", self.xtest),
+            ("planned", "分段规划方法", lambda c: self.run_sync(engine.try_planned_method, c)),
+            clipboard_method,
+            ("xdotool_stream", "xdotool流式方法", self.xdotool_stream),
+            ("xdotool", "xdotool方法", self.xdotool),
+            ("char_by_char", "增强逐字符方法", self.char_by_char),
+            ("basic_ydotool", "基础ydotool方法", self.basic_ydotool)
+        ]
+        key = BackendHistory.target_key(await self.run_sync(engine.window_with_class, engine.target_window))
+        methods = engine.rank_methods(key, methods, size)
+        engine.auto_selecting = True
+        try:
+            return await self.try_ranked_methods(key, methods, content)
+        finally:
+            engine.auto_selecting = False
+
+    async def try_ranked_methods(self, key, methods, content):
+        """按排好的顺序逐个尝试输入方法，第一个成功的方法结束尝试"""
+        engine = self.engine
+        for method_id, method_name, method_func in methods:
+            engine.rewind()
+            started = time.time()
+            success = False
+            try:
+                print(f"尝试 {method_name}...")
+                success = await method_func(content)
+            except Exception as e:
+                print(f"{method_name} 失败: {e}")
+            engine.record_method(key, method_id, success, started)
+            if success:
+                print(f"{method_name} 成功!")
+                return True
+        print("所有方法都失败了")
+        return False
+
+    async def run_sync(self, method, *args, **kwargs):
+        """在工作线程中运行会阻塞的同步调用（没有异步版本的方法、剪贴板备份和恢复、等待粘贴等）；
+        取消时设置 stop_requested 并终止它正在等待的工具进程，不等线程结束。
+        不用 run_in_executor：asyncio.run 退出时会无限期等待默认线程池中的线程，停止延迟就没有上限"""
+        loop = self.loop
+        finished = loop.create_future()
+
+        def deliver(setter, value):
+            if not finished.done():
+                setter(value)
+
+        def work():
+            try:
+                result = method(*args, **kwargs)
+            except Exception as e:
+                outcome = (finished.set_exception, e)
+            else:
+                outcome = (finished.set_result, result)
+            finally:
+                self.workers.discard(worker)
+            try:
+                loop.call_soon_threadsafe(deliver, *outcome)
+            except RuntimeError:
+                # 事件循环已经结束（输入被停止）
+                pass
+
+        worker = threading.Thread(target=work)
+        worker.daemon = True
+        self.workers.add(worker)
+        worker.start()
+        try:
+            return await finished
+        except asyncio.CancelledError:
+            self.engine.stop_requested = True
+            self.engine.kill_tools()
+            raise
+
+    async def detect_target_window(self):
+        """检测目标窗口"""
+        try:
+            window_id = (await self.exec_tool(["xdotool", "getactivewindow"])).decode().strip()
+            print(f"检测到活动窗口ID: {window_id}")
+            window_name = (await self.exec_tool(["xdotool", "getwindowname", window_id])).decode().strip()
+            print(f"当前活动窗口: {window_name}")
+            return {"id": window_id, "name": window_name}
+        except (OSError, subprocess.SubprocessError):
+            print("无法检测活动窗口，将使用通用方法")
+            return None
+
+    async def xtest(self, content):
+        """XTest方法：进程内注入，每个字符之间可被取消"""
+        engine = self.engine
+        xtest = engine.get_xtest()
+        if not xtest:
+            print("没有可用的 X 显示，XTest 方法不可用")
+            return False
+        self.engine.progress.stage("XTest输入")
+        key_delay = xtest.key_delay
+        xtest.key_delay = 0
+        try:
+            for segment in iter_segments(content):
+                xtest.prepare(segment)
+                for char in segment:
+                    success = xtest.type_char(char)
+                    if success:
+                        engine.rate.success(0)
+                    else:
+                        engine.rate.failure()
+                        print(f"跳过字符: {repr(char)}")
+                    self.advance(1, skipped=not success)
+                    await self.pause()
+            return True
+        finally:
+            xtest.key_delay = key_delay
+            xtest.restore_keymap()
+
+    async def xdotool(self, content):
+        """xdotool方法：逐行输入，停止时立即终止正在输入的 xdotool"""
+        engine = self.engine
+        if not engine.tools.available("xdotool"):
+            print("xdotool 方法失败: 未找到 xdotool")
+            return False
+        print("使用 xdotool 直接输入...")
+        text = materialize(content)
+        lines = text.split('\n')
+        self.engine.progress.stage("xdotool输入")
+        xtest = engine.get_xtest(shared=True)
+        try:
+            return await self.xdotool_lines(lines, xtest)
+        finally:
+            if xtest:
+                xtest.restore_keymap()
+
+    async def xdotool_lines(self, lines, xtest):
+        """逐行调用 xdotool；xtest 可用时每行之前把键盘映射之外的字符绑定到键码池"""
+        engine = self.engine
+        for i, line in enumerate(lines):
+            if xtest:
+                xtest.prepare(line)
+            await self.pause(RateController.PAUSE_LINE)
+            before, text, after = engine.editor_profile.plan_line(line)
+            for key in before:
+                await self.run_sync(engine.press_editor_key, key)
+            # 没有需要输入的字符（空行，或缩进和右括号都由编辑器产生）时视为已输入；
+            # 只含空白的行照常输入
+            success = True
+            # 超时或被信号终止时 xdotool 可能已经输入了本行的一部分，补输入时不能再整行输入
+            certain = True
+            if text:
+                try:
+                    started = time.time()
+                    await self.exec_tool(["xdotool", "type", "--delay", str(engine.rate.key_delay_ms()),
+                                          "--clearmodifiers", "--", text], timeout=60)
+                    engine.rate.success(time.time() - started, len(text))
+                    success = True
+                except (OSError, subprocess.SubprocessError) as e:
+                    engine.rate.failure()
+                    print(f"第 {i+1} 行输入失败: {e}")
+                    success = False
+                    certain = not (isinstance(e, subprocess.TimeoutExpired)
+                                   or isinstance(e, subprocess.CalledProcessError) and e.returncode < 0)
+            for key in after:
+                await self.run_sync(engine.press_editor_key, key)
+            self.advance(len(line), skipped=not success, certain=certain)
+            
+            if i < len(lines) - 1:
+                try:
+                    await self.exec_tool(["xdotool", "key", "--clearmodifiers", "Return"], timeout=5)
+                    success = True
+                except (OSError, subprocess.SubprocessError):
+                    engine.rate.failure()
+                    print(f"第 {i+1} 行换行失败")
+                    success = False
+                self.advance(1, skipped=not success)
+                await self.pause(RateController.PAUSE_LINE)
+        
+        print("xdotool 输入成功")
+        return True
+
+    async def xdotool_stream(self, content):
+        """xdotool流式方法：常驻脚本进程，停止时直接终止该进程"""
+        engine = self.engine
+        if not engine.tools.available("xdotool"):
+            print("xdotool 流式方法失败: 未找到 xdotool")
+            return False
+        print("使用 xdotool 流式输入...")
+        encoder = XdotoolSession(window=engine.locked_window)
+        self.engine.progress.stage("xdotool流式输入")
+        process = None
+        # 开始输入前用短超时探测一次，避免第一批在不支持流式的 xdotool 上等满 SYNC_TIMEOUT
+        streaming = await self.run_sync(XdotoolSession.supports_streaming)
+        try:
+            for batch in encoder.batches(content):
+                encoder.delay = engine.rate.key_delay_ms()
+                script = ("\n".join(encoder.encode(batch)) + "\n").encode('utf-8')
+                started = time.time()
+                
+                if not streaming:
+                    # xdotool 读到 EOF 才执行脚本：每批一个进程
+                    await self.exec_tool(["xdotool", "-"], input=script, timeout=XdotoolSession.SYNC_TIMEOUT)
+                else:
+                    if process is None:
+                        process = await asyncio.create_subprocess_exec(
+                            "xdotool", "-", stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL)
+                        self.processes.add(process)
+                    process.stdin.write(script + b"getmouselocation\n")
+                    await process.stdin.drain()
+                    try:
+                        line = await asyncio.wait_for(process.stdout.readline(), XdotoolSession.SYNC_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        line = None
+                    if not line:
+                        if process.returncode is not None:
+                            print("xdotool 流式输入失败")
+                            engine.rate.failure()
+                            return False
+                        print("xdotool 不支持流式脚本，改为每批一个进程")
+                        streaming = False
+                        process.stdin.close()
+                        await process.wait()
+                        self.processes.discard(process)
+                        process = None
+                
+                engine.rate.success(time.time() - started, len(batch))
+                self.advance(len(batch))
+            
+            print("xdotool 流式输入成功")
+            return True
+        finally:
+            if process is not None:
+                if process.returncode is None:
+                    process.stdin.close()
+                    try:
+                        await asyncio.wait_for(process.wait(), 1)
+                    except asyncio.TimeoutError:
+                        process.kill()
+                self.processes.discard(process)
+
+    async def char_by_char(self, content):
+        """增强逐字符方法"""
+        engine = self.engine
+        text = materialize(content)
+        print(f"使用增强逐字符方法输入 {len(text)} 字符...")
+        self.engine.progress.stage("逐字符输入")
+        xtest = engine.get_xtest(shared=True)
+        try:
+            for kind, char in engine.editor_keystrokes(text):
+                if kind == "omit":
+                    self.advance(char)
+                    continue
+                if kind == "key":
+                    if not await self.run_sync(engine.press_editor_key, char):
+                        engine.rate.failure()
+                        print(f"编辑器按键 {char} 失败")
+                    continue
+                if xtest:
+                    success = xtest.type_char(char)
+                elif char == '\n':
+                    success = await self.run_sync(engine.run_session_backend, "newline", [
+                        ["ydotool", "key", "28:1", "28:0"],
+                        ["xdotool", "key", "Return"],
+                        ["wtype", "-k", "Return"]
+                    ], timeout=2)
+                    if success:
+                        await self.pause(RateController.PAUSE_NEWLINE)
+                else:
+                    success = await self.run_sync(engine.run_session_backend, "char", [
+                        ["ydotool", "type", char],
+                        ["xdotool", "type", "--delay", str(engine.rate.key_delay_ms()), char],
+                        ["wtype", char]
+                    ], timeout=3)
+                if not success and ord(char) > 127 and engine.input_tool_available("ydotool"):
+                    # 直接输入失败的非 ASCII 字符（如中文）通过标准输入交给 ydotool 再试一次
+                    try:
+                        await self.exec_tool(ydotool_type_command(engine.rate.key_delay_ms()),
+                                             input=char.encode('utf-8'), timeout=5)
+                        success = True
+                    except (OSError, subprocess.SubprocessError):
+                        pass
+                if not success:
+                    engine.rate.failure()
+                    print(f"跳过字符: {repr(char)}")
+                self.advance(1, skipped=not success)
+                await self.pause()
+            return True
+        finally:
+            if xtest:
+                xtest.restore_keymap()
+
+    async def basic_ydotool(self, content):
+        """基础ydotool方法：整个文件一次输入，停止时立即终止 ydotool"""
+        engine = self.engine
+        if not engine.input_tool_available("ydotool"):
+            print("基础 ydotool 方法失败: 未找到 ydotool")
+            return False
+        print("使用基础 ydotool 方法...")
+        self.engine.progress.stage("ydotool输入")
+        # 内容经管道逐段送给 ydotool，不写临时文件
+        feed = PipeFeed(iter_segments(content))
+        try:
+            await self.exec_tool(ydotool_type_command(engine.rate.key_delay_ms()), input=feed, timeout=None)
+            self.advance(feed.chars)
+            print("基础 ydotool 方法成功")
+            return True
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"基础 ydotool 方法失败: {e}")
+            return False
+
+class TypingEngine:
+    """与界面无关的输入引擎，图形界面和命令行共用"""
+    
+    def __init__(self, method="auto", delay_profile="normal"):
+        self.init_state(method, delay_profile)
+    
+    def init_state(self, method="auto", delay_profile="normal"):
+        """初始化与界面无关的输入状态"""
+        self.method = method
+        self.is_typing = False
+        self.stop_requested = False
+        self.typing_thread = None
+        self.keyboard_listener = None
+        self.xdotool_session = None
+        self.tools = ToolRegistry()
+        # 本次会话中锁定的逐字符后端（用途 -> 命令模板下标）
+        self.session_backends = {}
+        # 分块粘贴的块大小，None 表示自适应
+        self.paste_chunk_size = None
+        # 所有后端共用的输入速率控制器
+        self.rate = RateController(**DELAY_PROFILES[delay_profile])
+        # XTest 后端，首次使用时打开；False 表示当前环境不可用
+        self.xtest = None
+        # 正在按自动选择的顺序尝试各方法（其他方法可以借用 XTest）
+        self.auto_selecting = False
+        # Wayland 下已经提示过“目标不是 X 窗口、跳过 XTest”的目标窗口 ID
+        self.xtest_wayland_notice = None
+        # 进程内 X 剪贴板，首次使用时打开；False 表示当前环境不可用（如 Wayland）
+        self.x_clipboard = None
+        # ydotoold 套接字客户端，首次使用时连接；False 表示守护进程不可用
+        self.ydotoold = None
+        # 目标编辑器配置（逐行改写按键），editor_choice 为 None 时按窗口标题选择
+        self.editor_profile = PLAIN_PROFILE
+        self.editor_choice = None
+        # 最近一次输入是否成功
+        self.last_success = False
+        # 选择的方法失败时是否自动改用其他方法（基准测试关闭，以便如实记录单个方法的结果）
+        self.auto_fallback = True
+        # 正在运行的 asyncio 输入引擎
+        self.async_runner = None
+        # 同步方法（在 asyncio 引擎的工作线程中运行）正在等待的工具进程
+        self.running_tools = RunningTools()
+        # 倒计时前检测到的目标窗口
+        self.target_window = None
+        # 锁定目标窗口模式：倒计时结束时记下活动窗口，之后的输入直接发给该窗口，不再激活/点击
+        self.target_lock = False
+        self.locked_window = None
+        self.plan_cache = PlanCache()
+        # 进度日志：position 为本次运行已处理（输入或跳过）到的字符偏移
+        self.journal = ProgressJournal()
+        self.progress = ProgressChannel()
+        # 多文件任务队列；current_job 为正在输入的任务，job_window 为其已知的目标窗口（不再倒计时）
+        self.job_queue = JobQueue()
+        self.current_job = None
+        self.job_window = None
+        self.queue_running = False
+        # 最近一次输入是否被停止
+        self.last_stopped = False
+        # 各目标程序上各输入方法的历史成功率和吞吐
+        self.backend_history = BackendHistory()
+        self.run_start = 0
+        self.position = 0
+        # 本次运行的内容和跳过字符账本
+        self.run_content = None
+        self.ledger = SkipLedger()
+        # 计量：每次运行结束写入 JSON 报告，可选 Prometheus textfile 和 cProfile
+        self.metrics = Metrics()
+        self.rate.metrics = self.metrics
+        self.report_path = os.path.join(cache_dir(), "last_run.json")
+        self.prometheus_path = os.environ.get("PASTE_SCRIPT_PROMETHEUS")
+        self.profile_path = os.environ.get("PASTE_SCRIPT_PROFILE")
+    
+    def run_tool(self, cmd, input=None, timeout=None, check=False, capture_output=False, op=None, **kwargs):
+        """与 subprocess.run 相同的调用方式，额外记录进程启动和执行耗时；
+        input 为 PipeFeed 时由后台线程逐段写入标准输入"""
+        cmd = window_command(cmd, self.locked_window)
+        backend = cmd[0]
+        op = op or tool_operation(cmd)
+        if capture_output:
+            kwargs["stdout"] = subprocess.PIPE
+            kwargs["stderr"] = subprocess.PIPE
+        if input is not None:
+            kwargs["stdin"] = subprocess.PIPE
+        helper = spawn_helper()
+        if (helper and set(kwargs) <= {"stdout", "stderr", "stdin", "text", "encoding"} and helper_accepts(input)
+                and helper.use_helper()):
+            return self.run_tool_helper(helper, cmd, input, timeout, check,
+                                        capture_output, op, kwargs.get("encoding") or kwargs.get("text"))
+        
+        feed, writer = None, None
+        if isinstance(input, PipeFeed):
+            feed, input = input, None
+        
+        started = time.perf_counter()
+        try:
+            process = subprocess.Popen(cmd, **kwargs)
+        except OSError:
+            self.metrics.record(backend, "spawn", time.perf_counter() - started, False)
+            raise
+        self.metrics.record(backend, "spawn", time.perf_counter() - started)
+        if helper:
+            helper.observe(False, time.perf_counter() - started)
+        self.running_tools.add(process)
+        if feed:
+            # 管道交给写入线程，communicate 只负责读取输出和等待
+            pipe, process.stdin = process.stdin, None
+            writer = threading.Thread(target=feed.write_to, args=(pipe,))
+            writer.daemon = True
+            writer.start()
+        
+        with process:
+            try:
+                stdout, stderr = process.communicate(input, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                self.metrics.record(backend, op, time.perf_counter() - started, False)
+                raise
+            finally:
+                self.running_tools.discard(process)
+                if writer:
+                    writer.join()
+        ok = process.returncode == 0
+        self.metrics.record(backend, op, time.perf_counter() - started, ok)
+        if check and not ok:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+    
+    def run_tool_helper(self, helper, cmd, input, timeout, check, capture_output, op, text):
+        """经进程启动助手运行 run_tool 的命令；text 为真（或编码名）时按文本收发"""
+        backend = cmd[0]
+        encoding = text if isinstance(text, str) else 'utf-8'
+        if isinstance(input, str):
+            input = input.encode(encoding)
+        started = time.perf_counter()
+        try:
+            call, returncode, stdout, stderr = helper.run(cmd, input, timeout, capture_output, self.running_tools)
+        except subprocess.TimeoutExpired:
+            self.metrics.record(backend, op, time.perf_counter() - started, False)
+            raise
+        except OSError:
+            self.metrics.record(backend, "spawn", time.perf_counter() - started, False)
+            raise
+        self.record_helper_spawn(helper, backend, call.result, time.perf_counter() - started)
+        ok = returncode == 0
+        self.metrics.record(backend, op, time.perf_counter() - started, ok)
+        if not capture_output:
+            stdout = stderr = None
+        elif text:
+            stdout, stderr = stdout.decode(encoding, errors='replace'), stderr.decode(encoding, errors='replace')
+        if check and not ok:
+            raise subprocess.CalledProcessError(returncode, cmd, stdout, stderr)
+        return subprocess.CompletedProcess(cmd, returncode, stdout, stderr)
+    
+    def record_helper_spawn(self, helper, backend, result, total):
+        """记录助手测得的启动耗时，以及请求往返中不属于工具本身的开销"""
+        overhead = max(0.0, total - result["elapsed"])
+        self.metrics.record(backend, "spawn", result["spawn"])
+        self.metrics.record("spawn_helper", "overhead", overhead)
+        helper.observe(True, result["spawn"] + overhead)
+    
+    def profiled(self, func, *args):
+        """设置了 profile_path 时用 cProfile 包裹调用并保存结果"""
+        if not self.profile_path:
+            return func(*args)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args)
+        finally:
+            profiler.dump_stats(self.profile_path)
+            print(f"性能分析结果已保存: {self.profile_path}")
+    
+    def write_run_report(self):
+        """写入本次运行的计量报告"""
+        self.metrics.finished = time.time()
+        try:
+            if self.report_path:
+                self.metrics.write_json(self.report_path)
+                print(f"运行报告已保存: {self.report_path}")
+            if self.prometheus_path:
+                self.metrics.write_prometheus(self.prometheus_path)
+        except OSError as e:
+            print(f"无法写入运行报告: {e}")
+    
+    def get_method(self):
+        """当前选择的输入方法（队列任务使用任务自己的方法）"""
+        if self.current_job:
+            return self.current_job["method"]
+        return self.method
+    
+    def report_status(self, text):
+        """报告状态/进度，由界面或命令行子类显示"""
+    
+    def report_error(self, message):
+        """报告输入过程中的错误"""
+    
+    def on_finished(self, stopped):
+        """一次输入结束（完成或停止）后调用"""
+    
+    def preprocess_content(self, content):
+        """预处理内容，确保格式正确"""
+        # 统一换行符
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+        # 移除文件末尾的多余空白
+        content = content.rstrip()
+        return content
+    
+    def begin_run(self, content):
+        """每次输入会话重新锁定后端，速率从初始值重新探索，文件内容开始记录进度"""
+        self.session_backends = {}
+        self.rate.reset()
+        self.metrics.reset()
+        self.last_success = False
+        self.locked_window = None
+        self.run_start = content.start if isinstance(content, StreamedContent) else 0
+        self.position = self.run_start
+        self.run_content = content
+        self.ledger.clear()
+        if isinstance(content, StreamedContent):
+            # 编码校验、哈希和字符计数合为一遍读取，编码错误时抛出 UnicodeDecodeError
+            content.scan()
+            self.progress.reset(self.run_start, content.estimate_chars())
+        else:
+            self.progress.reset(0, len(content))
+        if isinstance(content, StreamedContent):
+            try:
+                self.journal.begin(content.path, self.get_method(), self.run_start, content.digest)
+            except OSError as e:
+                print(f"无法记录输入进度: {e}")
+    
+    def advance(self, count):
+        """记录已输入的字符并推进检查点"""
+        self.metrics.add_chars(count)
+        self.position += count
+        self.progress.publish(self.position)
+        self.checkpoint()
+    
+    def skip(self, count=1, certain=True):
+        """记录跳过的字符；检查点停在第一段跳过的字符处"""
+        self.ledger.record(self.position, count, certain)
+        self.metrics.add_skipped(count)
+        self.position += count
+        self.progress.publish(self.position)
+        self.checkpoint()
+    
+    def checkpoint(self):
+        """把已确认送达的位置写入进度日志和任务队列：有跳过的字符时只确认到第一段跳过处，
+        补输入成功之前从那里继续，不会漏掉缺失的字符"""
+        position = self.ledger.spans[0][0] if self.ledger.spans else self.position
+        self.journal.checkpoint(position)
+        if self.current_job:
+            self.job_queue.checkpoint(position)
+    
+    def rewind(self):
+        """换用其他方法从头重新输入时回到本次运行的起点"""
+        self.position = self.run_start
+        self.ledger.clear()
+        self.progress.publish(self.position)
+    
+    def start_typing_async(self, content, countdown=5):
+        """用 asyncio 引擎倒计时并输入，停止请求会立即终止正在运行的工具进程"""
+        runner = AsyncTypingRunner(self)
+        self.async_runner = runner
+        try:
+            self.begin_run(content)
+            self.last_success = self.profiled(runner.run, content, countdown)
+        except Exception as e:
+            self.last_success = False
+            error_msg = f"输入过程中出错: {e}"
+            print(error_msg)
+            self.report_error(error_msg)
+        finally:
+            self.async_runner = None
+            self.finish_typing()
+    
+    def finish_typing(self):
+        """结束本次输入并复位状态"""
+        self.is_typing = False
+        stopped = self.stop_requested
+        self.last_stopped = stopped
+        if stopped:
+            print("输入已停止")
+            self.stop_requested = False
+        else:
+            if self.last_success and self.ledger.spans:
+                self.repair_skipped()
+                self.checkpoint()
+                # 补输入期间的停止请求只中断补输入
+                self.stop_requested = False
+            self.report_fidelity()
+            print("输入完成!")
+        self.journal.finish(self.last_success and not stopped and not self.ledger.spans)
+        self.write_run_report()
+        self.on_finished(stopped)
+    
+    def rank_methods(self, key, methods, size):
+        """按目标程序的历史成功率和吞吐排序自动模式的方法列表（元组第一项为方法 ID）"""
+        by_id = {method[0]: method for method in methods}
+        ranked, explored = self.backend_history.rank(key, list(by_id), explore=size <= HISTORY_EXPLORE_MAX_CHARS)
+        if explored:
+            print(f"探索: 本次先尝试 {by_id[explored][1]}，更新 {key} 的历史记录")
+        elif ranked != list(by_id):
+            print(f"按 {key} 的历史记录排序: {' > '.join(by_id[method][1] for method in ranked)}")
+        return [by_id[method] for method in ranked]
+    
+    def record_method(self, key, method_id, success, started):
+        """记录一次自动模式尝试：只有确实有字符到达目标才算成功，吞吐按到达的字符计算；停止不计入"""
+        if self.stop_requested:
+            return
+        delivered = self.position - self.run_start - self.ledger.missing()
+        self.backend_history.record(key, method_id, bool(success) and delivered > 0, delivered,
+                                    time.time() - started)
+    
+    def window_with_class(self, window):
+        """补上窗口类名（按需查询一次），查询失败时保持原样"""
+        if not window or "class" in window:
+            return window
+        try:
+            result = self.run_tool(["xdotool", "getwindowclassname", window["id"]],
+                                   capture_output=True, text=True, check=True, timeout=5)
+            window["class"] = result.stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            window["class"] = None
+        return window
+    
+    def get_clipboard(self):
+        """获取进程内 X 剪贴板，没有 X 显示时返回 None"""
+        if self.x_clipboard is None:
+            clipboard = XClipboard(self.metrics)
+            self.x_clipboard = clipboard if clipboard.open() else False
+        return self.x_clipboard or None
+    
+    def clipboard_available(self):
+        """能否写入剪贴板（进程内或外部工具）"""
+        return self.get_clipboard() is not None or bool(self.find_clipboard_command())
+    
+    def set_clipboard(self, text):
+        """把文本放入剪贴板：优先进程内持有，写入即可粘贴；否则调用外部工具并等待其就绪"""
+        clipboard = self.get_clipboard()
+        if clipboard:
+            return clipboard.set_text(text)
+        clipboard_cmd = self.find_clipboard_command()
+        if not clipboard_cmd:
+            return False
+        result = self.run_tool(clipboard_cmd, input=text, text=True, encoding='utf-8', op="write")
+        if result.returncode != 0:
+            return False
+        self.rate.pause(RateController.PAUSE_CLIPBOARD)
+        return True
+    
+    def paste_mark(self):
+        """紧接在发送 Ctrl+V 之前记下进程内剪贴板已完成的请求数，之后的请求才算本次粘贴；
+        使用外部剪贴板工具时返回 None"""
+        clipboard = self.get_clipboard()
+        return clipboard.served if clipboard else None
+    
+    def paste_target(self):
+        """粘贴目标窗口的 ID（锁定的窗口或检测到的活动窗口），未知时返回 None"""
+        window = self.locked_window or (self.target_window or {}).get("id")
+        try:
+            return int(window) if window else None
+        except ValueError:
+            return None
+    
+    def wait_paste_consumed(self, mark):
+        """等待目标应用取走本次粘贴的内容，之后才能改写或恢复剪贴板；只计目标窗口所属程序的请求，
+        剪贴板管理器读取不算。外部剪贴板工具无法观察到读取，按固定时间等待"""
+        if mark is None:
+            self.rate.pause(RateController.PAUSE_CLIPBOARD)
+            return
+        with self.metrics.timed("engine", "paste_wait"):
+            consumed = self.x_clipboard.wait_served(mark, self.paste_target(),
+                                                    stopped=lambda: self.stop_requested)
+        if not consumed and not self.stop_requested:
+            print(f"{PASTE_CONSUME_TIMEOUT} 秒内目标应用没有读取剪贴板，继续")
+    
+    def clipboard_stager(self, clipboard_cmd):
+        """分块粘贴用的暂存器，clipboard_cmd 为 None 时使用进程内剪贴板"""
+        if clipboard_cmd is None:
+            return XClipboardStager(self.get_clipboard())
+        return ClipboardStager(clipboard_cmd, self.metrics)
+    
+    def find_clipboard_command(self):
+        """查找可用的剪贴板写入命令"""
+        for tool, cmd in [("xclip", ["xclip", "-selection", "clipboard"]), 
+                         ("wl-copy", ["wl-copy"]),
+                         ("xsel", ["xsel", "--clipboard", "--input"])]:
+            if self.tools.available(tool):
+                print(f"检测到 {tool}，使用剪贴板方法...")
+                return cmd
+        return None
+    
+    def paste_clipboard(self):
+        """发送 Ctrl+V，返回成功的粘贴方法名，全部失败返回 None"""
+        paste_methods = [
+            # ydotool Ctrl+V
+            (["ydotool", "key", "29:1", "47:1", "47:0", "29:0"], "ydotool Ctrl+V"),
+            # xdotool Ctrl+V (如果可用)
+            (["xdotool", "key", "ctrl+v"], "xdotool Ctrl+V"),
+            # wtype (Wayland)
+            (["wtype", "-M", "ctrl", "-P", "v", "-m", "ctrl", "-p", "v"], "wtype Ctrl+V")
+        ]
+        
+        for paste_cmd, method_name in paste_methods:
+            # 检查工具是否可用
+            if not self.input_tool_available(paste_cmd[0]):
+                continue
+            
+            try:
+                # 外部剪贴板工具需要时间就绪；进程内持有剪贴板时写入即可粘贴
+                if not self.get_clipboard():
+                    self.rate.pause(RateController.PAUSE_PASTE)
+                
+                # 执行粘贴
+                started = time.time()
+                if not self.send_ydotoold(paste_cmd):
+                    self.run_tool(paste_cmd, check=True, capture_output=True, timeout=10)
+                self.rate.success(time.time() - started)
+                print(f"剪贴板粘贴成功 (使用 {method_name})")
+                return method_name
+                
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
+                self.rate.failure()
+                print(f"{method_name} 失败: {e}")
+                continue
+        return None
+    
+    def try_clipboard_method(self, content):
+        """剪贴板方法 - 整个内容一次写入剪贴板并粘贴"""
+        if not self.clipboard_available():
+            print("未找到剪贴板工具")
+            return False
+        text = materialize(content)
+        self.progress.stage("剪贴板输入")
+        
+        original_clipboard = self.get_clipboard_content()
+        try:
+            if not self.set_clipboard(text):
+                print("剪贴板方法失败: 无法写入剪贴板")
+                return False
+            self.ensure_target_focus()
+            
+            mark = self.paste_mark()
+            if self.paste_clipboard() is None:
+                print("所有粘贴方法都失败了")
+                return False
+            self.advance(len(text))
+            
+            if original_clipboard:
+                self.wait_paste_consumed(mark)
+            return True
+        finally:
+            # 停止或出错时也要恢复，否则用户原来的剪贴板内容会丢失
+            if original_clipboard:
+                self.restore_clipboard_content(original_clipboard)
+    
+    def try_chunked_clipboard_method(self, content, chunk_size=None):
+        """剪贴板分块粘贴 - 按行切分大文件，粘贴当前块的同时暂存下一块"""
+        try:
+            clipboard_cmd = None if self.get_clipboard() else self.find_clipboard_command()
+            if not self.get_clipboard() and not clipboard_cmd:
+                print("未找到剪贴板工具")
+                return False
+            
+            chunk_size = chunk_size or self.paste_chunk_size
+            adaptive = chunk_size is None
+            size = chunk_size or PASTE_CHUNK_DEFAULT
+            total = content_total(content)
+            print(f"使用剪贴板分块粘贴 {total}，"
+                  f"{'自适应块大小' if adaptive else f'块大小 {size} 字符'}")
+            self.progress.stage("剪贴板分块粘贴")
+            
+            # 备份当前剪贴板内容
+            original_clipboard = self.get_clipboard_content()
+            stager = None
+            success = True
+            try:
+                # 确保目标窗口激活
+                self.ensure_target_focus()
+                
+                position = 0
+                chunk_index = 0
+                chunker = LineChunker(iter_segments(content))
+                chunk = chunker.next(size)
+                stager = self.clipboard_stager(clipboard_cmd)
+                stager.stage(chunk)
+                while chunk:
+                    if not stager.commit():
+                        print(f"第 {chunk_index + 1} 块写入剪贴板失败")
+                        success = False
+                        break
+                    
+                    # 粘贴当前块之前就开始暂存下一块
+                    following = chunker.next(size)
+                    if following and not self.stop_requested:
+                        stager = self.clipboard_stager(clipboard_cmd)
+                        stager.stage(following)
+                    
+                    started = time.time()
+                    mark = self.paste_mark()
+                    if self.paste_clipboard() is None:
+                        print("所有粘贴方法都失败了")
+                        success = False
+                        break
+                    elapsed = time.time() - started
+                    
+                    position += len(chunk)
+                    self.advance(len(chunk))
+                    chunk_index += 1
+                    
+                    # 等待目标应用取走本块，再写入下一块
+                    self.wait_paste_consumed(mark)
+                    
+                    # 块之间检查停止请求
+                    if self.stop_requested:
+                        break
+                    
+                    # 自适应块大小：粘贴快就加倍，慢就减半
+                    if adaptive:
+                        if elapsed < PASTE_CHUNK_FAST:
+                            size = min(size * 2, PASTE_CHUNK_MAX)
+                        elif elapsed > PASTE_CHUNK_SLOW:
+                            size = max(size // 2, PASTE_CHUNK_MIN)
+                    
+                    chunk = following
+            finally:
+                if stager:
+                    stager.abort()
+                # 恢复原始剪贴板内容（停止或出错时也要恢复）
+                if original_clipboard:
+                    try:
+                        self.restore_clipboard_content(original_clipboard)
+                    except (OSError, subprocess.SubprocessError):
+                        pass
+            
+            return success
+            
+        except Exception as e:
+            print(f"剪贴板分块粘贴失败: {e}")
+            return False
+    
+    def get_clipboard_content(self):
+        """获取当前剪贴板内容；进程内剪贴板在第一次写入前才按原始字节备份全部格式，返回剪贴板对象本身"""
+        clipboard = self.get_clipboard()
+        if clipboard:
+            clipboard.begin()
+            return clipboard
+        with self.metrics.timed("engine", "clipboard_backup"):
+            return self._get_clipboard_content()
+    
+    def _get_clipboard_content(self):
+        """依次尝试剪贴板读取工具"""
+        for tool, cmd in [("xclip", ["xclip", "-selection", "clipboard", "-o"]),
+                         ("wl-paste", ["wl-paste"]),
+                         ("xsel", ["xsel", "--clipboard", "--output"])]:
+            if not self.tools.available(tool):
+                continue
+            try:
+                result = self.run_tool(cmd, capture_output=True, text=True, timeout=2, op="read")
+                if result.returncode == 0:
+                    return result.stdout
+            except (OSError, subprocess.SubprocessError):
+                continue
+        return None
+    
+    def restore_clipboard_content(self, content):
+        """恢复剪贴板内容"""
+        if isinstance(content, XClipboard):
+            content.restore()
+            return
+        with self.metrics.timed("engine", "clipboard_restore"):
+            self._restore_clipboard_content(content)
+    
+    def _restore_clipboard_content(self, content):
+        """依次尝试剪贴板写入工具"""
+        for tool, cmd in [("xclip", ["xclip", "-selection", "clipboard"]),
+                         ("wl-copy", ["wl-copy"]),
+                         ("xsel", ["xsel", "--clipboard", "--input"])]:
+            if not self.tools.available(tool):
+                continue
+            try:
+                result = self.run_tool(cmd, input=content, text=True, encoding='utf-8', op="write")
+                if result.returncode == 0:
+                    break
+            except (OSError, subprocess.SubprocessError):
+                continue
+    
+    def get_xtest(self, shared=False):
+        """获取 XTest 后端，没有 X 显示、或 Wayland 下目标不是已知的 X 窗口时返回 None；
+        shared 为 True 表示供其他方法代替它们自己的后端使用，只在 XTEST_SHARED_METHODS 和自动选择中返回"""
+        if shared and not self.auto_selecting and self.get_method() not in XTEST_SHARED_METHODS:
+            return None
+        if self.xtest is None:
+            typer = XTestTyper()
+            self.xtest = typer if typer.open() else False
+        if not self.xtest:
+            return None
+        if wayland_session() and not self.target_is_x_client():
+            window_id = (self.target_window or {}).get("id")
+            if self.xtest_wayland_notice != window_id:
+                self.xtest_wayland_notice = window_id
+                print("Wayland 会话中目标不是 X 窗口，不使用 XTest")
+            return None
+        self.xtest.window = int(self.locked_window) if self.locked_window else None
+        return self.xtest
+    
+    def target_is_x_client(self):
+        """目标窗口是否为 XWayland 上的 X 客户端：能通过 X 检测到它并查到窗口类名"""
+        window = self.window_with_class(self.target_window)
+        return bool(window and window.get("class"))
+    
+    def run_session_backend(self, purpose, commands, timeout):
+        """按本次会话锁定的后端执行命令，失败时才依次尝试其他可用后端并重新锁定"""
+        candidates = [(i, cmd) for i, cmd in enumerate(commands) if self.input_tool_available(cmd[0])]
+        locked = self.session_backends.get(purpose)
+        candidates.sort(key=lambda item: item[0] != locked)
+        
+        for index, cmd in candidates:
+            try:
+                started = time.time()
+                if not self.send_ydotoold(cmd):
+                    self.run_tool(cmd, check=True, capture_output=True, timeout=timeout)
+                self.rate.success(time.time() - started)
+                if locked != index:
+                    print(f"锁定{purpose}后端: {cmd[0]}")
+                    self.session_backends[purpose] = index
+                return True
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+                self.rate.failure()
+                continue
+        return False
+    
+    def try_planned_method(self, content):
+        """分段规划方法 - ASCII 段批量键入，非键盘字符和长段落粘贴，换行单独按键"""
+        text = materialize(content)
+        plan = self.plan_cache.get(text)
+        if not plan:
+            return True
+        backends = self.plan_backends({kind for kind, _, _ in plan})
+        missing = [PLAN_KIND_NAMES[kind] for kind, candidates in backends.items() if not candidates]
+        if missing:
+            print(f"分段规划方法不可用: {'、'.join(missing)}没有可用后端")
+            return False
+        
+        print(f"使用分段规划输入 {len(text)} 字符，共 {len(plan)} 段")
+        self.ensure_target_focus()
+        
+        original_clipboard = None
+        if any("clipboard" in candidates for candidates in backends.values()):
+            original_clipboard = self.get_clipboard_content()
+        
+        typed = 0
+        try:
+            for index, (kind, start, end) in enumerate(plan):
+                if self.stop_requested:
+                    break
+                
+                segment = text[start:end]
+                if self.run_plan_segment(kind, segment, backends[kind]):
+                    typed += len(segment)
+                    self.advance(len(segment))
+                elif typed == 0:
+                    # 还没有输入任何内容，交给其他方法重新输入
+                    return False
+                else:
+                    print(f"第 {index + 1} 段（{PLAN_KIND_NAMES[kind]}）输入失败，跳过 {len(segment)} 字符")
+                    self.skip(len(segment))
+            
+            print("分段规划输入成功")
+            return True
+        finally:
+            if self.xdotool_session:
+                session = self.xdotool_session
+                self.xdotool_session = None
+                if self.stop_requested:
+                    session.kill()
+                else:
+                    session.close()
+            if self.xtest:
+                self.xtest.restore_keymap()
+            if original_clipboard:
+                try:
+                    self.restore_clipboard_content(original_clipboard)
+                except (OSError, subprocess.SubprocessError):
+                    pass
+    
+    def plan_backends(self, kinds):
+        """每类段当前可用的后端（按 PLAN_ROUTES 顺序）"""
+        available = {
+            "clipboard": lambda: self.clipboard_available()
+                                 and any(self.input_tool_available(tool) for tool in ("ydotool", "xdotool", "wtype")),
+            "xtest": lambda: self.get_xtest(shared=True) is not None,
+        }
+        checked = {}
+        backends = {}
+        for kind in kinds:
+            backends[kind] = []
+            for backend in PLAN_ROUTES[kind]:
+                if backend not in checked:
+                    check = available.get(backend, lambda: self.input_tool_available(backend))
+                    checked[backend] = check()
+                if checked[backend]:
+                    backends[kind].append(backend)
+        return backends
+    
+    def run_plan_segment(self, kind, text, candidates):
+        """用本次会话锁定的后端输入一段，失败时依次尝试其他后端并重新锁定"""
+        purpose = f"plan_{kind}"
+        locked = self.session_backends.get(purpose)
+        for backend in sorted(candidates, key=lambda backend: backend != locked):
+            if self.stop_requested:
+                return False
+            self.progress.stage(f"分段输入（{backend}）")
+            started = time.time()
+            try:
+                with self.metrics.timed(f"plan_{backend}", kind):
+                    success = self.plan_executors[backend](kind, text)
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"{backend} 输入{PLAN_KIND_NAMES[kind]}失败: {e}")
+                success = False
+            if success:
+                self.rate.success(time.time() - started, len(text))
+                if locked != backend:
+                    print(f"锁定{PLAN_KIND_NAMES[kind]}后端: {backend}")
+                    self.session_backends[purpose] = backend
+                return True
+            self.rate.failure()
+        return False
+    
+    def plan_clipboard(self, kind, text):
+        """粘贴一段（过长时按行分块）"""
+        for chunk in split_at_lines(text, PASTE_CHUNK_DEFAULT):
+            if self.stop_requested:
+                return False
+            if not self.set_clipboard(chunk):
+                return False
+            mark = self.paste_mark()
+            if self.paste_clipboard() is None:
+                return False
+            # 等目标应用取走剪贴板内容，再写入下一段
+            self.wait_paste_consumed(mark)
+        return True
+    
+    def plan_xdotool(self, kind, text):
+        """通过常驻 xdotool 会话输入一段，整个规划只启动一个进程"""
+        if self.xdotool_session is None:
+            self.xdotool_session = XdotoolSession(metrics=self.metrics, window=self.locked_window)
+        session = self.xdotool_session
+        session.delay = self.rate.key_delay_ms()
+        for batch in split_at_lines(text, session.batch_chars):
+            if self.stop_requested or not session.send(batch):
+                return False
+        return True
+    
+    def plan_xtest(self, kind, text):
+        """XTest 进程内输入一段"""
+        xtest = self.get_xtest()
+        xtest.key_delay = self.rate.char_delay()
+        xtest.prepare(text)
+        for char in text:
+            if self.stop_requested:
+                return False
+            if not xtest.type_char(char):
+                return False
+        return True
+    
+    def plan_ydotool(self, kind, text):
+        """ydotool 输入一段"""
+        if kind == "newline":
+            cmd = ["ydotool", "key", "28:1", "28:0"]
+            if not self.send_ydotoold(cmd):
+                self.run_tool(cmd, check=True, capture_output=True, timeout=2)
+            return True
+        if self.send_ydotoold(["ydotool", "type", "--key-delay", str(self.rate.key_delay_ms()), text]):
+            return True
+        self.run_tool(ydotool_type_command(self.rate.key_delay_ms()), input=text.encode('utf-8'),
+                      check=True, capture_output=True, timeout=self.rate.budget(len(text)) + 10)
+        return True
+    
+    def plan_wtype(self, kind, text):
+        """wtype 输入一段"""
+        if kind == "newline":
+            self.run_tool(["wtype", "-k", "Return"], check=True, capture_output=True, timeout=2)
+        else:
+            self.run_tool(["wtype", text], check=True, capture_output=True,
+                          timeout=self.rate.budget(len(text)) + 10)
+        return True
+    
+    @property
+    def plan_executors(self):
+        """后端名到执行方法"""
+        return {
+            "clipboard": self.plan_clipboard,
+            "xdotool": self.plan_xdotool,
+            "xtest": self.plan_xtest,
+            "ydotool": self.plan_ydotool,
+            "wtype": self.plan_wtype,
+        }
+    
+    def repair_skipped(self):
+        """运行结束后从末尾向前用方向键回到每段跳过的字符处，改用更可靠的后端（优先粘贴）补输入，
+        最后把光标移回末尾。不确定是否已部分输入的片段无法定位，遇到时停止，之前的片段保持缺失"""
+        spans = self.ledger.spans
+        backends = self.plan_backends({"block"})["block"]
+        if not backends:
+            print("没有可用于补输入的后端")
+            return
+        text = materialize(self.run_content)
+        end = self.position
+        print(f"补输入 {len(spans)} 处跳过的字符（共 {self.ledger.missing()} 字符）...")
+        
+        original_clipboard = None
+        if "clipboard" in backends:
+            original_clipboard = self.get_clipboard_content()
+        # 光标位置（原文偏移）：之后的字符都已在目标中（除仍缺失的片段外）
+        cursor = end
+        try:
+            for span in reversed(list(spans)):
+                offset, count, certain = span
+                if self.stop_requested:
+                    break
+                if not certain:
+                    print(f"第 {text.count(chr(10), 0, offset - self.run_start) + 1} 行可能已部分输入，"
+                          "无法定位，之前的缺失不再补输入")
+                    break
+                moves = (cursor - offset - count) - self.ledger.missing(offset + count, cursor)
+                if moves > REPAIR_MAX_MOVES:
+                    print(f"缺失位置距离末尾超过 {REPAIR_MAX_MOVES} 字符，不再补输入")
+                    break
+                if moves and not self.press_editor_key("Left", moves):
+                    print("移动光标失败，停止补输入")
+                    break
+                cursor = offset + count
+                piece = text[offset - self.run_start:offset - self.run_start + count]
+                if self.run_plan_segment("block", piece, backends):
+                    spans.remove(span)
+                    self.metrics.add_repaired(count)
+            moves = (end - cursor) - self.ledger.missing(cursor, end)
+            if moves and not self.press_editor_key("Right", moves):
+                print("无法把光标移回末尾")
+        finally:
+            if self.xdotool_session:
+                session = self.xdotool_session
+                self.xdotool_session = None
+                session.close()
+            if self.xtest:
+                self.xtest.restore_keymap()
+            if original_clipboard:
+                try:
+                    self.restore_clipboard_content(original_clipboard)
+                except (OSError, subprocess.SubprocessError):
+                    pass
+    
+    def report_fidelity(self):
+        """输出本次运行的保真度摘要：应输入、实际到达目标、补输入和仍缺失的字符"""
+        total = self.position - self.run_start
+        missing = self.ledger.missing()
+        self.metrics.missing_spans = [(offset, count) for offset, count, _ in self.ledger.spans]
+        if not total:
+            return
+        percent = (total - missing) * 100.0 / total
+        print(f"保真度: {total - missing}/{total} 字符（{percent:.2f}%），"
+              f"跳过 {self.metrics.chars_skipped}，补输入 {self.metrics.chars_repaired}，仍缺失 {missing}")
+        if missing:
+            text = materialize(self.run_content)
+            places = [f"第 {text.count(chr(10), 0, offset - self.run_start) + 1} 行（{count} 字符）"
+                      for offset, count, _ in self.ledger.spans[:FIDELITY_MAX_LISTED]]
+            more = "等" if len(self.ledger.spans) > FIDELITY_MAX_LISTED else ""
+            print(f"缺失位置: {'、'.join(places)}{more}")
+            self.report_error(f"输入完成，但仍有 {missing} 个字符未能输入，详见运行报告")
+    
+    def request_stop(self):
+        """请求停止当前输入"""
+        self.stop_requested = True
+        self.kill_tools()
+        # asyncio 引擎立即终止正在运行的工具进程
+        if self.async_runner:
+            self.async_runner.stop()
+    
+    def kill_tools(self):
+        """终止同步方法正在等待的工具进程并唤醒等待粘贴的线程（可在任意线程调用）"""
+        self.running_tools.kill_all()
+        # 流式会话中已发送的批次立即作废
+        if self.xdotool_session:
+            self.xdotool_session.kill()
+        if self.x_clipboard:
+            self.x_clipboard.wake()
+    
+    def cleanup(self):
+        """清理资源"""
+        self.stop_requested = True
+        self.is_typing = False
+        if self.xtest:
+            self.xtest.close()
+        if self.x_clipboard:
+            self.x_clipboard.close()
+        if self.ydotoold:
+            self.ydotoold.close()
+    
+    def describe_progress(self):
+        """状态栏显示的进度和当前限速，尚未开始输入时返回 None"""
+        text = self.progress.describe()
+        if not text:
+            return None
+        return f"{text}（限速 {self.rate.describe()}）"
+    
+    def describe_window(self, window_id):
+        """按窗口 ID 取窗口信息，窗口不存在时返回 None"""
+        try:
+            result = self.run_tool(["xdotool", "getwindowname", str(window_id)],
+                                   capture_output=True, text=True, check=True, timeout=5)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return {"id": str(window_id), "name": result.stdout.strip()}
+    
+    def run_queue(self, countdown=5):
+        """按优先级依次输入队列中的任务，返回完成的任务数。
+        指定了窗口 ID 的任务直接输入到该窗口；未指定的任务沿用前面任务锁定的窗口，
+        只有还没有锁定窗口时才倒计时。停止输入时当前任务留在队列中，队列暂停"""
+        queue = self.job_queue
+        # 未指定窗口的任务共用的窗口：第一次倒计时结束时锁定
+        shared_window = None
+        completed = 0
+        self.queue_running = True
+        try:
+            while not self.stop_requested:
+                job = queue.next_job()
+                if job is None:
+                    break
+                try:
+                    point = self.journal.resume_point(job["path"], job["method"])
+                    content = StreamedContent(job["path"], start=point[1] if point else 0)
+                    content.scan()
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"任务 {job['id']} 读取文件失败: {e}")
+                    queue.finish(job["id"], "failed", error=str(e))
+                    continue
+                if job["window"]:
+                    window = self.describe_window(job["window"])
+                    if window is None:
+                        print(f"任务 {job['id']} 的目标窗口 {job['window']} 不存在")
+                        queue.finish(job["id"], "failed", error="目标窗口不存在")
+                        continue
+                else:
+                    window = shared_window
+                
+                print(f"开始任务 {job['id']}: {job['path']}（方法 {job['method']}）")
+                queue.begin(job["id"], content.start, content.estimate_chars())
+                self.current_job = job
+                self.job_window = window
+                self.is_typing = True
+                try:
+                    self.start_typing_async(content, countdown=countdown)
+                finally:
+                    self.current_job = None
+                    self.job_window = None
+                
+                if not job["window"] and self.locked_window:
+                    shared_window = self.target_window
+                if self.last_stopped:
+                    state = "pending"
+                else:
+                    state = "done" if self.last_success else "failed"
+                queue.finish(job["id"], state, self.progress.snapshot(),
+                             chars=self.metrics.chars_typed, skipped=self.metrics.chars_skipped)
+                print(JobQueue.describe(queue.get(job["id"])))
+                if self.last_stopped:
+                    print("任务队列已暂停")
+                    break
+                completed += state == "done"
+        finally:
+            self.queue_running = False
+            self.stop_requested = False
+        return completed
+    
+    def lock_target(self, window):
+        """锁定倒计时结束时的活动窗口，之后输入直接发给它；检测失败时退回激活焦点的方式"""
+        if not window:
+            print("无法锁定目标窗口，改为激活当前窗口后输入")
+            return
+        self.target_window = window
+        self.locked_window = window["id"]
+        if self.xtest:
+            self.xtest.window = int(self.locked_window)
+        print(f"已锁定目标窗口: {window['name']}（ID {self.locked_window}），可以切换到其他窗口")
+    
+    def select_editor_profile(self, window):
+        """按指定名称或目标窗口类名选择编辑器配置"""
+        if self.editor_choice:
+            profile = editor_profile(self.editor_choice)
+        elif window:
+            window = self.window_with_class(window)
+            profile = next((profile for profile in EDITOR_PROFILES if profile.matches(window)), PLAIN_PROFILE)
+        else:
+            profile = PLAIN_PROFILE
+        prefix = ""
+        if profile is not PLAIN_PROFILE:
+            print(f"目标编辑器配置: {profile.name}（省略编辑器自动产生的缩进和右括号）")
+            content = self.run_content
+            if isinstance(content, StreamedContent) and content.start:
+                # 从中断处继续：按前文恢复编辑器的缩进状态
+                prefix = resume_context(content.path, content.start)
+        profile.reset(prefix)
+        self.editor_profile = profile
+    
+    def editor_keystrokes(self, content):
+        """按编辑器配置把内容改写为按键序列：("char", 字符)、("key", 按键名)，
+        以及 ("omit", 字符数) 表示由编辑器自动产生、不需要输入的字符"""
+        lines = content.split('\n')
+        for index, line in enumerate(lines):
+            before, text, after = self.editor_profile.plan_line(line)
+            for key in before:
+                yield "key", key
+            for char in text:
+                yield "char", char
+            for key in after:
+                yield "key", key
+            if len(line) > len(text):
+                yield "omit", len(line) - len(text)
+            if index < len(lines) - 1:
+                yield "char", '\n'
+    
+    def press_editor_key(self, name, count=1):
+        """发送编辑器按键（如 shift+Home），连按 count 次，返回是否成功"""
+        keysym, shift, commands = editor_key_commands(name, count)
+        xtest = self.get_xtest(shared=True)
+        if xtest:
+            return all(xtest.press_keysym(keysym, shift) for _ in range(count))
+        return self.run_session_backend("editor_key", commands, timeout=2 + count * 0.01)
+    
+    def get_ydotoold(self):
+        """获取 ydotoold 套接字客户端；守护进程未运行或锁定了目标窗口时返回 None"""
+        if not self.input_tool_available("ydotool"):
+            return None
+        if self.ydotoold is None:
+            client = YdotooldClient(metrics=self.metrics)
+            self.ydotoold = client if client.open() else False
+        return self.ydotoold or None
+    
+    def send_ydotoold(self, cmd):
+        """ydotool 的 key/type 命令直接写入 ydotoold 套接字，成功返回 True；
+        不是 ydotool 命令、守护进程不可用或含布局表之外的字符时返回 False，由调用方启动 ydotool"""
+        if cmd[0] != "ydotool":
+            return False
+        client = self.get_ydotoold()
+        if not client:
+            return False
+        # 命令没有 --key-delay 时按当前速率控制的间隔输入
+        client.key_delay = self.rate.key_delay_ms() / 1000
+        try:
+            return client.run(cmd[1:])
+        except OSError as e:
+            print(f"ydotoold 连接中断，改用 ydotool 进程: {e}")
+            client.close()
+            self.ydotoold = False
+            return False
+    
+    def input_tool_available(self, tool):
+        """输入工具是否可用；锁定窗口时只有 xdotool 能把按键发给指定窗口"""
+        if self.locked_window and tool != "xdotool":
+            return False
+        return self.tools.available(tool)
+    
+    def ensure_target_focus(self):
+        """确保目标窗口获得焦点"""
+        if self.locked_window:
+            # 按键直接发给锁定的窗口，不需要激活
+            return
+        with self.metrics.timed("engine", "ensure_target_focus"):
+            self._ensure_target_focus()
+    
+    def _ensure_target_focus(self):
+        """点击当前鼠标位置激活窗口"""
+        try:
+            # 方法1: 使用鼠标点击来激活窗口
+            print("尝试激活目标窗口...")
+            
+            # 获取鼠标当前位置附近的窗口
+            mouse_result = self.run_tool(["xdotool", "getmouselocation", "--shell"], 
+                                        capture_output=True, text=True, check=True)
+            
+            # 轻微移动鼠标以确保窗口激活
+            self.run_tool(["xdotool", "mousemove_relative", "1", "1"], 
+                         capture_output=True, check=True)
+            self.run_tool(["xdotool", "mousemove_relative", "-1", "-1"], 
+                         capture_output=True, check=True)
+            
+            # 点击当前位置来激活窗口
+            self.run_tool(["xdotool", "click", "1"], 
+                         capture_output=True, check=True)
+            
+            self.metrics.sleep(0.2, "focus")  # 等待窗口激活
+            print("窗口激活完成")
+            
+        except Exception as e:
+            print(f"窗口激活失败: {e}")
+            print("请手动确保目标应用处于活动状态")
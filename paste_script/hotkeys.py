@@ -0,0 +1,187 @@
+"""全局快捷键：在根窗口上抓取组合键"""
+import threading
+import os
+import ctypes
+import ctypes.util
+
+from .xlib import X_KEY_PRESS, X_SHIFT_MASK, XEvent, XTestTyper, init_x_threads
+
+# 全局快捷键：组合键 -> 动作。只抓取这些组合，普通数字键和本程序注入的文本不会触发
+HOTKEYS = {
+    "ctrl+alt+1": "stop",
+    "ctrl+alt+2": "restart",
+    "ctrl+alt+3": "exit",
+    "ctrl+alt+4": "resume",
+}
+
+X_LOCK_MASK = 1 << 1
+
+X_CONTROL_MASK = 1 << 2
+
+X_MOD1_MASK = 1 << 3
+
+X_MOD2_MASK = 1 << 4
+
+X_GRAB_MODE_ASYNC = 1
+
+# 组合键中的修饰键名称 -> X 修饰键掩码（alt 通常是 Mod1）
+X_HOTKEY_MODIFIERS = {"ctrl": X_CONTROL_MASK, "alt": X_MOD1_MASK, "shift": X_SHIFT_MASK}
+
+# 抓取时忽略 CapsLock 和 NumLock（Mod2）的状态
+X_IGNORED_MODIFIERS = (0, X_LOCK_MASK, X_MOD2_MASK, X_LOCK_MASK | X_MOD2_MASK)
+
+X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+def parse_hotkey(combo):
+    """把 ctrl+alt+1 这样的组合键解析为 (修饰键掩码, 按键字符)"""
+    *modifiers, key = combo.lower().split("+")
+    mask = 0
+    for name in modifiers:
+        mask |= X_HOTKEY_MODIFIERS[name]
+    return mask, key
+
+def pynput_hotkey(combo):
+    """转换为 pynput GlobalHotKeys 的写法，如 <ctrl>+<alt>+1"""
+    *modifiers, key = combo.lower().split("+")
+    return "+".join([f"<{name}>" for name in modifiers] + [key])
+
+class XHotkeys:
+    """在根窗口上用 XGrabKey 只抓取注册的组合键：X 服务器只把这些组合送给本程序，
+    其他按键（包括各后端注入的文本）不会唤醒 Python；XSendEvent 合成的事件一律忽略"""
+
+    def __init__(self, bindings):
+        # 组合键 -> 回调
+        self.bindings = bindings
+        self.x11 = None
+        self.display = None
+        self.root = 0
+        # (键码, 修饰键掩码) -> 回调
+        self.grabs = {}
+        self.thread = None
+        self.running = False
+        self.wake_read = self.wake_write = None
+        # 当前组合键抓取失败（已被其他程序占用）产生的 X 错误数
+        self.grab_errors = 0
+        self.error_handler = X_ERROR_HANDLER(self.on_error)
+        # 抓取期间被临时替换的错误处理器（Xlib 的错误处理器是进程全局的）
+        self.previous_handler = None
+
+    def on_error(self, display, error):
+        """记录本连接上的抓取错误而不是让 Xlib 默认处理器终止进程；其他连接的错误交给原处理器"""
+        if display != self.display and self.previous_handler:
+            return self.previous_handler(display, error)
+        self.grab_errors += 1
+        return 0
+
+    def grab(self, keycode, mask):
+        """抓取一个组合键（含忽略的锁定键组合），返回是否成功；
+        只在 XGrabKey 到 XSync 期间替换错误处理器，之后恢复原处理器"""
+        x11 = self.x11
+        previous = x11.XSetErrorHandler(ctypes.cast(self.error_handler, ctypes.c_void_p))
+        self.previous_handler = X_ERROR_HANDLER(previous) if previous else None
+        self.grab_errors = 0
+        try:
+            for ignored in X_IGNORED_MODIFIERS:
+                x11.XGrabKey(self.display, keycode, mask | ignored, self.root, 0,
+                             X_GRAB_MODE_ASYNC, X_GRAB_MODE_ASYNC)
+            x11.XSync(self.display, 0)
+        finally:
+            x11.XSetErrorHandler(previous)
+            self.previous_handler = None
+        return not self.grab_errors
+
+    def start(self):
+        """连接 X 显示并抓取组合键，成功后在后台线程等待按键，失败返回 False"""
+        if not os.environ.get("DISPLAY"):
+            return False
+        x11_path = ctypes.util.find_library("X11")
+        if not x11_path:
+            return False
+        try:
+            self.x11 = x11 = ctypes.cdll.LoadLibrary(x11_path)
+        except OSError:
+            return False
+        init_x_threads()
+
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XConnectionNumber.argtypes = [ctypes.c_void_p]
+        x11.XPending.argtypes = [ctypes.c_void_p]
+        x11.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.POINTER(XEvent)]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XKeysymToKeycode.restype = ctypes.c_ubyte
+        x11.XKeysymToKeycode.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+        x11.XGrabKey.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_uint, ctypes.c_ulong, ctypes.c_int,
+                                 ctypes.c_int, ctypes.c_int]
+        x11.XUngrabKey.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_uint, ctypes.c_ulong]
+        x11.XSetErrorHandler.restype = ctypes.c_void_p
+        x11.XSetErrorHandler.argtypes = [ctypes.c_void_p]
+
+        self.display = x11.XOpenDisplay(None)
+        if not self.display:
+            return False
+        self.root = x11.XDefaultRootWindow(self.display)
+        for combo, callback in self.bindings.items():
+            mask, key = parse_hotkey(combo)
+            keycode = x11.XKeysymToKeycode(self.display, XTestTyper.keysym_for(key))
+            if not keycode:
+                print(f"快捷键 {combo} 的按键不在键盘映射中，已忽略")
+                continue
+            if not self.grab(keycode, mask):
+                print(f"快捷键 {combo} 已被其他程序占用")
+            self.grabs[(keycode, mask)] = callback
+        if not self.grabs:
+            self.release()
+            return False
+
+        self.wake_read, self.wake_write = os.pipe()
+        self.running = True
+        self.thread = threading.Thread(target=self.loop)
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+    def loop(self):
+        """只在抓取的组合键按下时醒来"""
+        import select
+        fd = self.x11.XConnectionNumber(self.display)
+        relevant = ~(X_LOCK_MASK | X_MOD2_MASK)
+        try:
+            while self.running:
+                while self.running and self.x11.XPending(self.display):
+                    event = XEvent()
+                    self.x11.XNextEvent(self.display, ctypes.byref(event))
+                    if event.type != X_KEY_PRESS or event.xkey.send_event:
+                        continue
+                    callback = self.grabs.get((event.xkey.keycode, event.xkey.state & relevant))
+                    if callback:
+                        callback()
+                if self.running:
+                    select.select([fd, self.wake_read], [], [])
+        finally:
+            # X 连接只在本线程中使用和关闭（回调里也可能调用 stop）
+            self.release()
+            os.close(self.wake_read)
+            os.close(self.wake_write)
+
+    def stop(self):
+        """停止监听，释放抓取并断开 X 连接"""
+        if not self.running:
+            return
+        # 先唤醒再清除标志：监听线程只有看到标志清除后才会关闭唤醒管道
+        os.write(self.wake_write, b"x")
+        self.running = False
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+    def release(self):
+        """释放抓取并断开 X 连接"""
+        if self.display:
+            for keycode, mask in self.grabs:
+                for ignored in X_IGNORED_MODIFIERS:
+                    self.x11.XUngrabKey(self.display, keycode, mask | ignored, self.root)
+            self.x11.XCloseDisplay(self.display)
+            self.display = None
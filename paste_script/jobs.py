@@ -0,0 +1,282 @@
+"""进度日志和多文件任务队列"""
+import threading
+import time
+import os
+import json
+import hashlib
+
+from .storage import cache_dir, write_atomic
+from .content import STREAM_READ_BYTES
+
+# 进度检查点写盘的最短间隔（秒）
+JOURNAL_INTERVAL = 1.0
+
+def file_digest(path):
+    """文件原始字节的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(STREAM_READ_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ProgressJournal:
+    """输入进度日志：按文件路径、大小和哈希记录每种输入方法最后确认的字符偏移，中断后可继续输入"""
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path or os.path.join(cache_dir(), "journal.json")
+        self.lock = threading.Lock()
+        self.entries = None
+        self.current = None
+        self.last_flush = 0.0
+
+    def load(self):
+        """读取日志（只读一次）"""
+        if self.entries is None:
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+        return self.entries
+
+    @staticmethod
+    def identity(path, digest=None):
+        """文件标识：绝对路径、大小和哈希；digest 为已经算好的哈希"""
+        return os.path.abspath(path), os.path.getsize(path), digest or file_digest(path)
+
+    def begin(self, path, method, start=0, digest=None):
+        """开始记录一次输入；digest 为已经算好的文件哈希（见 StreamedContent.scan），省去再读一遍文件"""
+        path, size, digest = self.identity(path, digest)
+        with self.lock:
+            entries = self.load()
+            entry = entries.get(path)
+            if not entry or entry.get("size") != size or entry.get("hash") != digest:
+                entry = {"size": size, "hash": digest, "offsets": {}}
+                entries[path] = entry
+            entry["method"] = method
+            entry["offsets"][method] = start
+            entry["updated"] = time.time()
+            self.current = (path, method)
+        self.flush(force=True)
+
+    def checkpoint(self, offset):
+        """记录已确认的字符偏移，按 JOURNAL_INTERVAL 节流写盘"""
+        with self.lock:
+            if self.current is None:
+                return
+            path, method = self.current
+            entry = self.entries[path]
+            entry["offsets"][method] = offset
+            entry["updated"] = time.time()
+        if time.time() - self.last_flush >= JOURNAL_INTERVAL:
+            self.flush()
+
+    def finish(self, completed):
+        """结束记录：完整输入后删除该文件的记录，否则保留最后的偏移"""
+        with self.lock:
+            if self.current is None:
+                return
+            path, _ = self.current
+            self.current = None
+            if completed:
+                self.entries.pop(path, None)
+        self.flush(force=True)
+
+    def resume_point(self, path, method=None):
+        """返回 (方法, 字符偏移)，文件已变化或没有未完成的记录时返回 None"""
+        path, size, digest = self.identity(path)
+        with self.lock:
+            entry = self.load().get(path)
+        if not entry or entry.get("size") != size or entry.get("hash") != digest:
+            return None
+        method = method or entry.get("method")
+        offset = entry["offsets"].get(method, 0)
+        return (method, offset) if offset else None
+
+    def latest(self):
+        """最近中断的文件路径，没有则返回 None"""
+        with self.lock:
+            entries = self.load()
+            pending = [(entry.get("updated", 0), path) for path, entry in entries.items()
+                       if any(entry.get("offsets", {}).values())]
+        return max(pending)[1] if pending else None
+
+    def flush(self, force=False):
+        """写入磁盘"""
+        with self.lock:
+            if not force and time.time() - self.last_flush < JOURNAL_INTERVAL:
+                return
+            self.last_flush = time.time()
+            text = json.dumps(self.load(), ensure_ascii=False)
+        try:
+            write_atomic(self.cache_path, text)
+        except OSError as e:
+            print(f"无法写入进度日志: {e}")
+
+JOB_STATES = {"pending": "等待", "running": "输入中", "done": "完成", "failed": "失败"}
+
+class JobQueue:
+    """持久化的多文件输入队列：每个任务有文件、输入方法、目标窗口 ID 和优先级，
+    并记录进度和吞吐；程序重启后未完成的任务仍在队列中，从进度日志记录的位置继续"""
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path or os.path.join(cache_dir(), "jobs.json")
+        self.lock = threading.Lock()
+        self.data = None
+        self.current = None
+        self.last_flush = 0.0
+
+    def load(self):
+        """读取队列（只读一次）；上次运行中断时正在输入的任务恢复为等待"""
+        if self.data is None:
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                self.data = {"next_id": 1, "jobs": []}
+            for job in self.data["jobs"]:
+                if job["state"] == "running":
+                    job["state"] = "pending"
+        return self.data
+
+    def jobs(self):
+        """所有任务的副本，按队列顺序"""
+        with self.lock:
+            return [dict(job) for job in self.ordered(self.load()["jobs"])]
+
+    @staticmethod
+    def ordered(jobs):
+        """优先级高的在前，同优先级先加入的在前"""
+        return sorted(jobs, key=lambda job: (-job["priority"], job["id"]))
+
+    def find(self, job_id):
+        return next((job for job in self.load()["jobs"] if job["id"] == job_id), None)
+
+    def get(self, job_id):
+        """任务副本，不存在时返回 None"""
+        with self.lock:
+            job = self.find(job_id)
+            return dict(job) if job else None
+
+    def add(self, path, method="auto", window=None, priority=0):
+        """加入任务，返回任务副本"""
+        with self.lock:
+            data = self.load()
+            job = {
+                "id": data["next_id"],
+                "path": os.path.abspath(path),
+                "method": method,
+                "window": str(window) if window else None,
+                "priority": priority,
+                "state": "pending",
+                "added": time.time(),
+                "position": 0,
+                "total": None,
+                "chars": 0,
+                "skipped": 0,
+                "seconds": 0.0,
+                "chars_per_sec": None,
+                "error": None,
+            }
+            data["next_id"] += 1
+            data["jobs"].append(job)
+            job = dict(job)
+        self.flush(force=True)
+        return job
+
+    def remove(self, job_id):
+        """删除任务，返回是否存在"""
+        with self.lock:
+            job = self.find(job_id)
+            if job:
+                self.data["jobs"].remove(job)
+        self.flush(force=True)
+        return job is not None
+
+    def clear(self, states=("done", "failed")):
+        """删除处于给定状态的任务，返回删除数"""
+        with self.lock:
+            jobs = self.load()["jobs"]
+            kept = [job for job in jobs if job["state"] not in states]
+            removed = len(jobs) - len(kept)
+            self.data["jobs"] = kept
+        self.flush(force=True)
+        return removed
+
+    def next_job(self):
+        """下一个等待中的任务（副本），没有则返回 None"""
+        with self.lock:
+            pending = [job for job in self.load()["jobs"] if job["state"] == "pending"]
+            return dict(self.ordered(pending)[0]) if pending else None
+
+    def begin(self, job_id, position, total):
+        """开始输入任务"""
+        with self.lock:
+            job = self.find(job_id)
+            job.update(state="running", position=position, total=total, error=None)
+            job["started"] = time.time()
+            self.current = job
+        self.flush(force=True)
+
+    def checkpoint(self, position):
+        """记录当前任务的进度，按 JOURNAL_INTERVAL 节流写盘"""
+        with self.lock:
+            if self.current is None:
+                return
+            self.current["position"] = position
+        if time.time() - self.last_flush >= JOURNAL_INTERVAL:
+            self.flush()
+
+    def finish(self, job_id, state, progress=None, chars=0, skipped=0, error=None):
+        """结束任务：state 为 done、failed 或 pending（被停止，下次从中断处继续），
+        progress 为 ProgressChannel 快照，吞吐按输入阶段计算，不含倒计时"""
+        with self.lock:
+            job = self.find(job_id)
+            if job is None:
+                return
+            job.update(state=state, error=error, finished=time.time())
+            job["chars"] += chars
+            job["skipped"] += skipped
+            if progress:
+                job["position"] = progress["position"]
+                if state == "done":
+                    # 总字符数是估计值（预处理会去掉末尾空白），完成后以实际位置为准
+                    job["total"] = job["position"]
+                job["seconds"] = round(job["seconds"] + progress["elapsed"], 3)
+                job["chars_per_sec"] = round(job["chars"] / job["seconds"], 2) if job["seconds"] else None
+            if self.current is job:
+                self.current = None
+        self.flush(force=True)
+
+    @staticmethod
+    def describe(job):
+        """一行任务摘要：状态、进度和吞吐"""
+        if job["total"]:
+            percent = min(100.0, job["position"] * 100.0 / job["total"])
+            done = f"{job['position']}/{job['total']} 字符（{percent:.0f}%）"
+        else:
+            done = f"{job['position']} 字符"
+        state = JOB_STATES[job["state"]]
+        if job["state"] == "pending" and job["position"]:
+            state = "已中断"
+        text = (f"[{job['id']}] {os.path.basename(job['path'])} 优先级 {job['priority']} "
+                f"方法 {job['method']} 窗口 {job['window'] or '倒计时选择'}: {state} {done}")
+        if job["chars_per_sec"]:
+            text += f"，{job['chars_per_sec']:.1f} 字符/秒"
+        if job["skipped"]:
+            text += f"，跳过 {job['skipped']} 字符"
+        if job["error"]:
+            text += f"（{job['error']}）"
+        return text
+
+    def flush(self, force=False):
+        """写入磁盘"""
+        with self.lock:
+            if not force and time.time() - self.last_flush < JOURNAL_INTERVAL:
+                return
+            self.last_flush = time.time()
+            text = json.dumps(self.load(), ensure_ascii=False)
+        try:
+            write_atomic(self.cache_path, text)
+        except OSError as e:
+            print(f"无法写入任务队列: {e}")
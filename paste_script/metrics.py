@@ -0,0 +1,335 @@
+"""计量、速率控制和各目标程序上的后端历史"""
+import threading
+import time
+import os
+import json
+
+from .storage import cache_dir, write_atomic
+
+# 后端历史：每次记录前旧数据乘以该系数，较早的结果逐渐失去权重
+HISTORY_DECAY = 0.8
+
+# 同一目标程序每运行这么多次自动模式，先试一次最久没有试过的方法，避免排序过时
+HISTORY_EXPLORE_EVERY = 10
+
+# 超过该字符数的内容不做探索（慢的方法在大文件上代价太高）
+HISTORY_EXPLORE_MAX_CHARS = 5000
+
+class BackendHistory:
+    """按目标程序（窗口类名）记录各输入方法的成功率和实测吞吐，自动模式据此排序"""
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path or os.path.join(cache_dir(), "backend_history.json")
+        self.lock = threading.Lock()
+        self.entries = None
+
+    def load(self):
+        """读取历史（只读一次）"""
+        if self.entries is None:
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+        return self.entries
+
+    @staticmethod
+    def target_key(window):
+        """目标程序标识：优先用窗口类名，否则取标题最后一段（多数程序的标题是“文档 - 程序名”）"""
+        if not window:
+            return "unknown"
+        if window.get("class"):
+            return window["class"].lower()
+        name = window.get("name", "").rsplit(" - ", 1)[-1].strip()
+        return name.lower() or "unknown"
+
+    @staticmethod
+    def score(stats):
+        """(成功率, 字符/秒)；成功率加一平滑，只试过一两次的方法不会被一次结果定死"""
+        rate = (stats["successes"] + 1) / (stats["attempts"] + 2)
+        speed = stats["chars"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+        return rate, speed
+
+    def rank(self, key, methods, explore=True):
+        """把方法 ID 按历史排序：成功率过半的按 成功率×吞吐 从高到低，没试过的保持原顺序，
+        多半失败的排最后。每 HISTORY_EXPLORE_EVERY 次把最久没试过的方法提到最前。
+        返回 (排序后的方法, 被探索的方法或 None)"""
+        with self.lock:
+            entry = self.load().setdefault(key, {"runs": 0, "methods": {}})
+            entry["runs"] += 1
+            runs = entry["runs"]
+            stats = {method: dict(entry["methods"][method]) for method in methods if method in entry["methods"]}
+
+        def order(item):
+            index, method = item
+            if method not in stats:
+                return (1, 0.0, index)
+            rate, speed = self.score(stats[method])
+            if rate >= 0.5:
+                return (0, -rate * speed, index)
+            return (2, -rate, index)
+
+        ranked = [method for _, method in sorted(enumerate(methods), key=order)]
+        explored = None
+        if explore and stats and runs % HISTORY_EXPLORE_EVERY == 0 and len(ranked) > 1:
+            explored = min(ranked[1:], key=lambda method: stats.get(method, {}).get("updated", 0))
+            ranked.remove(explored)
+            ranked.insert(0, explored)
+        return ranked, explored
+
+    def record(self, key, method, success, chars, seconds):
+        """记录一次尝试：success 为方法成功且确实输入了字符，chars/seconds 为实际到达目标的字符和耗时"""
+        with self.lock:
+            entry = self.load().setdefault(key, {"runs": 0, "methods": {}})
+            stats = entry["methods"].setdefault(
+                method, {"attempts": 0.0, "successes": 0.0, "chars": 0.0, "seconds": 0.0})
+            for field in ("attempts", "successes", "chars", "seconds"):
+                stats[field] *= HISTORY_DECAY
+            stats["attempts"] += 1
+            stats["successes"] += bool(success)
+            if success:
+                stats["chars"] += chars
+                stats["seconds"] += seconds
+            stats["updated"] = time.time()
+            text = json.dumps(self.entries, ensure_ascii=False)
+        try:
+            write_atomic(self.cache_path, text)
+        except OSError as e:
+            print(f"无法写入后端历史: {e}")
+
+    def describe(self, key):
+        """某个目标程序的历史摘要，每个方法一行"""
+        with self.lock:
+            entry = self.load().get(key)
+            methods = dict(entry["methods"]) if entry else {}
+        scored = [(method, stats) + self.score(stats) for method, stats in methods.items()]
+        lines = []
+        for method, stats, rate, speed in sorted(scored, key=lambda item: -item[2] * item[3]):
+            lines.append(f"{method}: 成功率 {rate * 100:.0f}%，{speed:.1f} 字符/秒（{stats['attempts']:.1f} 次加权尝试）")
+        return lines
+
+# 延迟直方图的桶上限（秒），与 Prometheus 直方图一致，最后一个桶为 +Inf
+METRIC_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metrics:
+    """热路径计量：按后端和操作统计次数、累计耗时和延迟直方图，以及输入/跳过的字符数"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """开始新的一次运行"""
+        with self.lock:
+            self.started = time.time()
+            self.finished = None
+            # (后端, 操作) -> {"count", "failures", "seconds", "buckets"}
+            self.operations = {}
+            self.chars_typed = 0
+            self.chars_skipped = 0
+            # 运行结束时补输入的字符数和仍缺失的片段（偏移, 长度）
+            self.chars_repaired = 0
+            self.missing_spans = []
+
+    def record(self, backend, operation, seconds, ok=True):
+        """记录一次操作"""
+        with self.lock:
+            stats = self.operations.get((backend, operation))
+            if stats is None:
+                stats = {"count": 0, "failures": 0, "seconds": 0.0, "buckets": [0] * (len(METRIC_BUCKETS) + 1)}
+                self.operations[(backend, operation)] = stats
+            stats["count"] += 1
+            stats["seconds"] += seconds
+            if not ok:
+                stats["failures"] += 1
+            for i, bound in enumerate(METRIC_BUCKETS):
+                if seconds <= bound:
+                    stats["buckets"][i] += 1
+                    break
+            else:
+                stats["buckets"][-1] += 1
+
+    def timed(self, backend, operation):
+        """计时上下文管理器，异常视为失败"""
+        return _TimedOperation(self, backend, operation)
+
+    def sleep(self, seconds, reason):
+        """计时的 time.sleep"""
+        started = time.perf_counter()
+        time.sleep(seconds)
+        self.record("sleep", reason, time.perf_counter() - started)
+
+    def add_chars(self, count):
+        """记录已输入的字符数"""
+        with self.lock:
+            self.chars_typed += count
+
+    def add_skipped(self, count=1):
+        """记录跳过（输入失败）的字符数"""
+        with self.lock:
+            self.chars_skipped += count
+
+    def add_repaired(self, count):
+        """记录补输入成功的字符数"""
+        with self.lock:
+            self.chars_repaired += count
+
+    def snapshot(self):
+        """生成运行报告"""
+        with self.lock:
+            finished = self.finished or time.time()
+            operations = []
+            for (backend, operation), stats in sorted(self.operations.items()):
+                operations.append({
+                    "backend": backend,
+                    "operation": operation,
+                    "count": stats["count"],
+                    "failures": stats["failures"],
+                    "seconds": round(stats["seconds"], 6),
+                    "buckets": {str(bound): count for bound, count in
+                                zip(METRIC_BUCKETS + ("+Inf",), stats["buckets"])},
+                })
+            return {
+                "started": self.started,
+                "seconds": round(finished - self.started, 6),
+                "chars_typed": self.chars_typed,
+                "chars_skipped": self.chars_skipped,
+                "chars_repaired": self.chars_repaired,
+                "chars_missing": sum(count for _, count in self.missing_spans),
+                "missing_spans": [list(span) for span in self.missing_spans],
+                "operations": operations,
+            }
+
+    def write_json(self, path):
+        """写入 JSON 运行报告"""
+        write_atomic(path, json.dumps(self.snapshot(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path):
+        """写入 Prometheus textfile（node_exporter textfile collector 格式）"""
+        report = self.snapshot()
+        lines = [
+            "# HELP paste_script_chars_typed_total Characters typed in the last run.",
+            "# TYPE paste_script_chars_typed_total counter",
+            f"paste_script_chars_typed_total {report['chars_typed']}",
+            "# HELP paste_script_chars_skipped_total Characters skipped in the last run.",
+            "# TYPE paste_script_chars_skipped_total counter",
+            f"paste_script_chars_skipped_total {report['chars_skipped']}",
+            "# HELP paste_script_chars_repaired_total Skipped characters re-injected at the end of the last run.",
+            "# TYPE paste_script_chars_repaired_total counter",
+            f"paste_script_chars_repaired_total {report['chars_repaired']}",
+            "# HELP paste_script_chars_missing Characters still missing after the last run.",
+            "# TYPE paste_script_chars_missing gauge",
+            f"paste_script_chars_missing {report['chars_missing']}",
+            "# HELP paste_script_run_seconds Duration of the last run.",
+            "# TYPE paste_script_run_seconds gauge",
+            f"paste_script_run_seconds {report['seconds']}",
+            "# HELP paste_script_operation_failures_total Failed operations per backend.",
+            "# TYPE paste_script_operation_failures_total counter",
+        ]
+        for op in report["operations"]:
+            labels = f'backend="{op["backend"]}",operation="{op["operation"]}"'
+            lines.append(f"paste_script_operation_failures_total{{{labels}}} {op['failures']}")
+        lines += [
+            "# HELP paste_script_operation_seconds Latency of tool invocations and sleeps.",
+            "# TYPE paste_script_operation_seconds histogram",
+        ]
+        for op in report["operations"]:
+            labels = f'backend="{op["backend"]}",operation="{op["operation"]}"'
+            cumulative = 0
+            for bound, count in op["buckets"].items():
+                cumulative += count
+                lines.append(f'paste_script_operation_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"paste_script_operation_seconds_sum{{{labels}}} {op['seconds']}")
+            lines.append(f"paste_script_operation_seconds_count{{{labels}}} {op['count']}")
+        write_atomic(path, "\n".join(lines) + "\n")
+
+class _TimedOperation:
+    """Metrics.timed 返回的上下文管理器"""
+
+    def __init__(self, metrics, backend, operation):
+        self.metrics = metrics
+        self.backend = backend
+        self.operation = operation
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.backend, self.operation, time.perf_counter() - self.started, exc_type is None)
+        return False
+
+class RateController:
+    """AIMD 输入速率控制器：调用在延迟预算内成功时加性提速，超时、失败或跳过字符时乘性降速"""
+
+    # 原先固定等待时间对应的倍数（以每字符延迟为单位，初始速率下与旧值一致）
+    PAUSE_LINE = 1.25       # 每行前后 0.1 秒
+    PAUSE_NEWLINE = 2.0     # 换行后 0.15 秒
+    PAUSE_PASTE = 2.5       # 每次粘贴前 0.2 秒
+    PAUSE_CLIPBOARD = 6.0   # 设置/恢复剪贴板后 0.5 秒
+    PAUSE_NAMES = {1.0: "char", PAUSE_LINE: "line", PAUSE_NEWLINE: "newline",
+                   PAUSE_PASTE: "paste", PAUSE_CLIPBOARD: "clipboard"}
+
+    def __init__(self, initial_cps=12.5, min_cps=2.0, max_cps=500.0,
+                 increase=2.0, decrease=0.5, spawn_budget=0.25):
+        self.initial_cps = initial_cps
+        self.min_cps = min_cps
+        self.max_cps = max_cps
+        self.increase = increase
+        self.decrease = decrease
+        # 每次工具调用在按键耗时之外允许的额外耗时（秒）
+        self.spawn_budget = spawn_budget
+        self.lock = threading.Lock()
+        self.cps = initial_cps
+        # 设置后所有等待都计入该 Metrics
+        self.metrics = None
+
+    def reset(self):
+        """恢复初始速率"""
+        with self.lock:
+            self.cps = self.initial_cps
+
+    def char_delay(self):
+        """当前每字符延迟（秒）"""
+        return 1.0 / self.cps
+
+    def key_delay_ms(self):
+        """传给 xdotool/ydotool 的按键延迟（毫秒）"""
+        return max(1, int(1000 / self.cps))
+
+    def budget(self, chars=1):
+        """输入 chars 个字符的调用允许的最长耗时"""
+        return chars * self.char_delay() + self.spawn_budget
+
+    def success(self, elapsed, chars=1):
+        """记录一次成功调用，在预算内则加性提速，超出预算按超时处理"""
+        if elapsed > self.budget(chars):
+            self.failure()
+            return
+        with self.lock:
+            self.cps = min(self.max_cps, self.cps + self.increase)
+
+    def failure(self):
+        """记录一次超时、失败或跳过字符，乘性降速"""
+        with self.lock:
+            self.cps = max(self.min_cps, self.cps * self.decrease)
+
+    def pause(self, units=1.0):
+        """按当前速率等待 units 个字符的时间"""
+        seconds = units * self.char_delay()
+        if self.metrics:
+            self.metrics.sleep(seconds, self.PAUSE_NAMES.get(units, "pause"))
+        else:
+            time.sleep(seconds)
+
+    def describe(self):
+        """状态栏显示的速率"""
+        return f"{self.cps:.1f} 字符/秒"
+
+# 速率档位：RateController 的初始参数
+DELAY_PROFILES = {
+    "fast": {"initial_cps": 50.0, "max_cps": 1000.0, "increase": 5.0},
+    "normal": {},
+    "safe": {"initial_cps": 8.0, "max_cps": 40.0, "increase": 1.0},
+}
@@ -0,0 +1,113 @@
+"""分段规划：按字符类别把内容切分为各后端输入的段"""
+import os
+import re
+import json
+import hashlib
+
+from .storage import cache_dir, write_atomic
+
+# 分段规划：把内容切成 ASCII、非键盘字符、换行和长段落几类，每段交给最便宜的可用后端
+PLAN_VERSION = 1
+
+# 不含空行且超过该字符数的段落整体作为一块粘贴
+PLAN_BLOCK_CHARS = 2000
+
+# 夹在两段非键盘字符之间、短于该长度的 ASCII 段并入前后段，避免来回切换后端
+PLAN_MERGE_ASCII = 4
+
+# 磁盘上最多保留的规划数
+PLAN_CACHE_MAX = 64
+
+PLAN_RUN_RE = re.compile(r'\n|[\t\x20-\x7e]+|[^\n\t\x20-\x7e]+')
+
+PLAN_PARAGRAPH_RE = re.compile(r'\n{2,}')
+
+# 每类段依次尝试的后端，越靠前越便宜
+PLAN_ROUTES = {
+    "ascii": ("xdotool", "xtest", "ydotool", "wtype"),
+    "unicode": ("clipboard", "xtest", "xdotool", "wtype"),
+    "newline": ("xtest", "xdotool", "ydotool", "wtype"),
+    "block": ("clipboard", "xdotool", "xtest", "ydotool"),
+}
+
+PLAN_KIND_NAMES = {"ascii": "ASCII", "unicode": "非键盘字符", "newline": "换行", "block": "长段落"}
+
+def plan_segments(text):
+    """把文本切分为 [(类别, 起点, 终点)]，相邻段首尾相接覆盖全文"""
+    runs = []
+
+    def add(kind, start, end):
+        if runs and runs[-1][0] == kind and kind != "newline":
+            runs[-1][2] = end
+        elif (kind == "unicode" and len(runs) >= 2 and runs[-1][0] == "ascii"
+              and runs[-1][2] - runs[-1][1] < PLAN_MERGE_ASCII and runs[-2][0] == "unicode"):
+            runs.pop()
+            runs[-1][2] = end
+        else:
+            runs.append([kind, start, end])
+
+    def add_paragraph(start, end):
+        if end - start >= PLAN_BLOCK_CHARS:
+            add("block", start, end)
+            return
+        for match in PLAN_RUN_RE.finditer(text, start, end):
+            char = match.group()[0]
+            if char == '\n':
+                kind = "newline"
+            elif char == '\t' or ' ' <= char <= '~':
+                kind = "ascii"
+            else:
+                kind = "unicode"
+            add(kind, match.start(), match.end())
+
+    position = 0
+    for match in PLAN_PARAGRAPH_RE.finditer(text):
+        add_paragraph(position, match.start())
+        for i in range(match.start(), match.end()):
+            add("newline", i, i + 1)
+        position = match.end()
+    add_paragraph(position, len(text))
+    return [tuple(run) for run in runs]
+
+class PlanCache:
+    """分段规划缓存：按内容哈希保存到磁盘，重复输入同一文件时跳过规划"""
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path or os.path.join(cache_dir(), "plans")
+        self.plans = {}
+
+    @staticmethod
+    def key(text):
+        """内容哈希，规划参数变化时缓存随之失效"""
+        digest = hashlib.sha256(text.encode('utf-8', errors='surrogatepass'))
+        digest.update(f"{PLAN_VERSION}:{PLAN_BLOCK_CHARS}:{PLAN_MERGE_ASCII}".encode())
+        return digest.hexdigest()
+
+    def get(self, text):
+        """返回缓存的规划，没有则规划并保存"""
+        key = self.key(text)
+        plan = self.plans.get(key) or self.load(key)
+        if plan is None:
+            plan = plan_segments(text)
+            self.save(key, plan)
+        self.plans[key] = plan
+        return plan
+
+    def load(self, key):
+        """读取磁盘缓存"""
+        try:
+            with open(os.path.join(self.cache_path, f"{key}.json"), 'r', encoding='utf-8') as f:
+                return [tuple(run) for run in json.load(f)]
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save(self, key, plan):
+        """写入磁盘缓存，超出数量时删除最旧的规划"""
+        try:
+            write_atomic(os.path.join(self.cache_path, f"{key}.json"), json.dumps(plan))
+            entries = [entry for entry in os.scandir(self.cache_path) if entry.name.endswith(".json")]
+            entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+            for entry in entries[:-PLAN_CACHE_MAX]:
+                os.unlink(entry.path)
+        except OSError as e:
+            print(f"无法写入规划缓存: {e}")
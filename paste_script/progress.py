@@ -0,0 +1,94 @@
+"""进度通道和跳过字符账本"""
+import time
+
+# 界面读取进度的帧间隔（毫秒）和命令行刷新间隔（秒）
+UI_FRAME_INTERVAL = 100
+
+CLI_FRAME_INTERVAL = 0.5
+
+def format_duration(seconds):
+    """把秒数格式化为 分:秒 或 时:分:秒"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+class ProgressChannel:
+    """最新值进度通道：输入线程只做属性赋值（无锁）发布计数，界面和命令行按固定帧率读取，过期的中间值直接被覆盖"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, start=0, total=None):
+        """开始新的一次运行，start 为起始字符偏移，total 为总字符数（可为估计值）"""
+        self.start = start
+        self.total = total
+        self.position = start
+        self.backend = None
+        self.started = None
+
+    def stage(self, backend):
+        """切换当前后端，第一次调用时开始计时"""
+        if self.started is None:
+            self.started = time.time()
+        self.backend = backend
+
+    def publish(self, position):
+        """发布当前字符偏移"""
+        self.position = position
+
+    def snapshot(self):
+        """读取一致的进度快照：吞吐、已用时间和剩余时间"""
+        started, position, total, backend = self.started, self.position, self.total, self.backend
+        elapsed = time.time() - started if started else 0.0
+        done = position - self.start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = max(0.0, (total - position) / rate) if total and rate > 0 else None
+        return {
+            "backend": backend,
+            "position": position,
+            "total": total,
+            "elapsed": round(elapsed, 3),
+            "chars_per_sec": round(rate, 2),
+            "eta": round(eta, 3) if eta is not None else None,
+        }
+
+    def describe(self):
+        """状态栏显示的进度，尚未开始输入时返回 None"""
+        snapshot = self.snapshot()
+        if not snapshot["backend"]:
+            return None
+        if snapshot["total"]:
+            percent = min(100.0, snapshot["position"] * 100.0 / snapshot["total"])
+            done = f"{snapshot['position']}/{snapshot['total']} 字符（{percent:.0f}%）"
+        else:
+            done = f"{snapshot['position']} 字符"
+        eta = format_duration(snapshot["eta"]) if snapshot["eta"] is not None else "--:--"
+        return (f"{snapshot['backend']}: {done}，{snapshot['chars_per_sec']:.1f} 字符/秒，"
+                f"已用 {format_duration(snapshot['elapsed'])}，剩余 {eta}")
+
+class SkipLedger:
+    """跳过字符账本：按字符偏移记录输入失败的片段，运行结束时据此只补输入缺失的部分"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        # [偏移, 长度, 是否确定未输入]；超时中断的行可能已经输入了一部分，记为不确定
+        self.spans = []
+
+    def record(self, offset, count, certain=True):
+        """记录从 offset 开始的 count 个字符没有输入，与上一段相接时合并"""
+        if count <= 0:
+            return
+        if self.spans:
+            last = self.spans[-1]
+            if last[0] + last[1] == offset and last[2] == certain:
+                last[1] += count
+                return
+        self.spans.append([offset, count, certain])
+
+    def missing(self, start=None, end=None):
+        """[start, end) 内仍缺失的字符数"""
+        return sum(count for offset, count, _ in self.spans
+                   if (start is None or offset >= start) and (end is None or offset + count <= end))
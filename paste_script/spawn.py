@@ -0,0 +1,301 @@
+"""进程启动助手：在很小的子进程中代为启动工具命令"""
+import subprocess
+import threading
+import sys
+import os
+import json
+import base64
+
+from .content import PipeFeed
+
+# 启动助手进程的源码：只导入标准库的几个模块，按行读取 JSON 请求启动工具进程，
+# 结束后回复退出码、输出和启动耗时；{"kill": id} 终止正在运行的进程（还没启动完的进程登记后立即终止），
+# 标准输入关闭时退出
+SPAWN_HELPER_SOURCE = r"""
+import base64, json, os, subprocess, sys, threading, time
+lock = threading.Lock()
+running = {}
+killed = set()
+
+def reply(message):
+    data = (json.dumps(message) + "\n").encode()
+    with lock:
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+def run(request):
+    started = time.perf_counter()
+    output = subprocess.PIPE if request["capture"] else subprocess.DEVNULL
+    try:
+        process = subprocess.Popen(request["cmd"], stdout=output, stderr=output, env=request.get("env"),
+                                   stdin=subprocess.PIPE if "input" in request else subprocess.DEVNULL)
+    except OSError as e:
+        reply({"id": request["id"], "errno": e.errno, "error": e.strerror or str(e), "filename": e.filename,
+               "spawn": time.perf_counter() - started})
+        return
+    spawned = time.perf_counter()
+    with lock:
+        running[request["id"]] = process
+        if request["id"] in killed:
+            killed.discard(request["id"])
+            process.kill()
+    data = base64.b64decode(request["input"]) if "input" in request else None
+    try:
+        stdout, stderr = process.communicate(data)
+    except BrokenPipeError:
+        stdout, stderr = b"", b""
+        process.wait()
+    with lock:
+        running.pop(request["id"], None)
+        killed.discard(request["id"])
+    reply({"id": request["id"], "returncode": process.returncode,
+           "stdout": base64.b64encode(stdout or b"").decode(), "stderr": base64.b64encode(stderr or b"").decode(),
+           "spawn": spawned - started, "elapsed": time.perf_counter() - started})
+
+for line in sys.stdin.buffer:
+    request = json.loads(line)
+    if "kill" in request:
+        with lock:
+            process = running.get(request["kill"])
+            if not process:
+                killed.add(request["kill"])
+        if process:
+            process.kill()
+        continue
+    threading.Thread(target=run, args=(request,), daemon=True).start()
+
+# 直接退出：解释器正常收尾时，刚回复完的守护线程可能还占着 stdout 的锁，收尾会卡住
+os._exit(0)
+"""
+
+class SpawnCall:
+    """通过启动助手运行的一个工具进程；结束时 result 为助手的回复"""
+
+    def __init__(self, helper, call_id):
+        self.helper = helper
+        self.id = call_id
+        self.result = None
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+        self.callbacks = []
+
+    def finish(self, result):
+        with self.lock:
+            self.result = result
+            self.done.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def on_done(self, callback):
+        """结束时（在助手的读取线程中）调用 callback，已结束时立即调用"""
+        with self.lock:
+            if not self.done.is_set():
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def kill(self):
+        self.helper.kill(self.id)
+
+    def outcome(self):
+        """(退出码, 标准输出, 标准错误)；进程没能启动时抛出相应的 OSError"""
+        result = self.result
+        if "returncode" not in result:
+            raise OSError(result.get("errno") or 0, result["error"], result.get("filename"))
+        return (result["returncode"], base64.b64decode(result["stdout"]), base64.b64decode(result["stderr"]))
+
+# 启动助手和直接启动各先试这么多次再比较耗时
+SPAWN_CALIBRATION = 8
+
+# 之后每这么多次启动改走另一条路径一次，跟上进程变大等变化
+SPAWN_RECHECK = 128
+
+# 启动耗时指数移动平均的新样本权重
+SPAWN_COST_ALPHA = 0.2
+
+# 请求终止后等待助手回复的最长时间（秒），助手卡住时调用方也不会一直等下去
+SPAWN_KILL_TIMEOUT = 1.0
+
+# 经启动助手转发的标准输入上限（字节）：助手按 JSON 整块转发，更大的输入和 PipeFeed 流式输入直接启动
+SPAWN_HELPER_MAX_INPUT = 64 * 1024
+
+def helper_accepts(input):
+    """标准输入能否经启动助手转发（str 按 UTF-8 最坏情况每字符 4 字节估算，不为此编码一遍）"""
+    if input is None:
+        return True
+    if isinstance(input, PipeFeed):
+        return False
+    size = len(input) if isinstance(input, bytes) else len(input) * 4
+    return size <= SPAWN_HELPER_MAX_INPUT
+
+class SpawnHelper:
+    """启动助手：程序一开始（加载图形界面和文件内容之前）启动的小进程，代为启动工具命令。
+    大进程里有 Tk、监听线程和大段文本，fork 时要复制它们的页表；助手进程很小，启动耗时不随文件变大而增加。
+    每次启动的耗时由助手测量并随结果返回。能用 vfork 的 Python（3.10+ 的 Linux）直接启动本来就不受进程大小影响，
+    这时经助手反而多一次管道往返，所以按实测的两条路径耗时选择更快的一条"""
+
+    def __init__(self):
+        self.process = None
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.next_id = 1
+        # 两条路径的启动开销（秒，指数移动平均；助手一侧含管道往返）和样本数
+        self.cost = {True: None, False: None}
+        self.samples = {True: 0, False: 0}
+        self.decisions = 0
+        self.preferred = None
+        # 助手启动时的环境变量；之后有变化时随请求发送完整环境
+        self.environ = None
+
+    def start(self):
+        """启动助手进程，失败时返回 False"""
+        self.environ = dict(os.environ)
+        try:
+            self.process = subprocess.Popen([sys.executable, "-I", "-S", "-c", SPAWN_HELPER_SOURCE],
+                                            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        except OSError as e:
+            print(f"无法启动进程启动助手: {e}")
+            self.process = None
+            return False
+        reader = threading.Thread(target=self.read_replies)
+        reader.daemon = True
+        reader.start()
+        return True
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def use_helper(self):
+        """本次启动是否经助手：先分别校准，之后选耗时低的，并定期复查另一条路径"""
+        self.decisions += 1
+        if self.samples[True] < SPAWN_CALIBRATION:
+            return True
+        if self.samples[False] < SPAWN_CALIBRATION:
+            return False
+        preferred = self.cost[True] <= self.cost[False]
+        if preferred != self.preferred:
+            self.preferred = preferred
+            print(f"工具进程改为{'经启动助手' if preferred else '直接'}启动"
+                  f"（助手 {self.cost[True] * 1000:.2f} 毫秒，直接 {self.cost[False] * 1000:.2f} 毫秒）")
+        if self.decisions % SPAWN_RECHECK == 0:
+            return not preferred
+        return preferred
+
+    def observe(self, via_helper, seconds):
+        """记录一次启动开销（经助手时为助手测得的启动耗时加管道往返）"""
+        cost = self.cost[via_helper]
+        samples = self.samples[via_helper] = self.samples[via_helper] + 1
+        # 校准阶段取平均，避免第一次（冷启动）的样本权重过大
+        alpha = max(1.0 / samples, SPAWN_COST_ALPHA)
+        self.cost[via_helper] = seconds if cost is None else cost + alpha * (seconds - cost)
+
+    def submit(self, cmd, input=None, capture=False):
+        """请求启动 cmd，返回 SpawnCall；助手已退出时抛出 OSError"""
+        request = {"cmd": list(cmd), "capture": capture}
+        if os.environ != self.environ:
+            request["env"] = dict(os.environ)
+        if input is not None:
+            request["input"] = base64.b64encode(input).decode()
+        with self.lock:
+            call = SpawnCall(self, self.next_id)
+            request["id"] = call.id
+            self.next_id += 1
+            self.calls[call.id] = call
+            try:
+                self.process.stdin.write((json.dumps(request) + "\n").encode())
+                self.process.stdin.flush()
+            except (OSError, ValueError, AttributeError) as e:
+                self.calls.pop(call.id, None)
+                raise OSError(f"进程启动助手不可用: {e}")
+        return call
+
+    def kill(self, call_id):
+        """终止正在运行的进程（结果仍会正常返回）"""
+        with self.lock:
+            try:
+                self.process.stdin.write((json.dumps({"kill": call_id}) + "\n").encode())
+                self.process.stdin.flush()
+            except (OSError, ValueError, AttributeError):
+                pass
+
+    def run(self, cmd, input=None, timeout=None, capture=False, running=None):
+        """同步运行，超时时终止进程并抛出 subprocess.TimeoutExpired；返回 (SpawnCall, 退出码, 输出, 错误输出)。
+        running 为 RunningTools 时运行期间登记在其中，可从其他线程终止"""
+        call = self.submit(cmd, input, capture)
+        if running is not None:
+            running.add(call)
+        try:
+            if not call.done.wait(timeout):
+                call.kill()
+                call.done.wait(SPAWN_KILL_TIMEOUT)
+                raise subprocess.TimeoutExpired(cmd, timeout)
+        finally:
+            if running is not None:
+                running.discard(call)
+        return (call,) + call.outcome()
+
+    def read_replies(self):
+        """读取助手的回复并交给对应的调用；助手退出时让所有未完成的调用失败"""
+        for line in self.process.stdout:
+            result = json.loads(line)
+            with self.lock:
+                call = self.calls.pop(result["id"], None)
+            if call:
+                call.finish(result)
+        with self.lock:
+            pending, self.calls = list(self.calls.values()), {}
+        for call in pending:
+            call.finish({"error": "进程启动助手已退出"})
+
+    def close(self):
+        if self.process:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+class RunningTools:
+    """同步方法正在等待的工具进程（subprocess.Popen 或 SpawnCall），停止时可从其他线程一并终止"""
+
+    def __init__(self):
+        self.items = set()
+        self.lock = threading.Lock()
+
+    def add(self, item):
+        with self.lock:
+            self.items.add(item)
+
+    def discard(self, item):
+        with self.lock:
+            self.items.discard(item)
+
+    def kill_all(self):
+        with self.lock:
+            items = list(self.items)
+        for item in items:
+            item.kill()
+
+# 程序启动时创建的进程启动助手，None 表示未启用
+_spawn_helper = None
+
+def start_spawn_helper():
+    """在加载图形界面和文件内容之前启动进程启动助手；设置 PASTE_SCRIPT_NO_SPAWN_HELPER 时不启用"""
+    global _spawn_helper
+    if _spawn_helper is None and not os.environ.get("PASTE_SCRIPT_NO_SPAWN_HELPER"):
+        helper = SpawnHelper()
+        if helper.start():
+            _spawn_helper = helper
+    return _spawn_helper
+
+def spawn_helper():
+    """正在运行的进程启动助手，没有则返回 None"""
+    if _spawn_helper is not None and _spawn_helper.alive:
+        return _spawn_helper
+    return None
@@ -0,0 +1,16 @@
+"""缓存目录和原子写入"""
+import os
+
+def cache_dir():
+    """本程序的缓存目录"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "paste_script")
+
+def write_atomic(path, text):
+    """先写临时文件再改名，避免读取方看到半个文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp{os.getpid()}"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
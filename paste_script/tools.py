@@ -0,0 +1,474 @@
+"""外部输入工具：ydotoold 套接字、xdotool 脚本会话、工具探测和命令行改写"""
+import subprocess
+import threading
+import time
+import os
+import queue
+import re
+import json
+import shutil
+import socket
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from .storage import cache_dir, write_atomic
+from .content import iter_segments, LineChunker
+from .spawn import helper_accepts, RunningTools, spawn_helper
+
+def ydotool_type_command(key_delay_ms):
+    """从标准输入读取文本的 ydotool type 命令（配合 PipeFeed 或 input= 使用）"""
+    return ["ydotool", "type", "--file", "-", "--key-delay", str(key_delay_ms)]
+
+# ydotoold 接收的 Linux input_event（struct timeval + type + code + value），每个事件一个数据报
+INPUT_EVENT = struct.Struct("@llHHi")
+
+EV_SYN = 0
+
+EV_KEY = 1
+
+SYN_REPORT = 0
+
+EVDEV_KEY_LEFTCTRL = 29
+
+EVDEV_KEY_LEFTSHIFT = 42
+
+def evdev_layout(rows, extra):
+    """由键盘各行生成 字符 -> (evdev 键码, 是否需要 Shift) 的布局表"""
+    layout = dict(extra)
+    for plain, shifted, first_keycode in rows:
+        for offset, (char, shifted_char) in enumerate(zip(plain, shifted)):
+            layout[char] = (first_keycode + offset, False)
+            layout[shifted_char] = (first_keycode + offset, True)
+    return layout
+
+# 可用的键盘布局（键码与 linux/input-event-codes.h 一致）
+EVDEV_LAYOUTS = {
+    "us": evdev_layout([("1234567890-=", "!@#$%^&*()_+", 2),
+                        ("qwertyuiop[]", "QWERTYUIOP{}", 16),
+                        ("asdfghjkl;'`", 'ASDFGHJKL:"~', 30),
+                        ("\\zxcvbnm,./", "|ZXCVBNM<>?", 43)],
+                       {' ': (57, False), '\n': (28, False), '\t': (15, False)}),
+}
+
+def ydotoold_socket_path():
+    """ydotoold 套接字路径：YDOTOOL_SOCKET 优先，其次是 ydotool 1.x 的默认位置"""
+    if os.environ.get("YDOTOOL_SOCKET"):
+        return os.environ["YDOTOOL_SOCKET"]
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.exists(os.path.join(runtime, ".ydotool_socket")):
+        return os.path.join(runtime, ".ydotool_socket")
+    return "/tmp/.ydotool_socket"
+
+class YdotooldClient:
+    """直接连接 ydotoold 的 Unix 套接字写入按键事件，整个会话只连接一次，不启动 ydotool 进程"""
+
+    def __init__(self, path=None, key_delay=0.0, layout="us", metrics=None):
+        self.path = path or ydotoold_socket_path()
+        # 相邻两个字符之间的间隔（秒），ydotool 命令带 --key-delay 时以命令为准
+        self.key_delay = key_delay
+        self.layout = EVDEV_LAYOUTS[layout]
+        self.metrics = metrics
+        self.sock = None
+
+    def open(self):
+        """连接 ydotoold，守护进程未运行时返回 False"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.sock.connect(self.path)
+        except OSError as e:
+            print(f"无法连接 ydotoold: {e}")
+            self.close()
+            return False
+        return True
+
+    def emit(self, events):
+        """发送一批 (type, code, value) 事件"""
+        pack = INPUT_EVENT.pack
+        send = self.sock.send
+        for event_type, code, value in events:
+            send(pack(0, 0, event_type, code, value))
+
+    @staticmethod
+    def key_events(keycode, value):
+        """一次按键状态变化及其后的同步事件"""
+        return [(EV_KEY, keycode, value), (EV_SYN, SYN_REPORT, 0)]
+
+    def char_events(self, char):
+        """输入一个字符的事件序列"""
+        keycode, shift = self.layout[char]
+        events = self.key_events(keycode, 1) + self.key_events(keycode, 0)
+        if shift:
+            events = self.key_events(EVDEV_KEY_LEFTSHIFT, 1) + events + self.key_events(EVDEV_KEY_LEFTSHIFT, 0)
+        return events
+
+    def can_type(self, text):
+        """文本中的字符是否都在布局表中"""
+        return all(char in self.layout or char == '\r' for char in text)
+
+    def type_text(self, text, key_delay=None):
+        """输入文本；有布局表之外的字符时不发送任何事件并返回 False"""
+        if not self.can_type(text):
+            return False
+        key_delay = self.key_delay if key_delay is None else key_delay
+        started = time.perf_counter()
+        if key_delay:
+            for index, char in enumerate(text.replace('\r', '')):
+                if index:
+                    time.sleep(key_delay)
+                self.emit(self.char_events(char))
+        else:
+            self.emit([event for char in text.replace('\r', '') for event in self.char_events(char)])
+        if self.metrics:
+            self.metrics.record("ydotoold", "type", time.perf_counter() - started)
+        return True
+
+    def press(self, codes):
+        """发送 ydotool key 风格的按键序列：[(键码, 1 按下/0 释放), ...]"""
+        started = time.perf_counter()
+        self.emit([event for keycode, value in codes for event in self.key_events(keycode, value)])
+        if self.metrics:
+            self.metrics.record("ydotoold", "key", time.perf_counter() - started)
+        return True
+
+    def run(self, args):
+        """执行 ydotool 的 key/type 参数，例如 ["key", "29:1", "47:1", "47:0", "29:0"]；
+        不支持的命令（如 --file）返回 False，由调用方改为启动 ydotool"""
+        if not args:
+            return False
+        command, rest = args[0], args[1:]
+        if command == "key":
+            try:
+                codes = [(int(keycode), int(value)) for keycode, value in (code.split(":") for code in rest)]
+            except ValueError:
+                return False
+            return self.press(codes)
+        if command != "type" or "--file" in rest or "-f" in rest:
+            return False
+        key_delay = None
+        words = []
+        index = 0
+        while index < len(rest):
+            if rest[index] in ("--key-delay", "-d", "--key-hold", "-H", "--next-delay", "-D"):
+                if rest[index] in ("--key-delay", "-d"):
+                    key_delay = int(rest[index + 1]) / 1000
+                index += 2
+                continue
+            words.append(rest[index])
+            index += 1
+        # ydotool 把多个文本参数依次输入，中间不加空格
+        return self.type_text("".join(words), key_delay)
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+# xdotool 脚本模式下需要用按键名发送的字符（脚本按空白切分参数，且会解释 $、#、引号等）
+XDOTOOL_SPECIAL_KEYS = {
+    ' ': "space",
+    '\t': "Tab",
+    '$': "dollar",
+    '#': "numbersign",
+    '"': "quotedbl",
+    "'": "apostrophe",
+    '\\': "backslash",
+    ';': "semicolon",
+}
+
+XDOTOOL_SPECIAL_RE = re.compile("([" + re.escape("".join(XDOTOOL_SPECIAL_KEYS)) + "])")
+
+class XdotoolSession:
+    """常驻 xdotool 进程，通过 stdin 脚本模式批量发送 type/key 命令"""
+
+    # 每批发送后等待同步标记的最长时间（秒）
+    SYNC_TIMEOUT = 30
+    # 探测流式脚本支持时等待同步标记的时间（秒）
+    PROBE_TIMEOUT = 2
+    # 探测结果在进程内缓存：None 表示尚未探测
+    streaming_supported = None
+    probe_lock = threading.Lock()
+
+    def __init__(self, delay=12, batch_chars=256, metrics=None, window=None):
+        self.delay = delay
+        self.batch_chars = batch_chars
+        self.metrics = metrics
+        # 锁定的目标窗口，命令直接发给该窗口
+        self.window = window
+        self.process = None
+        self.lines = queue.Queue()
+        # 部分 xdotool 版本读到 EOF 才执行脚本，此时退化为每批一个进程；首次发送前探测
+        self.streaming = None
+        # 非流式模式下经启动助手运行的批次，kill 时一并终止
+        self.running = RunningTools()
+
+    @classmethod
+    def supports_streaming(cls):
+        """探测 xdotool 是否边读边执行脚本，每个进程只探测一次，最多等待 PROBE_TIMEOUT 秒"""
+        with cls.probe_lock:
+            if cls.streaming_supported is None:
+                probe = cls()
+                try:
+                    probe.start()
+                    probe.process.stdin.write("getmouselocation\n")
+                    probe.process.stdin.flush()
+                    line = probe.lines.get(timeout=cls.PROBE_TIMEOUT)
+                except (OSError, queue.Empty):
+                    line = None
+                probe.close()
+                cls.streaming_supported = line is not None
+                if not cls.streaming_supported:
+                    print("xdotool 不支持流式脚本，改为每批一个进程")
+            return cls.streaming_supported
+
+    def start(self):
+        """启动 xdotool 脚本进程"""
+        started = time.perf_counter()
+        self.process = subprocess.Popen(["xdotool", "-"], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, text=True, encoding='utf-8', bufsize=1)
+        if self.metrics:
+            self.metrics.record("xdotool", "spawn", time.perf_counter() - started)
+        self.lines = queue.Queue()
+        reader = threading.Thread(target=self._read_stdout, args=(self.process, self.lines))
+        reader.daemon = True
+        reader.start()
+
+    def _read_stdout(self, process, lines):
+        """把 xdotool 的输出逐行转交给等待同步的线程"""
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    def encode(self, text):
+        """把文本转换为 xdotool 脚本命令"""
+        commands = []
+        target = f"--window {self.window} " if self.window else ""
+        for i, line in enumerate(text.split('\n')):
+            if i > 0:
+                commands.append(f"key {target}--clearmodifiers Return")
+            for token in XDOTOOL_SPECIAL_RE.split(line):
+                if not token:
+                    continue
+                if token in XDOTOOL_SPECIAL_KEYS:
+                    commands.append(f"key {target}--clearmodifiers {XDOTOOL_SPECIAL_KEYS[token]}")
+                else:
+                    commands.append(f"type {target}--clearmodifiers --delay {self.delay} -- {token}")
+        return commands
+
+    def batches(self, content):
+        """按字符数切分内容，尽量在换行处断开"""
+        chunker = LineChunker(iter_segments(content))
+        while True:
+            batch = chunker.next(self.batch_chars)
+            if not batch:
+                return
+            yield batch
+
+    def send(self, text):
+        """发送一批文本并等待 xdotool 执行完毕"""
+        commands = self.encode(text)
+        if not commands:
+            return True
+        if self.streaming is None:
+            self.streaming = self.supports_streaming()
+        if not self.streaming:
+            return self._send_once(commands)
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+
+        # 用 getmouselocation 的输出作为本批执行完成的同步标记
+        process, lines = self.process, self.lines
+        try:
+            process.stdin.write("\n".join(commands) + "\ngetmouselocation\n")
+            process.stdin.flush()
+        except OSError:
+            self.process = None
+            return False
+        try:
+            line = lines.get(timeout=self.SYNC_TIMEOUT)
+        except queue.Empty:
+            line = None
+        if line is not None:
+            return True
+        if process.poll() is not None:
+            # 进程已退出（被终止或出错）
+            self.process = None
+            return False
+
+        # 没有收到同步标记：当前 xdotool 不支持流式脚本，关闭 stdin 让它执行已发送的命令
+        print("xdotool 不支持流式脚本，改为每批一个进程")
+        self.streaming = False
+        return self._finish(process)
+
+    def _send_once(self, commands):
+        """非流式模式：一个进程执行一整批命令；脚本是一次性写完的，有启动助手时经助手启动"""
+        script = "\n".join(commands) + "\n"
+        helper = spawn_helper()
+        if helper and helper_accepts(script):
+            try:
+                call, returncode, _, _ = helper.run(["xdotool", "-"], script.encode('utf-8'), self.SYNC_TIMEOUT,
+                                                    running=self.running)
+            except (OSError, subprocess.TimeoutExpired):
+                return False
+            if self.metrics:
+                self.metrics.record("xdotool", "spawn", call.result["spawn"])
+            return returncode == 0
+        self.start()
+        self.process.stdin.write(script)
+        return self._finish(self.process)
+
+    def _finish(self, process):
+        """关闭 stdin 并等待进程退出"""
+        try:
+            process.stdin.close()
+            process.wait(timeout=self.SYNC_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            return False
+        finally:
+            self.process = None
+        return process.returncode == 0
+
+    def close(self):
+        """结束 xdotool 进程"""
+        process = self.process
+        self.process = None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def kill(self):
+        """立即终止 xdotool 进程，丢弃未执行的命令"""
+        self.running.kill_all()
+        process = self.process
+        self.process = None
+        if process is not None and process.poll() is None:
+            process.kill()
+
+def window_command(cmd, window):
+    """锁定目标窗口时，把 xdotool 的按键/输入命令改为直接发给该窗口（XSendEvent），不需要焦点"""
+    if window and cmd[0] == "xdotool" and len(cmd) > 1 and cmd[1] in ("type", "key", "keydown", "keyup"):
+        return cmd[:2] + ["--window", str(window)] + cmd[2:]
+    return cmd
+
+# 需要探测的外部工具及其探测命令（None 表示只检查可执行文件）
+TOOL_PROBES = {
+    "ydotool": None,
+    "xdotool": ["xdotool", "version"],
+    "xclip": ["xclip", "-version"],
+    "xsel": ["xsel", "--version"],
+    "wl-copy": ["wl-copy", "--version"],
+    "wl-paste": ["wl-paste", "--version"],
+    "wtype": None,
+}
+
+def wayland_session():
+    """当前是否为 Wayland 会话（此时 X 显示只是 XWayland，原生 Wayland 窗口收不到 XTest 事件）"""
+    return bool(os.environ.get("WAYLAND_DISPLAY")) or os.environ.get("XDG_SESSION_TYPE") == "wayland"
+
+class ToolRegistry:
+    """外部输入工具注册表：启动时并行探测一次，结果按 PATH 和文件修改时间缓存到磁盘"""
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path or os.path.join(cache_dir(), "tools.json")
+        self.tools = None
+        self.lock = threading.Lock()
+
+    def cache_key(self):
+        """缓存键：PATH 及其中每个目录的修改时间（安装或删除工具都会改变目录时间）"""
+        path = os.environ.get("PATH", "")
+        mtimes = []
+        for directory in path.split(os.pathsep):
+            try:
+                mtimes.append(os.stat(directory).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return {"path": path, "mtimes": mtimes}
+
+    def load_cache(self, key):
+        """读取磁盘缓存，缓存键或工具文件变化时返回 None"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get("key") != key:
+            return None
+        tools = cached.get("tools", {})
+        for info in tools.values():
+            if info.get("path"):
+                try:
+                    if os.stat(info["path"]).st_mtime_ns != info.get("mtime"):
+                        return None
+                except OSError:
+                    return None
+        if set(tools) != set(TOOL_PROBES):
+            return None
+        return tools
+
+    def save_cache(self, key, tools):
+        """写入磁盘缓存"""
+        try:
+            write_atomic(self.cache_path, json.dumps({"key": key, "tools": tools}))
+        except OSError as e:
+            print(f"无法写入工具缓存: {e}")
+
+    @staticmethod
+    def probe_tool(tool):
+        """探测单个工具：查找可执行文件，必要时试运行一次，试运行失败的工具记为不可用"""
+        path = shutil.which(tool)
+        if not path:
+            return {"path": None, "mtime": None, "available": False}
+        info = {"path": path, "mtime": os.stat(path).st_mtime_ns, "available": True}
+        probe_cmd = TOOL_PROBES.get(tool)
+        if probe_cmd:
+            helper = spawn_helper()
+            try:
+                if helper:
+                    returncode = helper.run(probe_cmd, timeout=2)[1]
+                else:
+                    returncode = subprocess.run(probe_cmd, stdin=subprocess.DEVNULL, capture_output=True,
+                                                timeout=2).returncode
+                info["available"] = returncode == 0
+            except (OSError, subprocess.TimeoutExpired):
+                info["available"] = False
+        return info
+
+    def probe(self, force=False):
+        """并行探测所有工具，返回 {工具名: 信息}"""
+        with self.lock:
+            if self.tools is not None and not force:
+                return self.tools
+            key = self.cache_key()
+            tools = None if force else self.load_cache(key)
+            if tools is None:
+                with ThreadPoolExecutor(max_workers=len(TOOL_PROBES)) as pool:
+                    results = pool.map(self.probe_tool, TOOL_PROBES)
+                    tools = dict(zip(TOOL_PROBES, results))
+                self.save_cache(key, tools)
+            self.tools = tools
+            return tools
+
+    def available(self, tool):
+        """工具是否可用"""
+        info = self.probe().get(tool)
+        return bool(info and info["available"])
+
+    def filter(self, commands):
+        """过滤出所需工具可用的命令"""
+        return [cmd for cmd in commands if self.available(cmd[0])]
+
+def tool_operation(cmd):
+    """从命令行推断操作名：第一个非选项参数，没有则为 run"""
+    for arg in cmd[1:]:
+        if not arg.startswith('-'):
+            return arg
+    return "run"
@@ -0,0 +1,347 @@
+"""X11 绑定：Xlib 事件结构和 XTest 进程内按键注入"""
+import time
+import os
+import ctypes
+import ctypes.util
+
+# 换行、制表符等控制字符对应的 X keysym
+XTEST_CONTROL_KEYSYMS = {
+    '\n': 0xff0d,  # Return
+    '\t': 0xff09,  # Tab
+    '\b': 0xff08,  # BackSpace
+}
+
+XK_SHIFT_L = 0xffe1
+
+# XSendEvent 所需的 X11 常量
+X_KEY_PRESS = 2
+
+X_KEY_RELEASE = 3
+
+X_KEY_PRESS_MASK = 1 << 0
+
+X_KEY_RELEASE_MASK = 1 << 1
+
+X_SHIFT_MASK = 1 << 0
+
+class XKeyEvent(ctypes.Structure):
+    """Xlib 的 XKeyEvent"""
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("serial", ctypes.c_ulong),
+        ("send_event", ctypes.c_int),
+        ("display", ctypes.c_void_p),
+        ("window", ctypes.c_ulong),
+        ("root", ctypes.c_ulong),
+        ("subwindow", ctypes.c_ulong),
+        ("time", ctypes.c_ulong),
+        ("x", ctypes.c_int),
+        ("y", ctypes.c_int),
+        ("x_root", ctypes.c_int),
+        ("y_root", ctypes.c_int),
+        ("state", ctypes.c_uint),
+        ("keycode", ctypes.c_uint),
+        ("same_screen", ctypes.c_int),
+    ]
+
+class XSelectionRequestEvent(ctypes.Structure):
+    """Xlib 的 XSelectionRequestEvent"""
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("serial", ctypes.c_ulong),
+        ("send_event", ctypes.c_int),
+        ("display", ctypes.c_void_p),
+        ("owner", ctypes.c_ulong),
+        ("requestor", ctypes.c_ulong),
+        ("selection", ctypes.c_ulong),
+        ("target", ctypes.c_ulong),
+        ("property", ctypes.c_ulong),
+        ("time", ctypes.c_ulong),
+    ]
+
+class XSelectionEvent(ctypes.Structure):
+    """Xlib 的 XSelectionEvent（SelectionNotify）"""
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("serial", ctypes.c_ulong),
+        ("send_event", ctypes.c_int),
+        ("display", ctypes.c_void_p),
+        ("requestor", ctypes.c_ulong),
+        ("selection", ctypes.c_ulong),
+        ("target", ctypes.c_ulong),
+        ("property", ctypes.c_ulong),
+        ("time", ctypes.c_ulong),
+    ]
+
+class XSelectionClearEvent(ctypes.Structure):
+    """Xlib 的 XSelectionClearEvent"""
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("serial", ctypes.c_ulong),
+        ("send_event", ctypes.c_int),
+        ("display", ctypes.c_void_p),
+        ("window", ctypes.c_ulong),
+        ("selection", ctypes.c_ulong),
+        ("time", ctypes.c_ulong),
+    ]
+
+class XPropertyEvent(ctypes.Structure):
+    """Xlib 的 XPropertyEvent"""
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("serial", ctypes.c_ulong),
+        ("send_event", ctypes.c_int),
+        ("display", ctypes.c_void_p),
+        ("window", ctypes.c_ulong),
+        ("atom", ctypes.c_ulong),
+        ("time", ctypes.c_ulong),
+        ("state", ctypes.c_int),
+    ]
+
+class XEvent(ctypes.Union):
+    """Xlib 的 XEvent（只用到按键、选择和属性事件）"""
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("xkey", XKeyEvent),
+        ("xselectionrequest", XSelectionRequestEvent),
+        ("xselection", XSelectionEvent),
+        ("xselectionclear", XSelectionClearEvent),
+        ("xproperty", XPropertyEvent),
+        ("pad", ctypes.c_long * 24),
+    ]
+
+def init_x_threads():
+    """调用 XInitThreads：XTest、剪贴板线程、热键线程和 Tk 在不同线程中使用 Xlib，
+    必须在进程第一次 XOpenDisplay 之前调用；重复调用无害，找不到 libX11 时返回 False"""
+    x11_path = ctypes.util.find_library("X11")
+    if not x11_path:
+        return False
+    try:
+        x11 = ctypes.cdll.LoadLibrary(x11_path)
+    except OSError:
+        return False
+    return bool(x11.XInitThreads())
+
+class XTestTyper:
+    """通过 XTest 扩展在进程内直接注入按键事件，不启动任何子进程"""
+
+    def __init__(self, key_delay=0.004):
+        self.key_delay = key_delay
+        self.x11 = None
+        self.xtst = None
+        self.display = None
+        # keysym -> (keycode, 是否需要Shift)
+        self.keymap = {}
+        # 当前键盘映射中没有任何 keysym 的空闲键码
+        self.spare_keycodes = []
+        # 空闲键码当前绑定的 keysym
+        self.bound = {}
+        # 键码池：keysym -> 绑定的空闲键码，按最近使用排序（最久未用的在最前）
+        self.pool = {}
+        self.shift_keycode = 0
+        # 设置后按键通过 XSendEvent 直接发给该窗口，而不是注入到当前焦点
+        self.window = None
+
+    def open(self):
+        """连接 X 显示并加载键盘映射，失败返回 False"""
+        if not os.environ.get("DISPLAY"):
+            return False
+        x11_path = ctypes.util.find_library("X11")
+        xtst_path = ctypes.util.find_library("Xtst")
+        if not x11_path or not xtst_path:
+            print("未找到 libX11/libXtst，XTest 方法不可用")
+            return False
+        try:
+            self.x11 = ctypes.cdll.LoadLibrary(x11_path)
+            self.xtst = ctypes.cdll.LoadLibrary(xtst_path)
+        except OSError as e:
+            print(f"加载 X11 库失败: {e}")
+            return False
+        init_x_threads()
+
+        x11, xtst = self.x11, self.xtst
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XFlush.argtypes = [ctypes.c_void_p]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        x11.XDisplayKeycodes.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)]
+        x11.XGetKeyboardMapping.restype = ctypes.POINTER(ctypes.c_ulong)
+        x11.XGetKeyboardMapping.argtypes = [ctypes.c_void_p, ctypes.c_ubyte, ctypes.c_int, ctypes.POINTER(ctypes.c_int)]
+        x11.XChangeKeyboardMapping.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int,
+                                               ctypes.POINTER(ctypes.c_ulong), ctypes.c_int]
+        xtst.XTestQueryExtension.argtypes = [ctypes.c_void_p] + [ctypes.POINTER(ctypes.c_int)] * 4
+        xtst.XTestFakeKeyEvent.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XSendEvent.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.c_long,
+                                   ctypes.POINTER(XEvent)]
+
+        self.display = x11.XOpenDisplay(None)
+        if not self.display:
+            print("无法连接 X 显示")
+            return False
+        ints = [ctypes.c_int() for _ in range(4)]
+        if not xtst.XTestQueryExtension(self.display, *[ctypes.byref(i) for i in ints]):
+            print("X 服务器不支持 XTest 扩展")
+            self.close()
+            return False
+
+        self.load_keymap()
+        return True
+
+    def load_keymap(self):
+        """一次性读取键盘映射，缓存 keysym 到键码的对应关系"""
+        min_keycode, max_keycode = ctypes.c_int(), ctypes.c_int()
+        self.x11.XDisplayKeycodes(self.display, ctypes.byref(min_keycode), ctypes.byref(max_keycode))
+        count = max_keycode.value - min_keycode.value + 1
+        per_keycode = ctypes.c_int()
+        syms = self.x11.XGetKeyboardMapping(self.display, min_keycode.value, count, ctypes.byref(per_keycode))
+        per = per_keycode.value
+
+        self.keymap = {}
+        self.spare_keycodes = []
+        for index in range(count):
+            keycode = min_keycode.value + index
+            row = [syms[index * per + level] for level in range(per)]
+            if not any(row):
+                self.spare_keycodes.append(keycode)
+                continue
+            # 只使用前两级（无修饰/Shift），更高级别需要 AltGr 等修饰键
+            for level in range(min(per, 2)):
+                if row[level] and row[level] not in self.keymap:
+                    self.keymap[row[level]] = (keycode, level == 1)
+        self.x11.XFree(syms)
+
+        self.shift_keycode = self.keymap.get(XK_SHIFT_L, (0, False))[0]
+
+    @staticmethod
+    def keysym_for(char):
+        """字符对应的 keysym"""
+        if char in XTEST_CONTROL_KEYSYMS:
+            return XTEST_CONTROL_KEYSYMS[char]
+        code = ord(char)
+        # Latin-1 可打印字符的 keysym 与码位相同，其余使用 Unicode keysym
+        if 0x20 <= code <= 0x7e or 0xa0 <= code <= 0xff:
+            return code
+        return 0x01000000 | code
+
+    def prepare(self, text):
+        """预扫描文本，把不在键盘映射中的字符一次性绑定到空闲键码池，之后输入只需普通按键事件；
+        字符种类多于空闲键码时先绑定最早出现的，其余在输入时按 LRU 轮换。返回新绑定的个数"""
+        missing = []
+        in_use = 0
+        for char in dict.fromkeys(text):
+            if char == '\r':
+                continue
+            keysym = self.keysym_for(char)
+            if keysym in self.keymap:
+                continue
+            if keysym in self.pool:
+                # 本段要用到的已有绑定移到最近使用的一端，避免被淘汰
+                self.pool[keysym] = self.pool.pop(keysym)
+                in_use += 1
+            else:
+                missing.append(keysym)
+        changes = {}
+        for keysym in missing[:max(len(self.spare_keycodes) - in_use, 0)]:
+            keycode = self.claim_keycode()
+            self.bound[keycode] = changes[keycode] = keysym
+            self.pool[keysym] = keycode
+        self.write_bindings(changes)
+        return len(changes)
+
+    def claim_keycode(self):
+        """取一个空闲键码：优先使用未绑定的，否则淘汰最久未用的绑定"""
+        for keycode in self.spare_keycodes:
+            if keycode not in self.bound:
+                return keycode
+        return self.pool.pop(next(iter(self.pool)))
+
+    def write_bindings(self, changes):
+        """把 {键码: keysym} 写入键盘映射：连续键码合并为一次请求，最后只同步一次（keysym 为 0 表示清除）"""
+        if not changes:
+            return
+        keycodes = sorted(changes)
+        start = 0
+        for index in range(1, len(keycodes) + 1):
+            if index < len(keycodes) and keycodes[index] == keycodes[index - 1] + 1:
+                continue
+            run = keycodes[start:index]
+            syms = (ctypes.c_ulong * (2 * len(run)))(*[changes[keycode] for keycode in run for _ in range(2)])
+            self.x11.XChangeKeyboardMapping(self.display, run[0], 2, syms, len(run))
+            start = index
+        self.x11.XSync(self.display, 0)
+
+    def bind_keysym(self, keysym):
+        """返回 keysym 在键码池中的键码，没有预先绑定时淘汰最久未用的绑定"""
+        keycode = self.pool.pop(keysym, None)
+        if keycode is None:
+            if not self.spare_keycodes:
+                return None
+            keycode = self.claim_keycode()
+            self.bound[keycode] = keysym
+            self.write_bindings({keycode: keysym})
+        self.pool[keysym] = keycode
+        return keycode
+
+    def press_keysym(self, keysym, shift=None):
+        """按下并释放 keysym 对应的键；shift 为 None 时按 keysym 所在的级别决定是否按住 Shift"""
+        keycode, level_shift = self.keymap.get(keysym, (None, False))
+        if shift is None:
+            shift = level_shift
+        if keycode is None:
+            keycode = self.bind_keysym(keysym)
+            if keycode is None:
+                return False
+        if self.window:
+            return self.send_key(keycode, shift)
+        fake = self.xtst.XTestFakeKeyEvent
+        if shift and self.shift_keycode:
+            fake(self.display, self.shift_keycode, 1, 0)
+        fake(self.display, keycode, 1, 0)
+        fake(self.display, keycode, 0, 0)
+        if shift and self.shift_keycode:
+            fake(self.display, self.shift_keycode, 0, 0)
+        self.x11.XFlush(self.display)
+        return True
+
+    def send_key(self, keycode, shift):
+        """通过 XSendEvent 把按下/释放事件直接发给目标窗口，Shift 只体现在事件的修饰键状态中"""
+        event = XEvent()
+        key = event.xkey
+        key.display = self.display
+        key.window = self.window
+        key.root = self.x11.XDefaultRootWindow(self.display)
+        key.same_screen = 1
+        key.state = X_SHIFT_MASK if shift else 0
+        key.keycode = keycode
+        for event_type, mask in ((X_KEY_PRESS, X_KEY_PRESS_MASK), (X_KEY_RELEASE, X_KEY_RELEASE_MASK)):
+            key.type = event_type
+            if not self.x11.XSendEvent(self.display, self.window, 1, mask, ctypes.byref(event)):
+                return False
+        self.x11.XFlush(self.display)
+        return True
+
+    def type_char(self, char):
+        """输入单个字符"""
+        if char == '\r':
+            return True
+        success = self.press_keysym(self.keysym_for(char))
+        if self.key_delay:
+            time.sleep(self.key_delay)
+        return success
+
+    def restore_keymap(self):
+        """清除键码池中的绑定，恢复原始键盘映射"""
+        self.write_bindings(dict.fromkeys(self.bound, 0))
+        self.bound = {}
+        self.pool = {}
+
+    def close(self):
+        """恢复键盘映射并断开 X 连接"""
+        if self.display:
+            self.restore_keymap()
+            self.x11.XCloseDisplay(self.display)
+            self.display = None
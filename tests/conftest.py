@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from paste_script.engine import TypingEngine
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """不连接 X 显示、缓存写到临时目录的输入引擎"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.delenv("DISPLAY", raising=False)
+    monkeypatch.delenv("WAYLAND_DISPLAY", raising=False)
+    return TypingEngine()
@@ -0,0 +1,80 @@
+import asyncio
+import subprocess
+
+from paste_script.engine import AsyncTypingRunner
+
+
+def run_chars(engine, text, ydotool_fails=False):
+    """逐字符输入 text，所有逐字符后端都失败；返回经 ydotool 标准输入补发的文本"""
+    engine.begin_run(text)
+    runner = AsyncTypingRunner(engine)
+    fed = []
+
+    async def exec_tool(cmd, input=None, **kwargs):
+        if ydotool_fails:
+            raise subprocess.CalledProcessError(1, cmd)
+        fed.append(input.decode('utf-8'))
+
+    async def pause(units=1.0):
+        pass
+
+    async def run():
+        runner.loop = asyncio.get_running_loop()
+        return await runner.char_by_char(text)
+
+    engine.run_session_backend = lambda purpose, commands, timeout: False
+    engine.input_tool_available = lambda tool: True
+    runner.exec_tool = exec_tool
+    runner.pause = pause
+    assert asyncio.run(run())
+    return fed
+
+
+def test_non_ascii_falls_back_to_ydotool_stdin(engine):
+    assert run_chars(engine, "a中b文") == ["中", "文"]
+    assert engine.ledger.spans == [[0, 1, True], [2, 1, True]]
+
+
+def test_failed_fallback_is_skipped(engine):
+    run_chars(engine, "中", ydotool_fails=True)
+    assert engine.ledger.spans == [[0, 1, True]]
+
+
+class FakeXTest:
+    """记录输入字符的 XTest 后端"""
+
+    def __init__(self):
+        self.typed = []
+        self.window = None
+
+    def type_char(self, char):
+        self.typed.append(char)
+        return True
+
+    def press_keysym(self, keysym, shift=False):
+        self.typed.append(keysym)
+        return True
+
+    def restore_keymap(self):
+        pass
+
+
+def test_xtest_is_not_borrowed_by_chosen_method(engine):
+    xtest = engine.xtest = FakeXTest()
+    engine.method = "char_by_char"
+    assert engine.get_xtest(shared=True) is None
+    assert engine.get_xtest() is xtest
+    assert run_chars(engine, "中") == ["中"]
+    assert xtest.typed == []
+
+
+def test_xtest_is_borrowed_in_auto_mode(engine):
+    xtest = engine.xtest = FakeXTest()
+    for method in ("auto", "xtest", "planned"):
+        engine.method = method
+        assert engine.get_xtest(shared=True) is xtest
+    engine.method = "xdotool"
+    engine.auto_selecting = True
+    assert engine.get_xtest(shared=True) is xtest
+    assert run_chars(engine, "中") == []
+    assert xtest.typed == ["中"]
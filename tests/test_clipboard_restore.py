@@ -0,0 +1,49 @@
+import pytest
+
+
+class Interrupted(Exception):
+    """模拟粘贴途中的停止或错误"""
+
+
+@pytest.fixture
+def clipboard_engine(engine, monkeypatch):
+    """剪贴板操作都是假的、粘贴时被中断的引擎；restored 记录恢复的剪贴板内容"""
+    restored = []
+    monkeypatch.setattr(engine, "get_clipboard", lambda: None)
+    monkeypatch.setattr(engine, "find_clipboard_command", lambda: ["xclip", "-selection", "clipboard"])
+    monkeypatch.setattr(engine, "get_clipboard_content", lambda: "原剪贴板")
+    monkeypatch.setattr(engine, "restore_clipboard_content", restored.append)
+    monkeypatch.setattr(engine, "set_clipboard", lambda text: True)
+    monkeypatch.setattr(engine, "ensure_target_focus", lambda: None)
+    monkeypatch.setattr(engine, "wait_paste_consumed", lambda mark: None)
+
+    def paste_clipboard():
+        raise Interrupted()
+
+    monkeypatch.setattr(engine, "paste_clipboard", paste_clipboard)
+    engine.restored = restored
+    return engine
+
+
+def test_clipboard_method_restores_on_interrupt(clipboard_engine):
+    clipboard_engine.begin_run("text")
+    with pytest.raises(Interrupted):
+        clipboard_engine.try_clipboard_method("text")
+    assert clipboard_engine.restored == ["原剪贴板"]
+
+
+def test_chunked_method_restores_on_interrupt(clipboard_engine, monkeypatch):
+    class Stager:
+        def stage(self, text):
+            pass
+
+        def commit(self):
+            return True
+
+        def abort(self):
+            pass
+
+    monkeypatch.setattr(clipboard_engine, "clipboard_stager", lambda cmd: Stager())
+    clipboard_engine.begin_run("line\n" * 10)
+    assert not clipboard_engine.try_chunked_clipboard_method("line\n" * 10)
+    assert clipboard_engine.restored == ["原剪贴板"]
@@ -0,0 +1,63 @@
+import hashlib
+
+import pytest
+
+from paste_script.content import iter_file_segments, line_context, resume_context, scan_file, StreamedContent
+from paste_script.engine import TypingEngine
+
+
+@pytest.mark.parametrize("data", [
+    "第一行\r\n第二行\r\n\r\n",
+    "a\rb\r\nc  \n\t\n",
+    "中文" * 50 + "\r\n" + "  \r\n" * 3 + "尾",
+    "   \r\n\n",
+    "",
+])
+@pytest.mark.parametrize("read_bytes", [1, 2, 3, 7, 4096])
+def test_streamed_file_matches_preprocess(tmp_path, data, read_bytes):
+    path = tmp_path / "input.txt"
+    path.write_bytes(data.encode("utf-8"))
+    streamed = "".join(iter_file_segments(str(path), read_bytes))
+    assert streamed == TypingEngine.preprocess_content(None, data)
+
+
+def test_invalid_utf8_raises(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"ok\xff")
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_file_segments(str(path), 2))
+
+
+def test_scan_matches_digest_and_estimate(tmp_path):
+    path = tmp_path / "input.txt"
+    data = ("中文\r\nabc\n" * 100).encode("utf-8")
+    path.write_bytes(data)
+    content = StreamedContent(str(path))
+    assert content.scan() == hashlib.sha256(data).hexdigest()
+    assert content.chars == content.estimate_chars() == scan_file(str(path))[1] == 700
+
+
+def test_invalid_file_is_reported_before_typing(engine, tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"ok\xff")
+    errors = []
+    engine.report_error = errors.append
+    # 构造时不读文件，开始输入时（倒计时之前）才校验
+    content = StreamedContent(str(path))
+    engine.start_typing_async(content, countdown=0)
+    assert not engine.last_success
+    assert len(errors) == 1 and "utf-8" in errors[0]
+
+
+def test_line_context_keeps_last_non_blank_line():
+    assert line_context("a\nb:\n  \n\n    c") == "b:\n  \n\n    c"
+    assert line_context("a\nb\n") == "b\n"
+    assert line_context("\n\n  \nx") == "x"
+    assert line_context("partial") == "partial"
+
+
+def test_resume_context(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes("x = 1\r\ndef f():\r\n\r\n    return 1\r\n".encode("utf-8"))
+    assert resume_context(str(path), 16) == "def f():\n\n"
+    assert resume_context(str(path), 19) == "def f():\n\n   "
@@ -0,0 +1,67 @@
+from paste_script.editor import EditorProfile, editor_profile
+
+
+def plan(profile, text):
+    profile.reset()
+    return [profile.plan_line(line) for line in text.split("\n")]
+
+
+def test_plain_profile_types_line_unchanged():
+    assert editor_profile("plain").plan_line("  f(x) {") == ([], "  f(x) {", [])
+
+
+def test_auto_indent_skips_editor_indent():
+    profile = EditorProfile("test", auto_indent=True, indent_after=":")
+    assert plan(profile, "def f():\n    if x:\n        a\n    b\nc") == [
+        ([], "def f():", []),
+        ([], "if x:", []),
+        ([], "a", []),
+        (["shift+Home"], "    b", []),
+        (["shift+Home"], "c", []),
+    ]
+
+
+def test_blank_line_keeps_expected_indent():
+    profile = EditorProfile("test", auto_indent=True, indent_after=":")
+    assert plan(profile, "if x:\n\n    a") == [([], "if x:", []), ([], "", []), ([], "a", [])]
+
+
+def test_wrong_indent_before_bracket_is_deleted():
+    profile = EditorProfile("test", auto_indent=True, indent_after="{", auto_close="(")
+    assert plan(profile, "f {\n(a)") == [([], "f {", []), (["shift+Home", "Delete"], "(a)", [])]
+
+
+def test_skip_closers():
+    profile = EditorProfile("test", auto_close="([{")
+    # 逐个覆盖输入补全的右括号
+    assert profile.skip_closers("f(a)") == ("f(a)", [])
+    # 行尾正好是补全的多个右括号时用 End 跳过
+    assert profile.skip_closers("f(g([x]))") == ("f(g([x", ["End"])
+    # 没有闭合的括号会多出补全的右括号，换行前删除
+    assert profile.skip_closers("f(a, [") == ("f(a, [", ["shift+End", "Delete"])
+    # 不自动补全的括号原样输入
+    assert profile.skip_closers("<a>") == ("<a>", [])
+
+
+def test_matches_class_then_title():
+    profile = editor_profile("jetbrains")
+    assert profile.matches({"class": "jetbrains-pycharm", "name": "x"})
+    assert not profile.matches({"class": "code", "name": "main.py - PyCharm"})
+    assert profile.matches({"name": "main.py - project - PyCharm"})
+    assert not profile.matches({"name": "PyCharm notes.txt - gedit"})
+
+
+def test_resume_at_line_start_restores_indent():
+    profile = EditorProfile("test", auto_indent=True, indent_after=":")
+    profile.reset("x = 1\ndef f():\n\n")
+    assert profile.plan_line("    return 1") == ([], "return 1", [])
+
+
+def test_resume_mid_line_types_rest_only():
+    profile = EditorProfile("test", auto_indent=True, indent_after=":", auto_close="([{")
+    profile.reset("def f():\n    ret")
+    assert profile.plan_line("urn g(a)") == ([], "urn g(a)", [])
+    assert profile.expected == "    "
+    # 行首已输入 "f(g("，整行规划为输入 "f(g([x" 后按 End
+    profile.reset("f(g(")
+    assert profile.plan_line("[x]))") == ([], "[x", ["End"])
@@ -0,0 +1,41 @@
+import pytest
+
+from paste_script.metrics import HISTORY_EXPLORE_EVERY, BackendHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    return BackendHistory(str(tmp_path / "backend_history.json"))
+
+
+def test_untried_methods_keep_order(history):
+    assert history.rank("app", ["a", "b", "c"]) == (["a", "b", "c"], None)
+
+
+def test_rank_by_success_and_speed(history):
+    history.record("app", "slow", True, 100, 10.0)
+    history.record("app", "fast", True, 100, 1.0)
+    history.record("app", "broken", False, 0, 0.0)
+    ranked, explored = history.rank("app", ["broken", "new", "slow", "fast"])
+    # 成功率过半的按吞吐排序，没试过的在其后，多半失败的排最后
+    assert ranked == ["fast", "slow", "new", "broken"]
+    assert explored is None
+
+
+def test_rank_explores_stalest_method(history):
+    history.record("app", "b", True, 100, 10.0)
+    history.record("app", "a", True, 100, 1.0)
+    for _ in range(HISTORY_EXPLORE_EVERY - 1):
+        assert history.rank("app", ["a", "b"])[1] is None
+    assert history.rank("app", ["a", "b"]) == (["b", "a"], "b")
+
+
+def test_history_persists(history):
+    history.record("app", "a", True, 10, 1.0)
+    assert BackendHistory(history.cache_path).rank("app", ["b", "a"], explore=False)[0] == ["a", "b"]
+
+
+def test_target_key():
+    assert BackendHistory.target_key({"class": "Code", "name": "x - y"}) == "code"
+    assert BackendHistory.target_key({"name": "notes.txt - Mousepad"}) == "mousepad"
+    assert BackendHistory.target_key(None) == "unknown"
@@ -0,0 +1,46 @@
+from paste_script.jobs import JobQueue
+
+
+def test_jobs_ordered_by_priority_then_age(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.json"))
+    first = queue.add("a.txt")
+    second = queue.add("b.txt", priority=5)
+    third = queue.add("c.txt", priority=5)
+    assert [job["id"] for job in queue.jobs()] == [second["id"], third["id"], first["id"]]
+    assert queue.next_job()["id"] == second["id"]
+
+
+def test_interrupted_job_resumes_from_checkpoint(tmp_path):
+    path = str(tmp_path / "jobs.json")
+    queue = JobQueue(path)
+    job = queue.add("a.txt", method="xdotool", window=123)
+    queue.begin(job["id"], 0, 100)
+    queue.checkpoint(40)
+    queue.flush(force=True)
+
+    # 重启后正在输入的任务恢复为等待，从记录的位置继续
+    restored = JobQueue(path).get(job["id"])
+    assert restored["state"] == "pending"
+    assert restored["position"] == 40
+    assert restored["window"] == "123"
+    assert "已中断" in JobQueue.describe(restored)
+
+
+def test_finish_records_throughput(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.json"))
+    job = queue.add("a.txt")
+    queue.begin(job["id"], 0, 120)
+    queue.finish(job["id"], "done", {"position": 100, "elapsed": 4.0}, chars=100)
+    done = queue.get(job["id"])
+    assert (done["state"], done["position"], done["total"]) == ("done", 100, 100)
+    assert done["chars_per_sec"] == 25.0
+    assert queue.next_job() is None
+    assert queue.clear() == 1
+    assert queue.jobs() == []
+
+
+def test_remove(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.json"))
+    job = queue.add("a.txt")
+    assert queue.remove(job["id"])
+    assert not queue.remove(job["id"])
@@ -0,0 +1,37 @@
+from paste_script.plan import PLAN_BLOCK_CHARS, plan_segments
+
+
+def kinds(text):
+    return [(kind, text[start:end]) for kind, start, end in plan_segments(text)]
+
+
+def test_segments_cover_text():
+    text = "abc 中文\n\nx\ty\n€"
+    segments = plan_segments(text)
+    assert segments[0][1] == 0 and segments[-1][2] == len(text)
+    assert all(a[2] == b[1] for a, b in zip(segments, segments[1:]))
+
+
+def test_character_classes():
+    assert kinds("ab\t c\n中文") == [("ascii", "ab\t c"), ("newline", "\n"), ("unicode", "中文")]
+
+
+def test_each_newline_is_own_segment():
+    assert kinds("a\n\n\nb") == [("ascii", "a"), ("newline", "\n"), ("newline", "\n"),
+                                 ("newline", "\n"), ("ascii", "b")]
+
+
+def test_short_ascii_between_unicode_is_merged():
+    assert kinds("中文, 测试") == [("unicode", "中文, 测试")]
+    assert kinds("中文 abcd 测试") == [("unicode", "中文"), ("ascii", " abcd "), ("unicode", "测试")]
+
+
+def test_short_ascii_at_edges_is_kept():
+    assert kinds("ab中文") == [("ascii", "ab"), ("unicode", "中文")]
+
+
+def test_long_paragraph_is_block():
+    paragraph = "x" * PLAN_BLOCK_CHARS
+    assert kinds(paragraph + "\n\n中") == [("block", paragraph), ("newline", "\n"), ("newline", "\n"),
+                                          ("unicode", "中")]
+    assert kinds("x" * (PLAN_BLOCK_CHARS - 1))[0][0] == "ascii"
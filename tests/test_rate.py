@@ -0,0 +1,38 @@
+import pytest
+
+from paste_script.metrics import RateController
+
+
+def test_rate_controller_aimd():
+    rate = RateController(initial_cps=10.0, min_cps=2.0, max_cps=13.0, increase=2.0, decrease=0.5)
+    rate.success(0.1)
+    assert rate.cps == 12.0
+    rate.success(0.1)
+    assert rate.cps == 13.0
+    rate.failure()
+    assert rate.cps == 6.5
+    for _ in range(5):
+        rate.failure()
+    assert rate.cps == 2.0
+    rate.reset()
+    assert rate.cps == 10.0
+
+
+def test_rate_controller_over_budget_is_failure():
+    rate = RateController(initial_cps=10.0, spawn_budget=0.25)
+    assert rate.budget(5) == pytest.approx(0.75)
+    rate.success(0.8, chars=5)
+    assert rate.cps == 5.0
+    assert rate.key_delay_ms() == 200
+    assert RateController(initial_cps=5000.0, max_cps=5000.0).key_delay_ms() == 1
+
+
+def test_status_shows_rate_next_to_throughput(engine):
+    assert engine.describe_progress() is None
+    engine.rate.cps = 42.0
+    engine.progress.reset(total=100)
+    engine.progress.stage("xdotool")
+    engine.progress.publish(10)
+    text = engine.describe_progress()
+    assert text.startswith("xdotool: 10/100 字符")
+    assert text.endswith("（限速 42.0 字符/秒）")
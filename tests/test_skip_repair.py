@@ -0,0 +1,120 @@
+import asyncio
+import subprocess
+
+from paste_script.content import StreamedContent
+from paste_script.engine import AsyncTypingRunner
+from paste_script.progress import SkipLedger
+
+
+def run_lines(engine, text, fail_line, error):
+    """用假的 exec_tool 运行 xdotool 逐行输入，第 fail_line 行抛出 error；返回输入过的文本"""
+    engine.begin_run(text)
+    runner = AsyncTypingRunner(engine)
+    typed = []
+
+    async def exec_tool(cmd, **kwargs):
+        if cmd[1] == "type":
+            if cmd[-1] == fail_line:
+                raise error
+            typed.append(cmd[-1])
+
+    async def pause(units=1.0):
+        pass
+
+    runner.exec_tool = exec_tool
+    runner.pause = pause
+    asyncio.run(runner.xdotool_lines(text.split("\n"), None))
+    return typed
+
+
+def test_timed_out_line_is_uncertain(engine):
+    run_lines(engine, "one\ntwo\nthree", "two", subprocess.TimeoutExpired(["xdotool"], 60))
+    assert engine.ledger.spans == [[4, 3, False]]
+
+
+def test_killed_line_is_uncertain(engine):
+    run_lines(engine, "one\ntwo\nthree", "two", subprocess.CalledProcessError(-9, ["xdotool"]))
+    assert engine.ledger.spans == [[4, 3, False]]
+
+
+def test_failed_line_is_certain(engine):
+    run_lines(engine, "one\ntwo\nthree", "two", subprocess.CalledProcessError(1, ["xdotool"]))
+    assert engine.ledger.spans == [[4, 3, True]]
+
+
+def test_whitespace_only_line_is_typed(engine):
+    typed = run_lines(engine, "def f():\n    \n\n    return 1", None, None)
+    assert typed == ["def f():", "    ", "    return 1"]
+    assert engine.ledger.spans == []
+    assert engine.metrics.chars_skipped == 0
+
+
+def test_partly_typed_line_is_not_reinjected(engine, monkeypatch):
+    typed = run_lines(engine, "one\ntwo\nthree", "two", subprocess.TimeoutExpired(["xdotool"], 60))
+    repaired = []
+    monkeypatch.setattr(engine, "plan_backends", lambda kinds: {"block": ["xdotool"]})
+    monkeypatch.setattr(engine, "press_editor_key", lambda name, count=1: True)
+    monkeypatch.setattr(engine, "run_plan_segment", lambda kind, text, backends: repaired.append(text) or True)
+    engine.repair_skipped()
+    assert typed == ["one", "three"]
+    assert repaired == []
+    assert engine.ledger.missing() == 3
+
+
+def test_skipped_line_is_repaired_once(engine, monkeypatch):
+    run_lines(engine, "one\ntwo\nthree", "two", subprocess.CalledProcessError(1, ["xdotool"]))
+    repaired = []
+    monkeypatch.setattr(engine, "plan_backends", lambda kinds: {"block": ["xdotool"]})
+    monkeypatch.setattr(engine, "press_editor_key", lambda name, count=1: True)
+    monkeypatch.setattr(engine, "run_plan_segment", lambda kind, text, backends: repaired.append(text) or True)
+    engine.repair_skipped()
+    assert repaired == ["two"]
+    assert engine.ledger.missing() == 0
+
+
+def test_adjacent_spans_merge():
+    ledger = SkipLedger()
+    ledger.record(3, 2)
+    ledger.record(5, 4)
+    assert ledger.spans == [[3, 6, True]]
+
+
+def test_spans_with_different_certainty_stay_apart():
+    ledger = SkipLedger()
+    ledger.record(0, 2)
+    ledger.record(2, 3, certain=False)
+    ledger.record(10, 1)
+    assert ledger.spans == [[0, 2, True], [2, 3, False], [10, 1, True]]
+
+
+def test_empty_span_is_ignored():
+    ledger = SkipLedger()
+    ledger.record(4, 0)
+    ledger.record(4, -1)
+    assert ledger.spans == []
+
+
+def test_missing_counts_spans_inside_range():
+    ledger = SkipLedger()
+    ledger.record(0, 2)
+    ledger.record(5, 3)
+    ledger.record(20, 4)
+    assert ledger.missing() == 9
+    assert ledger.missing(5, 8) == 3
+    assert ledger.missing(0, 10) == 5
+    assert ledger.missing(6) == 4
+    ledger.clear()
+    assert ledger.missing() == 0
+
+
+def test_checkpoint_stops_at_first_skipped_char(engine, tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text("one\ntwo\nthree", encoding="utf-8")
+    engine.begin_run(StreamedContent(str(path)))
+    engine.advance(4)
+    engine.skip(3)
+    engine.advance(6)
+    assert engine.journal.resume_point(str(path)) == ("auto", 4)
+    engine.ledger.clear()
+    engine.checkpoint()
+    assert engine.journal.resume_point(str(path)) == ("auto", 13)
@@ -0,0 +1,34 @@
+import subprocess
+import time
+
+import pytest
+
+from paste_script.spawn import SpawnHelper
+
+
+@pytest.fixture
+def helper():
+    helper = SpawnHelper()
+    assert helper.start()
+    yield helper
+    helper.close()
+
+
+def test_run_returns_output(helper):
+    call, returncode, stdout, stderr = helper.run(["echo", "你好"], capture=True, timeout=5)
+    assert (returncode, stdout) == (0, "你好\n".encode())
+
+
+def test_kill_before_process_is_registered(helper):
+    # 终止请求紧跟在启动请求之后，通常在助手登记进程之前到达
+    call = helper.submit(["sleep", "5"])
+    call.kill()
+    assert call.done.wait(3)
+    assert call.outcome()[0] < 0
+
+
+def test_timeout_is_bounded(helper):
+    started = time.time()
+    with pytest.raises(subprocess.TimeoutExpired):
+        helper.run(["sleep", "5"], timeout=0.01)
+    assert time.time() - started < 2
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from paste_script.tools import TOOL_PROBES, ToolRegistry, XdotoolSession
+
+
+def test_encode_lines_and_special_keys():
+    session = XdotoolSession(delay=5)
+    assert session.encode("a b$\n'x'") == [
+        "type --clearmodifiers --delay 5 -- a",
+        "key --clearmodifiers space",
+        "type --clearmodifiers --delay 5 -- b",
+        "key --clearmodifiers dollar",
+        "key --clearmodifiers Return",
+        "key --clearmodifiers apostrophe",
+        "type --clearmodifiers --delay 5 -- x",
+        "key --clearmodifiers apostrophe",
+    ]
+
+
+def test_encode_targets_window():
+    session = XdotoolSession(delay=12, window="42")
+    assert session.encode("中\n") == [
+        "type --window 42 --clearmodifiers --delay 12 -- 中",
+        "key --window 42 --clearmodifiers Return",
+    ]
+
+
+def test_encode_empty_text():
+    assert XdotoolSession().encode("") == []
+
+
+@pytest.fixture
+def bin_dir(tmp_path, monkeypatch):
+    """只含假工具的 PATH：xdotool 试运行成功，xclip 试运行失败"""
+    directory = tmp_path / "bin"
+    directory.mkdir()
+    for tool, code in (("xdotool", 0), ("xclip", 1)):
+        script = directory / tool
+        script.write_text(f"#!/bin/sh\nexit {code}\n")
+        script.chmod(0o755)
+    monkeypatch.setenv("PATH", str(directory))
+    return directory
+
+
+def counting_registry(tmp_path, monkeypatch):
+    """缓存写到临时目录、记录实际探测次数的注册表"""
+    probed = []
+    real_probe = ToolRegistry.probe_tool
+
+    def probe_tool(tool):
+        probed.append(tool)
+        return real_probe(tool)
+
+    monkeypatch.setattr(ToolRegistry, "probe_tool", staticmethod(probe_tool))
+    return lambda: ToolRegistry(str(tmp_path / "tools.json")), probed
+
+
+def test_probe_checks_return_code(bin_dir, tmp_path):
+    registry = ToolRegistry(str(tmp_path / "tools.json"))
+    assert registry.available("xdotool")
+    assert not registry.available("xclip")
+    assert not registry.available("wtype")
+
+
+def test_probe_cache_hit(bin_dir, tmp_path, monkeypatch):
+    make, probed = counting_registry(tmp_path, monkeypatch)
+    first = make().probe()
+    assert len(probed) == len(TOOL_PROBES)
+    probed.clear()
+    assert make().probe() == first
+    assert probed == []
+
+
+def test_probe_cache_invalidated_by_path(bin_dir, tmp_path, monkeypatch):
+    make, probed = counting_registry(tmp_path, monkeypatch)
+    make().probe()
+    probed.clear()
+    other = tmp_path / "other"
+    other.mkdir()
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{other}")
+    make().probe()
+    assert len(probed) == len(TOOL_PROBES)
+
+
+def test_probe_cache_invalidated_by_tool_mtime(bin_dir, tmp_path, monkeypatch):
+    make, probed = counting_registry(tmp_path, monkeypatch)
+    make().probe()
+    probed.clear()
+    tool = bin_dir / "xdotool"
+    os.utime(tool, ns=(tool.stat().st_atime_ns, tool.stat().st_mtime_ns + 10 ** 9))
+    make().probe()
+    assert len(probed) == len(TOOL_PROBES)
+
+
+def test_probe_cache_invalidated_by_new_tool(bin_dir, tmp_path, monkeypatch):
+    make, probed = counting_registry(tmp_path, monkeypatch)
+    assert not make().available("wtype")
+    probed.clear()
+    wtype = bin_dir / "wtype"
+    wtype.write_text("#!/bin/sh\nexit 0\n")
+    wtype.chmod(0o755)
+    os.utime(bin_dir, ns=(bin_dir.stat().st_atime_ns, bin_dir.stat().st_mtime_ns + 10 ** 9))
+    assert make().available("wtype")
+    assert len(probed) == len(TOOL_PROBES)
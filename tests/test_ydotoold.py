@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from paste_script.tools import EV_KEY, EV_SYN, EVDEV_KEY_LEFTSHIFT, SYN_REPORT, YdotooldClient
+from tests.ydotoold_standin import YdotooldStandIn
+
+KEY_A = 30
+KEY_ENTER = 28
+KEY_LEFTCTRL = 29
+KEY_V = 47
+SYN = (EV_SYN, SYN_REPORT, 0)
+
+
+def tap(keycode):
+    return [(EV_KEY, keycode, 1), SYN, (EV_KEY, keycode, 0), SYN]
+
+
+@pytest.fixture
+def standin(tmp_path, monkeypatch):
+    path = str(tmp_path / "ydotool.sock")
+    monkeypatch.setenv("YDOTOOL_SOCKET", path)
+    server = YdotooldStandIn(path)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client(standin):
+    client = YdotooldClient()
+    assert client.open()
+    yield client
+    client.close()
+
+
+def test_ascii_char(standin, client):
+    assert client.type_text("a")
+    assert standin.wait_events(4) == tap(KEY_A)
+
+
+def test_shifted_char_is_wrapped_in_shift(standin, client):
+    assert client.type_text("A")
+    shift_down = [(EV_KEY, EVDEV_KEY_LEFTSHIFT, 1), SYN]
+    shift_up = [(EV_KEY, EVDEV_KEY_LEFTSHIFT, 0), SYN]
+    assert standin.wait_events(8) == shift_down + tap(KEY_A) + shift_up
+
+
+def test_newline_is_enter_and_cr_is_dropped(standin, client):
+    assert client.type_text("a\r\na")
+    assert standin.wait_events(12) == tap(KEY_A) + tap(KEY_ENTER) + tap(KEY_A)
+
+
+def test_key_command(standin, client):
+    assert client.run(["key", f"{KEY_LEFTCTRL}:1", f"{KEY_V}:1", f"{KEY_V}:0", f"{KEY_LEFTCTRL}:0"])
+    assert standin.wait_events(8) == [(EV_KEY, KEY_LEFTCTRL, 1), SYN, (EV_KEY, KEY_V, 1), SYN,
+                                      (EV_KEY, KEY_V, 0), SYN, (EV_KEY, KEY_LEFTCTRL, 0), SYN]
+
+
+def test_unmapped_char_sends_nothing(standin, client):
+    assert not client.type_text("a中")
+    assert not client.run(["type", "中"])
+    assert standin.wait_events(1, timeout=0.2) == []
+
+
+def test_key_delay_between_chars(standin, client):
+    started = time.perf_counter()
+    assert client.type_text("aaa", key_delay=0.05)
+    assert time.perf_counter() - started >= 0.1
+    assert standin.wait_events(12) == tap(KEY_A) * 3
+
+
+def test_engine_uses_rate_key_delay(standin, engine, monkeypatch):
+    monkeypatch.setattr(engine, "input_tool_available", lambda tool: True)
+    engine.rate.cps = 20.0
+    assert engine.send_ydotoold(["ydotool", "key", f"{KEY_A}:1", f"{KEY_A}:0"])
+    assert engine.ydotoold.key_delay == pytest.approx(0.05)
+    assert standin.wait_events(4) == tap(KEY_A)
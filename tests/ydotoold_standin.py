@@ -0,0 +1,45 @@
+"""本地替身 ydotoold：测试和基准测试（benchmark.py --ydotoold）共用"""
+import os
+import socket
+import threading
+
+from paste_script.tools import INPUT_EVENT
+
+
+class YdotooldStandIn:
+    """在 Unix 数据报套接字上接收 input_event，按顺序记录 (type, code, value)；子类可在 handle 中按事件记录输入"""
+
+    def __init__(self, path):
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        # 收到的全部事件 (type, code, value)
+        self.events = []
+        self.received = threading.Condition()
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                data = self.sock.recv(INPUT_EVENT.size)
+            except OSError:
+                return
+            _, _, event_type, code, value = INPUT_EVENT.unpack(data)
+            with self.received:
+                self.events.append((event_type, code, value))
+                self.received.notify_all()
+            self.handle(event_type, code, value)
+
+    def handle(self, event_type, code, value):
+        """收到一个事件后调用"""
+
+    def wait_events(self, count, timeout=2.0):
+        """等待至少收到 count 个事件，返回收到的事件"""
+        with self.received:
+            self.received.wait_for(lambda: len(self.events) >= count, timeout)
+            return list(self.events)
+
+    def close(self):
+        self.sock.close()
+        os.unlink(self.path)